@@ -0,0 +1,508 @@
+#!/usr/bin/env python3
+# benchmarks for the hot paths of lona
+#
+# the test suite checks call counts, patch sizes and cache hits, which are
+# deterministic. This script measures wall clock times, which depend on the
+# machine, and is not part of the test suite.
+#
+# usage: python benchmarks/benchmarks.py [NAME ...]
+
+from types import SimpleNamespace
+import argparse
+import asyncio
+import random
+import time
+import math
+
+from lona.html import (
+    TimeSeries,
+    SharedNode,
+    SharedHTML,
+    Button,
+    Table,
+    Span,
+    Nav,
+    Div,
+    Tr,
+    Td,
+    H1,
+    A,
+)
+from lona.protocol import encode_data, DATA_TYPE
+from lona._msgpack import MSGPACK_IS_AVAILABLE
+from lona.view_runtime import ViewRuntime
+from lona.html.text_node import TextNode
+from lona.html.document import Document
+from lona.connection import Connection
+from lona._json import dumps
+from lona import _json
+
+BENCHMARKS = {}
+
+
+def benchmark(function):
+    BENCHMARKS[function.__name__] = function
+
+    return function
+
+
+def measure(function, repeat=5):
+    # the best of multiple runs is used, to be robust against garbage
+    # collection pauses and other processes
+
+    durations = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+
+    return min(durations)
+
+
+def render_table(rows=100, columns=20, cell=None):
+    if cell is None:
+        def cell(row, column):
+            return Td(f'{row}:{column}')
+
+    return Table(*[
+        Tr(*[cell(row, column) for column in range(columns)])
+        for row in range(rows)
+    ])
+
+
+# benchmarks ##################################################################
+@benchmark
+def diffing():
+    # a view that rebuilds its 100x20 table on every tick, while only one
+    # cell changes
+
+    def render(tick):
+        return render_table(
+            cell=lambda row, column: Td(
+                tick if (row, column) == (tick, 0) else f'{row}:{column}',
+            ),
+        )
+
+    for diffing in (False, True):
+        sent_bytes = 0
+
+        def run(diffing=diffing):
+            nonlocal sent_bytes
+
+            document = Document(diffing=diffing)
+            document.apply(html=render(-1))
+            sent_bytes = 0
+
+            for tick in range(20):
+                _, data_type, data = document.apply(html=render(tick))
+
+                if data_type == DATA_TYPE.HTML_UPDATE:
+                    data = [patch.data for patch in data]
+
+                sent_bytes += len(dumps([data_type, data]))
+
+        duration = measure(run, repeat=3)
+
+        print(f'diffing={diffing}: {sent_bytes} bytes in {duration:.3f}s')
+
+
+@benchmark
+def clone():
+    def render_row(i):
+        return Tr(
+            Td(Span('name', _class='name'), style={'width': '50%'}),
+            Td(Span('value', _class='value'), data_index=i),
+            Td(Button('edit', _class='btn btn-primary', data_action='edit')),
+            _class='row',
+        )
+
+    skeleton = render_row(0)
+
+    constructor_duration = measure(
+        lambda: [render_row(i) for i in range(500)],
+    )
+
+    clone_duration = measure(
+        lambda: [skeleton.clone() for _ in range(500)],
+    )
+
+    print(f'500 rows: constructors: {constructor_duration:.3f}s, clone: {clone_duration:.3f}s')  # NOQA: E501
+
+
+@benchmark
+def widget_data():
+    # a chart widget that gets 100 points per tick pushed, while its
+    # serialized data gets used to render the page for new clients
+
+    for initial_point_count in (0, 100000):
+        def run(initial_point_count=initial_point_count):
+            points = [[i, i] for i in range(initial_point_count)]
+            chart = Div(widget='Chart', widget_data={'points': points})
+
+            document = Document()
+            document.apply(html=chart)
+
+            for tick in range(100):
+                points = chart.widget_data['points']
+
+                for i in range(100):
+                    points.append([tick, i])
+
+                _, _, patches = document.apply(html=chart)
+                dumps([patch.data for patch in patches])
+                chart._serialize()
+
+        duration = measure(run, repeat=3)
+
+        print(f'{initial_point_count} initial points: {10000 / duration:.0f} points per second')  # NOQA: E501
+
+
+@benchmark
+def time_series():
+    # a dashboard with 50 live series, that get 20 points per tick pushed
+
+    for use_time_series in (False, True):
+        patch_size = 0
+
+        def run(use_time_series=use_time_series):
+            nonlocal patch_size
+
+            charts = [Div(widget='Chart') for _ in range(50)]
+            html = Div(charts)
+            randomizer = random.Random(0)
+
+            if use_time_series:
+                series = [
+                    TimeSeries(chart, 'points', capacity=1000, max_points=100)
+                    for chart in charts
+                ]
+
+            else:
+                for chart in charts:
+                    chart.widget_data = {'points': []}
+
+                series = [chart.widget_data['points'] for chart in charts]
+
+            document = Document()
+            document.apply(html=html)
+            patch_size = 0
+
+            for tick in range(100):
+                for points in series:
+                    for i in range(20):
+                        x = tick * 20 + i
+                        y = math.sin(x / 100) + randomizer.random()
+
+                        if use_time_series:
+                            points.append(x, y)
+
+                        else:
+                            points.append([x, y])
+
+                _, _, patches = document.apply(html=html)
+                patch_size += len(dumps([patch.data for patch in patches]))
+
+        duration = measure(run, repeat=3)
+
+        print(f'time series: {use_time_series}: {100000 / duration:.0f} points per second, {patch_size / 1000:.0f} kB patches')  # NOQA: E501
+
+
+@benchmark
+def text_nodes():
+    html = Div([TextNode(f'text {i}') for i in range(10000)])
+
+    def run():
+        html._invalidate_serialization_cache()
+        html._serialize()
+
+        for node in html.iter_nodes():
+            node.parent
+            node.upper()
+
+    print(f'10000 text nodes: {measure(run, repeat=3):.3f}s')
+
+
+@benchmark
+def node_comparison():
+    # a 100x20 table gets compared to a copy, that differs in its last cell
+
+    table1 = render_table()
+    table2 = render_table()
+    table2[-1][-1][0] = 'foo'
+
+    first_duration = measure(lambda: table1 != table2, repeat=1)
+    duration = measure(lambda: table1 != table2)
+
+    print(f'first comparison: {first_duration:.6f}s, cached: {duration:.6f}s')  # NOQA: E501
+
+
+@benchmark
+def shared_nodes():
+    # 200 views that render the same navigation with 200 links
+
+    def render_navigation():
+        return Nav(*[A(f'link {i}', href=f'/{i}') for i in range(200)])
+
+    shared_navigation = SharedHTML(render_navigation())
+
+    for shared in (False, True):
+        def run(shared=shared):
+            for i in range(200):
+                if shared:
+                    navigation = SharedNode(shared_navigation)
+
+                else:
+                    navigation = render_navigation()
+
+                document = Document()
+                document.apply(html=Div(navigation, H1(f'view {i}')))
+
+        duration = measure(run, repeat=3)
+
+        print(f'shared: {shared}: {200 / duration:.0f} views per second')
+
+
+@benchmark
+def binary_protocol():
+    # a 100x20 table that updates every cell
+
+    table = render_table()
+    document = Document()
+    document.apply(html=table)
+
+    for index, row in enumerate(table):
+        for cell in row:
+            cell[0] = str(index)
+            cell.attributes['data-row'] = index
+
+    _, data_type, patches = document.apply(html=table)
+    data = [data_type, [patch.data for patch in patches]]
+
+    print(f'msgpack package installed: {MSGPACK_IS_AVAILABLE}')
+
+    for binary in (False, True):
+        message = encode_data(1, '1', None, data, binary=binary)
+
+        duration = measure(
+            lambda binary=binary: encode_data(1, '1', None, data, binary=binary),  # NOQA: E501
+        )
+
+        print(f'binary={binary}: {duration * 1000:.2f}ms per message, {len(message) / len(patches):.1f} bytes per patch')  # NOQA: E501
+
+
+@benchmark
+def json_backends():
+    # encodes the HTML_TREE of a 100x20 table
+
+    document = Document()
+
+    _, data_type, data = document.apply(
+        html=render_table(
+            cell=lambda row, column: Td(f'{row}:{column}', _class='cell'),
+        ),
+    )
+
+    backend = _json.get_backend()
+    backends = ['json']
+
+    if _json.ORJSON_IS_AVAILABLE:
+        backends.append('orjson')
+
+    try:
+        for name in backends:
+            _json.set_backend(name)
+
+            duration = measure(
+                lambda: encode_data(1, '1', None, [data_type, data]),
+            )
+
+            print(f'{name}: {duration * 1000:.2f}ms per message')
+
+    finally:
+        _json.set_backend(backend)
+
+
+@benchmark
+def broadcasts():
+    # one patch per row of a 100x20 table, sent to up to 200 windows
+
+    class Connection:
+        interactive = True
+        binary = False
+
+        def send_message(self, message, **kwargs):
+            pass
+
+    table = render_table()
+
+    view_runtime = ViewRuntime.__new__(ViewRuntime)
+    view_runtime.view_runtime_id = '1'
+    view_runtime.document = Document()
+    view_runtime.document.apply(html=table)
+
+    for row in table:
+        row[0][0] = 'foo'
+
+    data = list(view_runtime.document.apply(html=table))[1:]
+    patches = [patch.data for patch in data[1]]
+
+    for connection_count in (1, 10, 100, 200):
+        view_runtime.connections = {
+            Connection(): (window_id, '/')
+            for window_id in range(connection_count)
+        }
+
+        def encode_per_connection():
+            for window_id, _url in view_runtime.connections.values():
+                encode_data(window_id, '1', None, [data[0], patches])
+
+        legacy_duration = measure(encode_per_connection)
+        duration = measure(lambda: view_runtime.send_data(data=data))
+
+        print(f'{connection_count} connections: per connection: {legacy_duration * 1000:.2f}ms, once: {duration * 1000:.2f}ms')  # NOQA: E501
+
+
+@benchmark
+def outbound_queue():
+    # time a view thread spends sending 1000 messages
+
+    class Websocket:
+        ws_protocol = None
+
+        async def send_str(self, string):
+            pass
+
+    async def run_benchmark():
+        loop = asyncio.get_running_loop()
+
+        server = SimpleNamespace(
+            loop=loop,
+            settings=SimpleNamespace(
+                WEBSOCKET_QUEUE_MAX_SIZE=100,
+                WEBSOCKET_QUEUE_HIGH_WATER_MARK=50,
+            ),
+        )
+
+        connection = Connection(server, None, websocket=Websocket())
+
+        def send_messages_directly():
+            for _ in range(1000):
+                asyncio.run_coroutine_threadsafe(
+                    connection.websocket.send_str('foo'),
+                    loop=loop,
+                ).result()
+
+        def send_messages():
+            for _ in range(1000):
+                connection.send_str('foo')
+
+        for name, function in (('direct', send_messages_directly),
+                               ('queued', send_messages)):
+
+            duration = await loop.run_in_executor(
+                None,
+                lambda function=function: measure(function, repeat=1),
+            )
+
+            print(f'{name}: {duration * 1000:.2f}ms')
+
+        while connection.queue_depth or connection._writer_running:
+            await asyncio.sleep(0.01)
+
+    asyncio.run(run_benchmark())
+
+
+@benchmark
+def slow_connection():
+    # a view thread sends 300 html updates to a client that needs 1ms per
+    # message
+
+    class Websocket:
+        ws_protocol = None
+
+        def __init__(self):
+            self.message_count = 0
+
+        async def send_str(self, string):
+            await asyncio.sleep(0.001)
+
+            self.message_count += 1
+
+    async def run_benchmark():
+        loop = asyncio.get_running_loop()
+
+        server = SimpleNamespace(
+            loop=loop,
+            settings=SimpleNamespace(
+                WEBSOCKET_QUEUE_MAX_SIZE=100,
+                WEBSOCKET_QUEUE_HIGH_WATER_MARK=50,
+            ),
+            run_function_async=lambda function, *args: loop.run_in_executor(
+                None,
+                lambda: function(*args),
+            ),
+        )
+
+        for backpressure in (False, True):
+            connection = Connection(server, None, websocket=Websocket())
+
+            def resync(connection=connection):
+                connection._finish_resync('window', message='snapshot')
+
+            def send_updates(connection=connection, backpressure=backpressure):
+                for _ in range(300):
+                    if backpressure:
+                        connection.send_message(
+                            'update',
+                            resync_key='window',
+                            resync=resync,
+                        )
+
+                    else:
+                        connection.send_message('update')
+
+            duration = await loop.run_in_executor(
+                None,
+                lambda send_updates=send_updates: measure(
+                    send_updates,
+                    repeat=1,
+                ),
+            )
+
+            while (connection.queue_depth or
+                   connection._writer_running or
+                   connection._resyncs):
+
+                await asyncio.sleep(0.01)
+
+            print(f'backpressure={backpressure}: view thread blocked for {duration * 1000:.2f}ms, {connection.websocket.message_count} messages sent')  # NOQA: E501
+
+    asyncio.run(run_benchmark())
+
+
+# main ########################################################################
+def main():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        'names',
+        nargs='*',
+        metavar='NAME',
+        help=f'benchmarks to run (default: all): {", ".join(BENCHMARKS)}',
+    )
+
+    args = parser.parse_args()
+
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error(f'unknown benchmark: {name}')
+
+    for name in args.names or BENCHMARKS.keys():
+        print(f'# {name}')
+        BENCHMARKS[name]()
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,35 @@
 from enum import Enum
 import json
 
+try:
+    import orjson
+
+    ORJSON_IS_AVAILABLE = True
+
+except ImportError:
+    ORJSON_IS_AVAILABLE = False
+
 SEPARATORS = (',', ':')
+BACKENDS = ('auto', 'json', 'orjson')
+
+_backend = 'orjson' if ORJSON_IS_AVAILABLE else 'json'
+
+# the values of the protocol enums. This map gets filled by lona.protocol,
+# to avoid import loops
+ENUM_VALUES = {}
 
 
 def default(value):
     # this function does not use isinstance() to avoid import loops
+    # orjson encodes enums natively, so it calls this function only for the
+    # other types
 
     if isinstance(value, Enum):
-        return value.value
+        try:
+            return ENUM_VALUES[value]
+
+        except KeyError:
+            return value.value
 
     if value.__class__.__name__ in ('WidgetData', 'Overlay', 'State'):
         return value._data
@@ -16,5 +37,54 @@ def default(value):
     raise TypeError
 
 
+def get_backend():
+    return _backend
+
+
+def set_backend(name):
+    """
+    Sets the JSON backend: 'json', 'orjson' or 'auto'.
+
+    orjson encodes NaN and Infinity as null, and encodes dataclasses,
+    datetimes, dates, times and UUIDs natively. The json module encodes
+    NaN and Infinity as invalid JSON, and raises a TypeError for the other
+    types. Switching backends may therefore change what gets sent to the
+    client.
+    """
+
+    global _backend
+
+    if name not in BACKENDS:
+        raise ValueError(f'unknown json backend: {name!r}')
+
+    if name == 'auto':
+        name = 'orjson' if ORJSON_IS_AVAILABLE else 'json'
+
+    if name == 'orjson' and not ORJSON_IS_AVAILABLE:
+        raise RuntimeError('json backend orjson is not installed')
+
+    _backend = name
+
+
 def dumps(*args, default=default, separators=SEPARATORS, **kwargs):
+    # orjson has no formatting options, so calls that use them always use
+    # the json module
+
+    if (_backend == 'orjson' and
+            len(args) == 1 and
+            separators is SEPARATORS and
+            not kwargs):
+
+        try:
+            return orjson.dumps(
+                args[0],
+                default=default,
+                option=orjson.OPT_NON_STR_KEYS,
+            ).decode()
+
+        except orjson.JSONEncodeError:
+            # values that orjson does not support, like integers bigger than
+            # 64 bit, get encoded by the json module
+            pass
+
     return json.dumps(*args, default=default, separators=separators, **kwargs)
@@ -0,0 +1,296 @@
+from struct import unpack_from, pack
+from enum import Enum
+
+from lona._json import default as json_default
+
+try:
+    import msgpack
+
+    MSGPACK_IS_AVAILABLE = True
+
+except ImportError:
+    MSGPACK_IS_AVAILABLE = False
+
+
+def default(value):
+    # enums, widget data and state objects get lowered like in lona._json,
+    # subclasses of native types get packed as their base type
+
+    try:
+        return json_default(value)
+
+    except TypeError:
+        pass
+
+    for native_type in (int, float, str, bytes, list, tuple, dict):
+        if isinstance(value, native_type):
+            return native_type(value)
+
+    raise TypeError(f'unsupported type: {type(value)!r}')
+
+
+# pure python encoder #########################################################
+def _pack_int(value, buffer):
+    if 0 <= value < 0x80:
+        buffer.append(value)
+
+    elif -0x20 <= value < 0:
+        buffer.append(value & 0xff)
+
+    elif value >= 0:
+        if value < 0x100:
+            buffer += pack('>BB', 0xcc, value)
+
+        elif value < 0x10000:
+            buffer += pack('>BH', 0xcd, value)
+
+        elif value < 0x100000000:
+            buffer += pack('>BI', 0xce, value)
+
+        elif value < 0x10000000000000000:
+            buffer += pack('>BQ', 0xcf, value)
+
+        else:
+            raise OverflowError('int too big to pack')
+
+    elif value >= -0x80:
+        buffer += pack('>Bb', 0xd0, value)
+
+    elif value >= -0x8000:
+        buffer += pack('>Bh', 0xd1, value)
+
+    elif value >= -0x80000000:
+        buffer += pack('>Bi', 0xd2, value)
+
+    elif value >= -0x8000000000000000:
+        buffer += pack('>Bq', 0xd3, value)
+
+    else:
+        raise OverflowError('int too small to pack')
+
+
+def _pack_header(length, fix_type, fix_limit, type_8, type_16, type_32,
+                 buffer):
+
+    if length < fix_limit:
+        buffer.append(fix_type | length)
+
+    elif type_8 and length < 0x100:
+        buffer += pack('>BB', type_8, length)
+
+    elif length < 0x10000:
+        buffer += pack('>BH', type_16, length)
+
+    else:
+        buffer += pack('>BI', type_32, length)
+
+
+def _pack(value, buffer):
+    # the most common cases (small ints, short strings, small lists and
+    # enums) are handled inline, to avoid function calls
+
+    value_type = type(value)
+
+    if value_type is int:
+        if 0 <= value < 0x80:
+            buffer.append(value)
+
+        else:
+            _pack_int(value, buffer)
+
+    elif value_type is str:
+        data = value.encode()
+        length = len(data)
+
+        if length < 32:
+            buffer.append(0xa0 | length)
+
+        else:
+            _pack_header(length, 0xa0, 32, 0xd9, 0xda, 0xdb, buffer)
+
+        buffer += data
+
+    elif value_type is list or value_type is tuple:
+        length = len(value)
+
+        if length < 16:
+            buffer.append(0x90 | length)
+
+        else:
+            _pack_header(length, 0x90, 16, 0, 0xdc, 0xdd, buffer)
+
+        for item in value:
+            _pack(item, buffer)
+
+    elif value is None:
+        buffer.append(0xc0)
+
+    elif value is True:
+        buffer.append(0xc3)
+
+    elif value is False:
+        buffer.append(0xc2)
+
+    elif value_type is dict:
+        _pack_header(len(value), 0x80, 16, 0, 0xde, 0xdf, buffer)
+
+        for key, item in value.items():
+            _pack(key, buffer)
+            _pack(item, buffer)
+
+    elif value_type is float:
+        buffer += pack('>Bd', 0xcb, value)
+
+    elif value_type is bytes:
+        _pack_header(len(value), 0, 0, 0xc4, 0xc5, 0xc6, buffer)
+        buffer += value
+
+    elif isinstance(value, Enum):
+        _pack(value.value, buffer)
+
+    else:
+        _pack(default(value), buffer)
+
+
+def _packb(value):
+    buffer = bytearray()
+
+    _pack(value, buffer)
+
+    return bytes(buffer)
+
+
+# pure python decoder #########################################################
+_FIXED_FORMATS = {
+    0xca: ('>f', 4),
+    0xcb: ('>d', 8),
+    0xcc: ('>B', 1),
+    0xcd: ('>H', 2),
+    0xce: ('>I', 4),
+    0xcf: ('>Q', 8),
+    0xd0: ('>b', 1),
+    0xd1: ('>h', 2),
+    0xd2: ('>i', 4),
+    0xd3: ('>q', 8),
+}
+
+_LENGTH_FORMATS = {
+    0xc4: ('>B', 1),
+    0xc5: ('>H', 2),
+    0xc6: ('>I', 4),
+    0xd9: ('>B', 1),
+    0xda: ('>H', 2),
+    0xdb: ('>I', 4),
+    0xdc: ('>H', 2),
+    0xdd: ('>I', 4),
+    0xde: ('>H', 2),
+    0xdf: ('>I', 4),
+}
+
+
+def _unpack(data, offset):
+    # returns: (value, offset)
+
+    byte = data[offset]
+    offset += 1
+
+    # fix types
+    if byte < 0x80:
+        return byte, offset
+
+    if byte >= 0xe0:
+        return byte - 0x100, offset
+
+    if 0xa0 <= byte <= 0xbf:
+        end = offset + (byte & 0x1f)
+
+        return data[offset:end].decode(), end
+
+    if 0x90 <= byte <= 0x9f:
+        return _unpack_array(data, offset, byte & 0x0f)
+
+    if 0x80 <= byte <= 0x8f:
+        return _unpack_map(data, offset, byte & 0x0f)
+
+    # constants
+    if byte == 0xc0:
+        return None, offset
+
+    if byte == 0xc2:
+        return False, offset
+
+    if byte == 0xc3:
+        return True, offset
+
+    # numbers
+    if byte in _FIXED_FORMATS:
+        format_string, size = _FIXED_FORMATS[byte]
+
+        return unpack_from(format_string, data, offset)[0], offset + size
+
+    # variable length types
+    if byte not in _LENGTH_FORMATS:
+        raise ValueError(f'unsupported msgpack type: 0x{byte:02x}')
+
+    format_string, size = _LENGTH_FORMATS[byte]
+    length = unpack_from(format_string, data, offset)[0]
+    offset += size
+
+    if byte in (0xdc, 0xdd):
+        return _unpack_array(data, offset, length)
+
+    if byte in (0xde, 0xdf):
+        return _unpack_map(data, offset, length)
+
+    end = offset + length
+    value = data[offset:end]
+
+    if byte in (0xd9, 0xda, 0xdb):
+        return value.decode(), end
+
+    return bytes(value), end
+
+
+def _unpack_array(data, offset, length):
+    array = []
+
+    for _ in range(length):
+        value, offset = _unpack(data, offset)
+        array.append(value)
+
+    return array, offset
+
+
+def _unpack_map(data, offset, length):
+    _map = {}
+
+    for _ in range(length):
+        key, offset = _unpack(data, offset)
+        value, offset = _unpack(data, offset)
+        _map[key] = value
+
+    return _map, offset
+
+
+def _unpackb(data):
+    value, offset = _unpack(data, 0)
+
+    if offset != len(data):
+        raise ValueError('extra data after msgpack object')
+
+    return value
+
+
+# public api ##################################################################
+def packb(value):
+    if MSGPACK_IS_AVAILABLE:
+        return msgpack.packb(value, default=default, use_bin_type=True)
+
+    return _packb(value)
+
+
+def unpackb(data):
+    if MSGPACK_IS_AVAILABLE:
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+    return _unpackb(data)
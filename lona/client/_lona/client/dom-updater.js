@@ -553,6 +553,19 @@ export class LonaDomUpdater {
 
             this._insert_node(node_list, node_id, data[0])
 
+        // INSERT_MULTIPLE
+        } else if(operation == Lona.protocol.OPERATION.INSERT_MULTIPLE) {
+            var node_list = dom_renderer._render_nodes(data[1]);
+
+            this._insert_node(node_list, node_id, data[0]);
+
+        // MOVE
+        } else if(operation == Lona.protocol.OPERATION.MOVE) {
+            var node = this.lona_window._nodes[data[1]];
+
+            node.remove();
+            this._insert_node([node], node_id, data[0]);
+
         // REMOVE
         } else if(operation == Lona.protocol.OPERATION.REMOVE) {
             this._remove_node(data[0]);
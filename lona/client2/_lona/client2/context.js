@@ -23,6 +23,7 @@ SOFTWARE.
 */
 
 import { LonaWindowShim } from './window-shim.js';
+import { decode_msgpack } from './msgpack.js';
 import { LonaWindow } from './window.js';
 import { Lona } from './lona.js';
 
@@ -194,25 +195,35 @@ export class LonaContext {
         var raw_message = event.data;
         var json_data = undefined;
 
-        console.debug('lona rx <<', raw_message);
+        // binary messages are always lona messages (binary protocol)
+        if(raw_message instanceof ArrayBuffer) {
+            json_data = decode_msgpack(raw_message);
 
-        // all lona messages start with 'lona:'
-        if(!raw_message.startsWith(Lona.protocol.PROTOCOL.MESSAGE_PREFIX)) {
-            return this.lona_context._run_message_handler(raw_message);
-        };
+            console.debug('lona rx <<', json_data);
 
-        // parse json
-        try {
-            raw_message = raw_message.substring(
-                Lona.protocol.PROTOCOL.MESSAGE_PREFIX.length,
-            );
+        } else {
+            console.debug('lona rx <<', raw_message);
+
+            // all lona messages start with 'lona:'
+            if(!raw_message.startsWith(
+                    Lona.protocol.PROTOCOL.MESSAGE_PREFIX)) {
+
+                return this.lona_context._run_message_handler(raw_message);
+            };
+
+            // parse json
+            try {
+                raw_message = raw_message.substring(
+                    Lona.protocol.PROTOCOL.MESSAGE_PREFIX.length,
+                );
 
-            var json_data = JSON.parse(raw_message);
+                json_data = JSON.parse(raw_message);
 
-        } catch {
-            return this.lona_context._run_message_handler(
-                raw_message, json_data);
+            } catch {
+                return this.lona_context._run_message_handler(
+                    raw_message, json_data);
 
+            };
         };
 
         // all lona messages are Arrays
@@ -283,8 +294,16 @@ export class LonaContext {
             protocol = 'wss://';
         }
 
+        // the server picks the binary protocol, if it is enabled
         this._ws = new WebSocket(
-            protocol + window.location.host + window.location.pathname);
+            protocol + window.location.host + window.location.pathname,
+            [
+                Lona.protocol.PROTOCOL.MSGPACK_SUBPROTOCOL,
+                Lona.protocol.PROTOCOL.JSON_SUBPROTOCOL,
+            ],
+        );
+
+        this._ws.binaryType = 'arraybuffer';
 
         this._ws.lona_context = this;
         this._ws.options = options;
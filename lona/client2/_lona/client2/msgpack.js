@@ -0,0 +1,154 @@
+/* MIT License
+
+Copyright (c) 2020 Florian Scherf
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+*/
+
+// minimal MessagePack decoder for messages of the binary protocol
+// (see lona/_msgpack.py)
+
+const text_decoder = new TextDecoder();
+
+
+class MsgpackDecoder {
+    constructor(array_buffer) {
+        this.view = new DataView(array_buffer);
+        this.bytes = new Uint8Array(array_buffer);
+        this.offset = 0;
+    };
+
+    read(size) {
+        var offset = this.offset;
+
+        this.offset += size;
+
+        return offset;
+    };
+
+    decode_string(length) {
+        var offset = this.read(length);
+
+        return text_decoder.decode(
+            this.bytes.subarray(offset, offset + length));
+    };
+
+    decode_bytes(length) {
+        var offset = this.read(length);
+
+        return this.bytes.slice(offset, offset + length);
+    };
+
+    decode_array(length) {
+        var array = new Array(length);
+
+        for(let index=0; index<length; index++) {
+            array[index] = this.decode();
+        };
+
+        return array;
+    };
+
+    decode_map(length) {
+        var map = {};
+
+        for(let index=0; index<length; index++) {
+            let key = this.decode();
+
+            map[key] = this.decode();
+        };
+
+        return map;
+    };
+
+    decode() {
+        var view = this.view;
+        var byte = view.getUint8(this.read(1));
+
+        // fix types
+        if(byte < 0x80) {
+            return byte;
+
+        } else if(byte >= 0xe0) {
+            return byte - 0x100;
+
+        } else if(byte >= 0xa0 && byte <= 0xbf) {
+            return this.decode_string(byte & 0x1f);
+
+        } else if(byte >= 0x90 && byte <= 0x9f) {
+            return this.decode_array(byte & 0x0f);
+
+        } else if(byte >= 0x80 && byte <= 0x8f) {
+            return this.decode_map(byte & 0x0f);
+
+        };
+
+        switch(byte) {
+            // constants
+            case 0xc0: return null;
+            case 0xc2: return false;
+            case 0xc3: return true;
+
+            // numbers
+            case 0xca: return view.getFloat32(this.read(4));
+            case 0xcb: return view.getFloat64(this.read(8));
+            case 0xcc: return view.getUint8(this.read(1));
+            case 0xcd: return view.getUint16(this.read(2));
+            case 0xce: return view.getUint32(this.read(4));
+            case 0xcf: return Number(view.getBigUint64(this.read(8)));
+            case 0xd0: return view.getInt8(this.read(1));
+            case 0xd1: return view.getInt16(this.read(2));
+            case 0xd2: return view.getInt32(this.read(4));
+            case 0xd3: return Number(view.getBigInt64(this.read(8)));
+
+            // strings
+            case 0xd9: return this.decode_string(view.getUint8(this.read(1)));
+            case 0xda: return this.decode_string(view.getUint16(this.read(2)));
+            case 0xdb: return this.decode_string(view.getUint32(this.read(4)));
+
+            // binary data
+            case 0xc4: return this.decode_bytes(view.getUint8(this.read(1)));
+            case 0xc5: return this.decode_bytes(view.getUint16(this.read(2)));
+            case 0xc6: return this.decode_bytes(view.getUint32(this.read(4)));
+
+            // arrays
+            case 0xdc: return this.decode_array(view.getUint16(this.read(2)));
+            case 0xdd: return this.decode_array(view.getUint32(this.read(4)));
+
+            // maps
+            case 0xde: return this.decode_map(view.getUint16(this.read(2)));
+            case 0xdf: return this.decode_map(view.getUint32(this.read(4)));
+        };
+
+        throw new Error('unsupported msgpack type: 0x' + byte.toString(16));
+    };
+};
+
+
+export function decode_msgpack(array_buffer) {
+    var decoder = new MsgpackDecoder(array_buffer);
+    var value = decoder.decode();
+
+    if(decoder.offset != array_buffer.byteLength) {
+        throw new Error('extra data after msgpack object');
+    };
+
+    return value;
+};
@@ -517,6 +517,23 @@ export class LonaRenderingEngine {
 
             this._insert_node(node, node_id, data[0])
 
+        // INSERT_MULTIPLE
+        } else if(operation == Lona.protocol.OPERATION.INSERT_MULTIPLE) {
+            const fragment = document.createDocumentFragment();
+
+            data[1].forEach(node_spec => {
+                fragment.appendChild(this._render_node(node_spec));
+            });
+
+            this._insert_node(fragment, node_id, data[0]);
+
+        // MOVE
+        } else if(operation == Lona.protocol.OPERATION.MOVE) {
+            const node = this._get_node(data[1]);
+
+            node.remove();
+            this._insert_node(node, node_id, data[0]);
+
         // REMOVE
         } else if(operation == Lona.protocol.OPERATION.REMOVE) {
             this._remove_node(data[0]);
@@ -1,4 +1,17 @@
-import contextlib
+from concurrent.futures import Future
+from collections import deque
+import threading
+import logging
+import asyncio
+import time
+
+from lona.protocol import PROTOCOL
+
+logger = logging.getLogger('lona.server.websockets')
+
+# marks resyncs that wait for the next html update of their window, or for
+# the outbound queue to drain again
+DEFERRED_RESYNC = object()
 
 
 class NotInteractiveError(Exception):
@@ -11,6 +24,34 @@ class Connection:
         self.http_request = http_request
         self.websocket = websocket
 
+        # set when the client negotiated the binary protocol in the
+        # websocket handshake
+        self.binary = (
+            getattr(websocket, 'ws_protocol', None) ==
+            PROTOCOL.MSGPACK_SUBPROTOCOL.value
+        )
+
+        # outbound queue
+        # messages get sent by a writer task on the server loop, so sending
+        # threads don't have to wait for the websocket
+        # entries: (message, enqueued_at, (resync_key, resync), future)
+        self._outbound_queue = deque()
+        self._outbound_condition = threading.Condition()
+        self._writer_running = False
+        self._closed = False
+
+        # html updates of windows that fell behind get dropped, until a
+        # snapshot of their document was sent
+        # resync keys are mapped to resync functions, None when the resync
+        # is running, or DEFERRED_RESYNC when the resync waits for the next
+        # html update of its window
+        # The resync functions of deferred resyncs get kept, so the writer
+        # can run them again, when the window gets no html updates anymore
+        self._resyncs = {}
+        self._deferred_resyncs = {}
+
+        self.send_latency = 0.0
+
     @property
     def interactive(self):
         return self.websocket is not None
@@ -23,13 +64,307 @@ class Connection:
     def user(self, value):
         self._user = value
 
+    @property
+    def queue_depth(self):
+        return len(self._outbound_queue)
+
+    # outbound queue ##########################################################
+    def _close(self):
+        # pending messages get discarded and waiting threads get released
+
+        with self._outbound_condition:
+            self._closed = True
+
+            for entry in self._outbound_queue:
+                self._resolve(entry[3])
+
+            self._outbound_queue.clear()
+            self._resyncs.clear()
+            self._deferred_resyncs.clear()
+            self._outbound_condition.notify_all()
+
+    def _is_server_loop_running(self):
+        # returns True when called from a coroutine or a callback that runs
+        # on the server loop, which may run in any thread
+
+        try:
+            return asyncio.get_running_loop() is self.server.loop
+
+        except RuntimeError:
+            return False
+
+    def _resolve(self, future):
+        # futures get resolved when their message got written or discarded,
+        # like the futures of Server.run_coroutine_sync() did, when messages
+        # were sent directly
+
+        if future is not None and not future.done():
+            future.set_result(None)
+
+    def _start_writer(self):
+        # has to be called with self._outbound_condition acquired
+
+        if self._writer_running:
+            return
+
+        self._writer_running = True
+
+        asyncio.run_coroutine_threadsafe(
+            self._write_messages(),
+            loop=self.server.loop,
+        )
+
+    def _enqueue(self, message, wait, resync_key=None, resync=None,
+                 future=None):
+
+        max_size = self.server.settings.WEBSOCKET_QUEUE_MAX_SIZE
+
+        # the server loop writes the queued messages and must not block
+        if wait and self._is_server_loop_running():
+            wait = False
+
+        if resync_key is not None:
+            with self._outbound_condition:
+                resync = self._enqueue_html_update(message, resync_key, resync)
+
+            # deferred resyncs take their snapshot in the thread that sends
+            # the html update, while it holds the lock of the document
+            if resync is not None:
+                self._run_resync(resync_key, resync)
+
+            return
+
+        with self._outbound_condition:
+            while (wait and
+                   not self._closed and
+                   len(self._outbound_queue) >= max_size):
+
+                self._outbound_condition.wait()
+
+            # messages to closed connections get discarded, like aiohttp
+            # does for closed websockets
+            if self._closed:
+                self._resolve(future)
+
+                return
+
+            self._outbound_queue.append(
+                (message, time.monotonic(), None, future),
+            )
+
+            self._start_writer()
+
+    def _enqueue_html_update(self, message, resync_key, resync):
+        # has to be called with self._outbound_condition acquired
+        # html updates never block. When the queue reaches the high-water
+        # mark, all pending html updates get dropped, and their windows get
+        # resynced with a snapshot, once the queue drained
+        # Returns the resync function, when a deferred resync has to be run
+
+        high_water_mark = self.server.settings.WEBSOCKET_QUEUE_HIGH_WATER_MARK
+
+        if self._closed:
+            return None
+
+        if resync_key in self._resyncs:
+            pending_resync = self._resyncs[resync_key]
+
+            # deferred resyncs get run now. This html update gets dropped,
+            # because the snapshot contains it
+            if pending_resync is DEFERRED_RESYNC:
+                self._resyncs[resync_key] = None
+                self._deferred_resyncs.pop(resync_key, None)
+
+                return resync
+
+            # the writer starts pending resyncs when the queue is empty
+            if pending_resync is not None:
+                self._start_writer()
+
+            return None
+
+        if len(self._outbound_queue) < high_water_mark:
+            self._outbound_queue.append(
+                (message, time.monotonic(), (resync_key, resync), None),
+            )
+
+            self._start_writer()
+
+            return None
+
+        logger.debug('%s fell behind, dropping html updates', self)
+
+        outbound_queue = deque()
+
+        for entry in self._outbound_queue:
+            if entry[2] is None:
+                outbound_queue.append(entry)
+
+            else:
+                self._resyncs[entry[2][0]] = entry[2][1]
+
+        self._resyncs[resync_key] = resync
+        self._outbound_queue = outbound_queue
+
+        self._outbound_condition.notify_all()
+        self._start_writer()
+
+        return None
+
+    def _start_resyncs(self):
+        # has to be called with self._outbound_condition acquired
+        # deferred resyncs get run again, in case their window gets no html
+        # updates anymore. They get deferred again, if the snapshot still
+        # can't be taken
+
+        for resync_key, resync in list(self._resyncs.items()):
+            if resync is DEFERRED_RESYNC:
+                resync = self._deferred_resyncs.pop(resync_key, None)
+
+            if resync is None:
+                continue
+
+            self._resyncs[resync_key] = None
+
+            self.server.run_function_async(
+                self._run_resync,
+                resync_key,
+                resync,
+            )
+
+    def _run_resync(self, resync_key, resync):
+        try:
+            resync()
+
+        except Exception:
+            logger.exception('exception raised while resyncing %s', self)
+
+            self._finish_resync(resync_key)
+
+            return
+
+        with self._outbound_condition:
+            if self._resyncs.get(resync_key) is DEFERRED_RESYNC:
+                self._deferred_resyncs[resync_key] = resync
+
+    def _finish_resync(self, resync_key, message=None, defer=False):
+        # gets called by resync functions with the snapshot message, while
+        # holding the lock of the document, so no html update can be sent in
+        # between. When the snapshot can't be taken yet, `defer` is set, and
+        # the resync function of the next html update of the window gets
+        # called instead of sending it
+
+        with self._outbound_condition:
+            if self._closed:
+                return
+
+            if defer:
+                self._resyncs[resync_key] = DEFERRED_RESYNC
+
+                return
+
+            self._resyncs.pop(resync_key, None)
+            self._deferred_resyncs.pop(resync_key, None)
+
+            if message is None:
+                return
+
+            self._outbound_queue.append(
+                (message, time.monotonic(), None, None),
+            )
+
+            self._start_writer()
+
+    async def _write_messages(self):
+        # aiohttp only yields to the loop when the write buffer of the
+        # websocket is full, so all queued messages get written in one go
+        # and get flushed together
+
+        while True:
+            with self._outbound_condition:
+                if not self._outbound_queue:
+                    self._writer_running = False
+                    self._start_resyncs()
+
+                    return
+
+                message, enqueued_at, _, future = (
+                    self._outbound_queue.popleft()
+                )
+
+                self._outbound_condition.notify_all()
+
+            try:
+                if isinstance(message, bytes):
+                    await self.websocket.send_bytes(message)
+
+                else:
+                    await self.websocket.send_str(message)
+
+            # this exception gets handled by aiohttp internally and can be
+            # ignored
+            except ConnectionResetError:
+                pass
+
+            except Exception:
+                logger.exception('exception raised while sending a message')
+
+            self._resolve(future)
+            self.send_latency = time.monotonic() - enqueued_at
+
+    # public api ##############################################################
     def send_str(self, string, wait=True):
+        """
+        Queues a string to be sent to the websocket.
+
+        When `wait` is set, the method returns None as soon as the string
+        got queued. When the queue is full, the calling thread blocks until
+        the queue has room again. Calls from the server loop never block.
+
+        When `wait` is not set, the method returns immediately with a
+        `concurrent.futures.Future`, that is done when the string got
+        written to the websocket, or got discarded because the connection
+        was closed.
+        """
+
         if not self.interactive:
             raise NotInteractiveError
 
-        # this exception gets handled by aiohttp internally and can be ignored
-        with contextlib.suppress(ConnectionResetError):
-            return self.server.run_coroutine_sync(
-                self.websocket.send_str(string),
-                wait=wait,
-            )
+        future = None if wait else Future()
+
+        self._enqueue(string, wait=wait, future=future)
+
+        return future
+
+    def send_bytes(self, data, wait=True):
+        if not self.interactive:
+            raise NotInteractiveError
+
+        future = None if wait else Future()
+
+        self._enqueue(data, wait=wait, future=future)
+
+        return future
+
+    def send_message(self, message, wait=True, resync_key=None, resync=None):
+        """
+        Sends a message encoded by lona.protocol, which is bytes when the
+        connection uses the binary protocol.
+
+        HTML updates set `resync_key` and `resync`. They get dropped when
+        the connection fell behind, and `resync` gets called once the queue
+        drained. It has to send a snapshot using
+        `Connection._finish_resync()`, or defer the resync to the next html
+        update of the same `resync_key`. Deferred resyncs also get called
+        again whenever the queue drained, in case no html update follows.
+        """
+
+        if not self.interactive:
+            raise NotInteractiveError
+
+        self._enqueue(
+            message,
+            wait=wait,
+            resync_key=resync_key,
+            resync=resync,
+        )
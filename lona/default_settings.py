@@ -63,6 +63,9 @@ SESSIONS_REUSE = True
 CORE_FRONTEND_VIEW = 'lona.default_views.FrontendView'
 FRONTEND_VIEW = ''
 INITIAL_SERVER_STATE: dict = {}
+HTML_DIFFING = False
+HTML_FULL_RENDER_RATIO = None
+HTML_COMPACT_NODE_IDS = False
 
 # error views
 CORE_ERROR_403_VIEW = 'lona.default_views.Error403View'
@@ -109,6 +112,10 @@ TEST_INPUT_EVENT_TIMEOUT = False
 
 # server
 AIOHTTP_CLIENT_MAX_SIZE = 1024**2
+WEBSOCKET_BINARY_PROTOCOL = False
+JSON_BACKEND = 'auto'
+WEBSOCKET_QUEUE_MAX_SIZE = 100
+WEBSOCKET_QUEUE_HIGH_WATER_MARK = 50
 
 # buckets
 BUCKETS_URL_PREFIX = '/buckets/'
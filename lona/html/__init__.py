@@ -123,6 +123,7 @@ from lona.html.nodes.document_metadata import (
 )
 from lona.html.nodes.interactive_elements import Summary, Details, Dialog
 from lona.html.nodes.forms.radio_button import RadioButton, RadioGroup
+from lona.html.nodes.shared_nodes import SharedNode, SharedHTML
 from lona.html.nodes.scripting import NoScript, Script, Canvas
 from lona.html.nodes.forms.select2 import Select2, Option2
 from lona.html.nodes.web_components import Template, Slot
@@ -133,6 +134,7 @@ from lona.html.nodes.svg_and_mathml import Math, SVG
 from lona.events.event_types import *  # NOQA: F403
 from lona.html.nodes.sectioning_root import Body
 from lona.html.nodes.raw_nodes import RawHTML
+from lona.html.time_series import TimeSeries
 from lona.html.widgets import HTML as HTML1
 from lona.html.parsing import HTML as HTML2
 from lona.compat import get_client_version
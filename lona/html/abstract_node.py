@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+from contextlib import nullcontext
+
 from lona.unique_ids import generate_unique_id
+from lona.html.selector import get_selector
 from lona.static_files import StaticFile
-from lona.html.selector import Selector
 from lona.protocol import NODE_TYPE
 from lona.state import State
 
@@ -18,16 +20,47 @@ class DummyLock:
 class DummyDocument:
     @property
     def lock(self):
-        return DummyLock()
+        return DUMMY_LOCK
 
     def add_patch(self, *args, **kwargs):
         pass
 
+    def batch(self, node=None):
+        return nullcontext()
+
+
+DUMMY_LOCK = DummyLock()
+DUMMY_DOCUMENT = DummyDocument()
+
+
+def get_hashable_value(value):
+    # returns a hashable representation of JSON like data, that is equal for
+    # equal values
+
+    if isinstance(value, dict):
+        return frozenset(
+            (key, get_hashable_value(item)) for key, item in value.items()
+        )
+
+    if isinstance(value, (list, tuple)):
+        return tuple(get_hashable_value(item) for item in value)
+
+    return value
+
 
 class AbstractNode:
     STATIC_FILES: list[StaticFile] = []
     _subclasses: list[type] = []
 
+    __slots__ = (
+        '_id',
+        '_parent',
+        '_document',
+        '_state',
+        '_serialization_cache',
+        '_content_hash',
+    )
+
     def __init_subclass__(cls, *args, **kwargs):
         super().__init_subclass__(*args, **kwargs)
 
@@ -64,6 +97,10 @@ class AbstractNode:
             return (self.nodes == other.nodes and
                     self.data == other.data)
         # nodes
+        # sub trees with different content hashes can't be equal
+        if self._get_content_hash() != other._get_content_hash():
+            return False
+
         if other.namespace != self.namespace:
             return False
 
@@ -112,49 +149,177 @@ class AbstractNode:
     def _set_parent(self, parent):
         self._parent = parent
 
+        if parent is None:
+            self._propagate_document(None)
+
+        else:
+            self._propagate_document(getattr(parent, '_document', None))
+
     # root ####################################################################
     @property
     def root(self):
         node = self
-        visited_nodes = []
+        visited_nodes = set()
 
         while True:
-            if node.id in visited_nodes:
+            if id(node) in visited_nodes:
                 raise RuntimeError('loop detected')
 
             if node.parent is None:
                 break
 
-            visited_nodes.append(node.id)
+            visited_nodes.add(id(node))
             node = node.parent
 
         return node
 
     # document ################################################################
+    # every node holds a reference to the document of its tree, so
+    # mutations don't have to walk up to the root node to find it.
+    # The reference gets propagated down the sub tree whenever a node gets
+    # mounted into, or unmounted from, a tree or a document.
+
     @property
     def document(self):
-        _document = getattr(self.root, '_document', None)
+        document = getattr(self, '_document', None)
 
-        if not _document:
-            return DummyDocument()
+        if document is None:
+            return DUMMY_DOCUMENT
 
-        return _document
+        return document
 
     def _set_document(self, document):
         if self.parent:
             raise RuntimeError('node is no root node')
 
-        self._document = document
+        self._propagate_document(document)
+
+    def _propagate_document(self, document):
+        if getattr(self, '_document', None) is document:
+            return
+
+        nodes = [self]
+
+        while nodes:
+            node = nodes.pop()
+            old_document = getattr(node, '_document', None)
+
+            if old_document is not None:
+                old_document._remove_from_node_index(node)
+
+            node._document = document
+
+            if document is not None:
+                document._add_to_node_index(node)
+
+            # unset node lists are skipped, so they don't get created
+            node_list = getattr(node, '_nodes', None)
+
+            if node_list:
+                nodes.extend(node_list._nodes)
+
+    # serialization cache #####################################################
+    # nodes cache their serialized representation. A cache gets invalidated
+    # whenever one of the node attributes, or the attributes of one of its
+    # sub nodes, changes. A node can only have a valid cache if all of its
+    # sub nodes have a valid cache, so the invalidation can stop at the first
+    # node that is already invalidated.
+
+    def _invalidate_serialization_cache(self):
+        node = self
+
+        while node is not None:
+
+            # widgets have no cache of their own
+            # TODO: remove in 2.0
+            if node.NODE_TYPE is not NODE_TYPE.WIDGET:
+                if (node._serialization_cache is None and
+                        node._content_hash is None):
+
+                    break
+
+                node._serialization_cache = None
+                node._content_hash = None
+
+            node = node.parent
+
+    # content hashes ##########################################################
+    # nodes cache a hash of their content, including the content hashes of
+    # their sub nodes, so sub trees can be compared without walking them.
+    # Equal sub trees always have equal hashes, but equal hashes don't imply
+    # equal sub trees.
+    # Content hashes get invalidated alongside the serialization cache.
+    # The namespace is not part of the hash because it can be inherited from
+    # the parent node.
+
+    def _get_content_hash(self):
+        content_hash = getattr(self, '_content_hash', None)
+
+        if content_hash is not None:
+            return content_hash
+
+        # the hashes get computed bottom up, without recursion, so deep trees
+        # don't hit the recursion limit
+        content_hashes = {}
+        stack = [(self, False)]
+
+        while stack:
+            node, sub_nodes_hashed = stack.pop()
+
+            if not sub_nodes_hashed:
+                stack.append((node, True))
+
+                # unset node lists are skipped, so they don't get created
+                node_list = getattr(node, '_nodes', None)
+
+                if node_list:
+                    for sub_node in node_list._nodes:
+                        if getattr(sub_node, '_content_hash', None) is None:
+                            stack.append((sub_node, False))
+
+                continue
+
+            content_hash = node._compute_content_hash(content_hashes)
+
+            # widgets have no cache of their own
+            # TODO: remove in 2.0
+            if node.NODE_TYPE is NODE_TYPE.WIDGET:
+                content_hashes[id(node)] = content_hash
+
+            else:
+                node._content_hash = content_hash
+
+        return content_hash
+
+    def _get_sub_node_content_hashes(self, content_hashes):
+        node_list = getattr(self, '_nodes', None)
+
+        if not node_list:
+            return ()
+
+        sub_node_content_hashes = []
+
+        for node in node_list._nodes:
+            content_hash = getattr(node, '_content_hash', None)
+
+            if content_hash is None:
+                content_hash = content_hashes[id(node)]
+
+            sub_node_content_hashes.append(content_hash)
+
+        return tuple(sub_node_content_hashes)
+
+    def _compute_content_hash(self, content_hashes):
+        raise NotImplementedError()
 
     # locking #################################################################
     @property
     def lock(self):
-        document = self.document
-
-        if not document:
-            return DummyLock()
+        return self.document.lock
 
-        return document.lock
+    # batches #################################################################
+    def batch(self):
+        return self.document.batch(node=self)
 
     # state ###################################################################
     @property
@@ -167,6 +332,62 @@ class AbstractNode:
 
         return self._state
 
+    # cloning #################################################################
+    def _clone(self):
+        # returns a copy of this node without sub nodes
+
+        raise NotImplementedError()
+
+    def _finish_clone(self, clone, clones):
+        # gets called for every node of a cloned sub tree, after the whole
+        # sub tree was cloned. `clones` maps the ids of all original nodes to
+        # their clones. Nodes that store mutable custom state can override
+        # this to copy it.
+
+        pass
+
+    def clone(self):
+        """
+        Returns a detached copy of this node and all of its sub nodes, with
+        new node ids. Attributes, classes, styles, widget data and state get
+        copied directly, without running any node constructors.
+
+        Custom attributes of node subclasses get copied shallowly. Custom
+        attributes that reference nodes of the cloned sub tree get pointed
+        to their clones.
+        """
+
+        with self.lock:
+            clone = self._clone()
+            originals = {id(self): self}
+            clones = {id(self): clone}
+            stack = [(self, clone)]
+
+            while stack:
+                node, node_clone = stack.pop()
+                node_list = getattr(node, '_nodes', None)
+
+                if node_list is None:
+                    continue
+
+                nodes = []
+
+                for sub_node in node_list._nodes:
+                    sub_node_clone = sub_node._clone()
+                    sub_node_clone._parent = node_clone
+                    originals[id(sub_node)] = sub_node
+                    clones[id(sub_node)] = sub_node_clone
+
+                    nodes.append(sub_node_clone)
+                    stack.append((sub_node, sub_node_clone))
+
+                node_clone._nodes = node_list._clone(node_clone, nodes)
+
+            for node_id, node in originals.items():
+                node._finish_clone(clones[node_id], clones)
+
+            return clone
+
     # input events ############################################################
     def handle_change(self, input_event):
         return input_event
@@ -200,15 +421,32 @@ class AbstractNode:
         if node is None:
             node = self
 
-        if hasattr(node, 'nodes'):
-            for child in node.nodes:
+        # unset node lists are skipped, so they don't get created
+        nodes = getattr(node, '_nodes', None)
+
+        if not nodes:
+            return
+
+        # the tree gets walked iteratively in document order, using a stack
+        # of iterators, so deep trees don't hit the recursion limit
+        stack = [iter(nodes._nodes)]
+
+        while stack:
+            for child in stack[-1]:
                 yield child
 
-                for sub_child in self.iter_nodes(child):
-                    yield sub_child
+                child_nodes = getattr(child, '_nodes', None)
+
+                if child_nodes is not None and child_nodes._nodes:
+                    stack.append(iter(child_nodes._nodes))
+
+                    break
+
+            else:
+                stack.pop()
 
     def query_selector(self, raw_selector_string):
-        selector = Selector(raw_selector_string)
+        selector = get_selector(raw_selector_string)
 
         with self.lock:
             for node in self.iter_nodes():
@@ -216,7 +454,7 @@ class AbstractNode:
                     return node
 
     def query_selector_all(self, raw_selector_string):
-        selector = Selector(raw_selector_string)
+        selector = get_selector(raw_selector_string)
         nodes = []
 
         with self.lock:
@@ -227,7 +465,7 @@ class AbstractNode:
             return nodes
 
     def closest(self, raw_selector_string):
-        selector = Selector(raw_selector_string)
+        selector = get_selector(raw_selector_string)
 
         with self.lock:
             node = self.parent
@@ -31,9 +31,21 @@ BOOLEAN_ATTRIBUTES = [
 class AttributeDict:
     PATCH_TYPE = PATCH_TYPE.ATTRIBUTES
 
+    __slots__ = ('_node', '_attributes', '_frozen')
+
     def __init__(self, node, *args, **kwargs):
         self._node = node
         self._attributes = dict(*args, **kwargs)
+        self._frozen = False
+
+    def _freeze(self):
+        self._frozen = True
+
+    def _assert_not_frozen(self):
+        if self._frozen:
+            raise RuntimeError(
+                f'Cannot modify frozen {self.__class__.__name__}',
+            )
 
     # dict helper #############################################################
     def keys(self):
@@ -50,12 +62,16 @@ class AttributeDict:
                 f'pop expected at most 2 arguments, got {1 + len(default)}',
             )
 
+        self._assert_not_frozen()
+
         with self._node.lock:
             if default and name not in self._attributes:
                 return default[0]
 
             attribute = self._attributes.pop(name)
 
+            self._node._invalidate_serialization_cache()
+
             self._node.document.add_patch(
                 node_id=self._node.id,
                 patch_type=self.PATCH_TYPE,
@@ -68,12 +84,16 @@ class AttributeDict:
             return attribute
 
     def clear(self):
+        self._assert_not_frozen()
+
         with self._node.lock:
             if not self._attributes:
                 return
 
             self._attributes.clear()
 
+            self._node._invalidate_serialization_cache()
+
             self._node.document.add_patch(
                 node_id=self._node.id,
                 patch_type=self.PATCH_TYPE,
@@ -98,6 +118,8 @@ class AttributeDict:
             return self._attributes[name]
 
     def __setitem__(self, name, value, issuer=None):
+        self._assert_not_frozen()
+
         if not isinstance(value, (int, bool, float, str)):
             raise ValueError(f'unsupported type: {type(value)}')
 
@@ -117,6 +139,8 @@ class AttributeDict:
 
             self._attributes[name] = value
 
+            self._node._invalidate_serialization_cache()
+
             self._node.document.add_patch(
                 node_id=self._node.id,
                 patch_type=self.PATCH_TYPE,
@@ -129,12 +153,16 @@ class AttributeDict:
             )
 
     def __delitem__(self, name, issuer=None):
+        self._assert_not_frozen()
+
         with self._node.lock:
             if name not in self._attributes:
                 return
 
             del self._attributes[name]
 
+            self._node._invalidate_serialization_cache()
+
             self._node.document.add_patch(
                 node_id=self._node.id,
                 patch_type=self.PATCH_TYPE,
@@ -165,7 +193,17 @@ class AttributeDict:
             return bool(self._attributes)
 
     # serialization ###########################################################
+    def _clone(self, node):
+        attribute_dict = self.__class__.__new__(self.__class__)
+        attribute_dict._node = node
+        attribute_dict._attributes = dict(self._attributes)
+        attribute_dict._frozen = self._frozen
+
+        return attribute_dict
+
     def _reset(self, value):
+        self._assert_not_frozen()
+
         if not isinstance(value, dict):
             raise ValueError('unsupported type')
 
@@ -186,6 +224,8 @@ class AttributeDict:
         with self._node.lock:
             self._attributes = value
 
+            self._node._invalidate_serialization_cache()
+
             self._node.document.add_patch(
                 node_id=self._node.id,
                 patch_type=self.PATCH_TYPE,
@@ -233,5 +273,7 @@ class AttributeDict:
 class StyleDict(AttributeDict):
     PATCH_TYPE = PATCH_TYPE.STYLE
 
+    __slots__ = ()
+
     def __repr__(self):
         return f'<StyleDict({self._attributes!r})>'
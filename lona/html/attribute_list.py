@@ -4,12 +4,26 @@ from lona.protocol import PATCH_TYPE, OPERATION
 class AttributeList:
     PATCH_TYPE: PATCH_TYPE
 
+    __slots__ = ('_node', '_attributes', '_frozen')
+
     def __init__(self, node, *args, **kwargs):
         self._node = node
         self._attributes = set(*args, **kwargs)
+        self._frozen = False
+
+    def _freeze(self):
+        self._frozen = True
+
+    def _assert_not_frozen(self):
+        if self._frozen:
+            raise RuntimeError(
+                f'Cannot modify frozen {self.__class__.__name__}',
+            )
 
     # list helper #############################################################
     def add(self, attribute):
+        self._assert_not_frozen()
+
         if not isinstance(attribute, (int, bool, float, str)):
             raise ValueError(f'unsupported type: {type(attribute)}')
 
@@ -19,6 +33,8 @@ class AttributeList:
 
             self._attributes.add(attribute)
 
+            self._node._invalidate_serialization_cache()
+
             self._node.document.add_patch(
                 node_id=self._node.id,
                 patch_type=self.PATCH_TYPE,
@@ -29,12 +45,16 @@ class AttributeList:
             )
 
     def remove(self, attribute):
+        self._assert_not_frozen()
+
         with self._node.lock:
             if attribute not in self._attributes:
                 return
 
             self._attributes.remove(attribute)
 
+            self._node._invalidate_serialization_cache()
+
             self._node.document.add_patch(
                 node_id=self._node.id,
                 patch_type=self.PATCH_TYPE,
@@ -45,12 +65,16 @@ class AttributeList:
             )
 
     def clear(self):
+        self._assert_not_frozen()
+
         with self._node.lock:
             if not self._attributes:
                 return
 
             self._attributes.clear()
 
+            self._node._invalidate_serialization_cache()
+
             self._node.document.add_patch(
                 node_id=self._node.id,
                 patch_type=self.PATCH_TYPE,
@@ -106,7 +130,17 @@ class AttributeList:
             return sorted(self._attributes)
 
     # serialization ###########################################################
+    def _clone(self, node):
+        attribute_list = self.__class__.__new__(self.__class__)
+        attribute_list._node = node
+        attribute_list._attributes = set(self._attributes)
+        attribute_list._frozen = self._frozen
+
+        return attribute_list
+
     def _reset(self, value):
+        self._assert_not_frozen()
+
         if not isinstance(value, list):
             raise ValueError(f'unsupported type: {type(value)}')
 
@@ -117,6 +151,8 @@ class AttributeList:
         with self._node.lock:
             self._attributes = set(value)
 
+            self._node._invalidate_serialization_cache()
+
             self._node.document.add_patch(
                 node_id=self._node.id,
                 patch_type=self.PATCH_TYPE,
@@ -140,6 +176,8 @@ class AttributeList:
 class IDList(AttributeList):
     PATCH_TYPE = PATCH_TYPE.ID_LIST
 
+    __slots__ = ()
+
     def __repr__(self):
         return f'<IDList({self._list!r})>'
 
@@ -147,5 +185,7 @@ class IDList(AttributeList):
 class ClassList(AttributeList):
     PATCH_TYPE = PATCH_TYPE.CLASS_LIST
 
+    __slots__ = ()
+
     def __repr__(self):
         return f'<ClassList({self._list!r})>'
@@ -1,16 +1,63 @@
+from contextlib import contextmanager
 from threading import RLock
+from itertools import count
+import logging
 
+from lona.html.patches import compact_patches, estimate_size, PatchStack
+from lona.protocol import PATCH_TYPE, OPERATION, NODE_TYPE, DATA_TYPE
 from lona.html.abstract_node import AbstractNode
-from lona.html.patches import PatchStack
-from lona.protocol import DATA_TYPE
+
+logger = logging.getLogger('lona.html.document')
+
+
+class BatchEntry:
+    # node of the tree of touched nodes, that gets built when a batch ends
+
+    __slots__ = (
+        'node',
+        'depth',
+        'children',
+        'attribute_patches',
+        'attribute_patches_size',
+        'node_list_patches',
+        'node_list_patches_size',
+        'size',
+        'reset',
+    )
+
+    def __init__(self, node, depth):
+        self.node = node
+        self.depth = depth
+        self.children = []
+        self.attribute_patches = []
+        self.attribute_patches_size = 0
+        self.node_list_patches = []
+        self.node_list_patches_size = 0
+        self.size = 0
+        self.reset = False
 
 
 class Document:
-    def __init__(self):
+    def __init__(
+            self,
+            diffing=False,
+            full_render_ratio=None,
+            compact_node_ids=False,
+    ):
+
         self.title = ''
         self.html = None
+        self.diffing = diffing
+        self.full_render_ratio = full_render_ratio
+        self.compact_node_ids = compact_node_ids
         self._lock = RLock()
         self._patch_stack = PatchStack()
+        self._node_index = {}
+        self._node_ids = count(1)
+        self._batch = None
+
+        # number of patches that were eliminated from the last HTML update
+        self.eliminated_patch_count = 0
 
     @property
     def lock(self):
@@ -23,21 +70,510 @@ class Document:
     def add_patch(self, *args, **kwargs):
         self._patch_stack.add_patch(*args, **kwargs)
 
+    # node index ##############################################################
+    # the node index maps node ids to all nodes that are mounted in the
+    # current HTML tree, so nodes can be looked up without walking the tree.
+    # It gets updated by the nodes themselves whenever they get mounted into,
+    # or unmounted from, this document.
+
+    def _add_to_node_index(self, node):
+        if self.compact_node_ids:
+            node_id = getattr(node, '_id', None)
+
+            if (type(node_id) is not int or
+                    self._node_index.get(node_id, node) is not node):
+
+                self._set_node_id(node, self._generate_node_id())
+
+        self._node_index[node.id] = node
+
+    def _remove_from_node_index(self, node):
+        self._node_index.pop(node.id, None)
+
+        if self._batch is not None:
+            self._batch[2].add(node.id)
+
+    # compact node ids ########################################################
+    # by default, node ids are strings that are unique in the whole process.
+    # When compact node ids are enabled, nodes get small integer ids, that
+    # are unique in this document, when they get mounted. Nodes that were
+    # mounted before keep their id, unless it is taken by another node.
+    # The ids are generated without locking, because documents get changed
+    # only while their lock is held.
+
+    def _generate_node_id(self):
+        while True:
+            node_id = next(self._node_ids)
+
+            if node_id not in self._node_index:
+                return node_id
+
+    def _set_node_id(self, node, node_id):
+        node._id = node_id
+
+        # node ids are part of the serialized nodes of the parent nodes
+        # text nodes have no cache of their own
+        if node.NODE_TYPE is NODE_TYPE.TEXT_NODE:
+            node = node.parent
+
+        if node is not None:
+            node._invalidate_serialization_cache()
+
+    def _assign_node_ids(self, html):
+        nodes = [html]
+
+        while nodes:
+            node = nodes.pop()
+            node_list = getattr(node, '_nodes', None)
+
+            self._set_node_id(node, self._generate_node_id())
+
+            if node_list:
+                nodes.extend(node_list._nodes)
+
+    # batches #################################################################
+    # all patches, that get recorded during a batch, get compared to RESETs
+    # of the touched node lists when the batch ends. Every sub tree, whose
+    # patches are estimated to be bigger than its serialized nodes, gets
+    # replaced by one RESET.
+    # The estimation of a RESET stops as soon as it gets bigger than the
+    # patches it would replace, so big untouched sub trees are cheap.
+
+    @contextmanager
+    def batch(self, node=None):
+        with self.lock:
+
+            # nested batches get flushed by the outermost batch
+            if self._batch is not None:
+                yield
+
+                return
+
+            # node, index of the first patch, unmounted node ids
+            self._batch = (node, len(self._patch_stack.patches), set())
+
+            try:
+                yield
+
+            finally:
+                node, start, unmounted_node_ids = self._batch
+                self._batch = None
+
+                self._flush_batch(node, start, unmounted_node_ids)
+
+    def _get_resettable_node_ids(self, patches, unmounted_node_ids):
+        # nodes, that were unmounted during the batch and got mounted again,
+        # may still be mounted at their old position on the client, or may
+        # be unknown to the client, when the patches of a reset sub tree get
+        # dropped. Therefore only sub trees that contain all patches that
+        # mount, or target, such nodes can be reset.
+        # Returns None if all sub trees can be reset.
+
+        node_ids = None
+        mounted_node_ids = set()
+        target_node_ids = set()
+
+        for patch in patches:
+            for node_id in patch.get_node_ids():
+                if node_id in unmounted_node_ids:
+                    mounted_node_ids.add(node_id)
+                    target_node_ids.add(patch.node_id)
+
+        for patch in patches:
+            if patch.node_id in mounted_node_ids:
+                target_node_ids.add(patch.node_id)
+
+        for target_node_id in target_node_ids:
+            ancestor_node_ids = set()
+            node = self._node_index.get(target_node_id, None)
+
+            while node is not None:
+                ancestor_node_ids.add(node.id)
+                node = node.parent
+
+            if node_ids is None:
+                node_ids = ancestor_node_ids
+
+            else:
+                node_ids &= ancestor_node_ids
+
+        return node_ids
+
+    def _can_reset(self, node, resettable_node_ids):
+        # TODO: remove in 2.0
+        # legacy widgets render their own nodes
+        if node.NODE_TYPE is not NODE_TYPE.NODE:
+            return False
+
+        # nodes with widgets and frozen node lists may render their own
+        # nodes on the client
+        if node.widget or node.nodes._frozen:
+            return False
+
+        return resettable_node_ids is None or node.id in resettable_node_ids
+
+    def _estimate_reset_size(self, node, limit):
+        size = estimate_size([node.id, PATCH_TYPE.NODES, OPERATION.RESET, []])
+
+        for child_node in node.nodes._nodes:
+            if size > limit:
+                break
+
+            size += estimate_size(
+                child_node._serialize(),
+                limit=limit - size,
+            ) + 1
+
+        return size
+
+    def _flush_batch(self, node, start, unmounted_node_ids):
+        root = self.html if node is None else node
+
+        if (not isinstance(root, AbstractNode) or
+                getattr(root, '_document', None) is not self):
+
+            return
+
+        # the patch stack may have been cleared during the batch
+        patches = self._patch_stack.patches
+        start = min(start, len(patches))
+        batch_patches = compact_patches(patches[start:])
+
+        # build a tree of all nodes that were touched by a patch
+        entries = {}  # node id: batch entry
+
+        for index, patch in enumerate(batch_patches):
+            node = self._node_index.get(patch.node_id, None)
+
+            # patches of unmounted nodes and nodes outside of the batch root
+            # are kept as they are
+            path = []
+
+            while node is not None and node is not root:
+                path.append(node)
+                node = node.parent
+
+            if node is None:
+                continue
+
+            path.append(root)
+
+            entry = None
+
+            for depth, node in enumerate(reversed(path)):
+                parent_entry = entry
+                entry = entries.get(node.id, None)
+
+                if entry is None:
+                    entry = BatchEntry(node=node, depth=depth)
+                    entries[node.id] = entry
+
+                    if parent_entry is not None:
+                        parent_entry.children.append(entry)
+
+            size = estimate_size(patch.data)
+
+            if patch.patch_type is PATCH_TYPE.NODES:
+                entry.node_list_patches.append(index)
+                entry.node_list_patches_size += size
+
+            else:
+                entry.attribute_patches.append(index)
+                entry.attribute_patches_size += size
+
+        # find the cheapest combination of patches and RESETs, bottom up
+        resettable_node_ids = None
+
+        if unmounted_node_ids:
+            resettable_node_ids = self._get_resettable_node_ids(
+                patches=batch_patches,
+                unmounted_node_ids=unmounted_node_ids,
+            )
+
+        for entry in sorted(entries.values(), key=lambda e: -e.depth):
+            entry.size = entry.node_list_patches_size
+
+            for child_entry in entry.children:
+                entry.size += child_entry.attribute_patches_size
+                entry.size += child_entry.size
+
+            if (not entry.size or
+                    not self._can_reset(entry.node, resettable_node_ids)):
+
+                continue
+
+            reset_size = self._estimate_reset_size(
+                node=entry.node,
+                limit=entry.size,
+            )
+
+            if reset_size < entry.size:
+                entry.size = reset_size
+                entry.reset = True
+
+        # replace the patches of all reset sub trees
+        dropped_patches = set()
+        reset_nodes = []
+        entry_stack = [entries[root.id]] if root.id in entries else []
+
+        while entry_stack:
+            entry = entry_stack.pop()
+
+            if not entry.reset:
+                entry_stack.extend(entry.children)
+
+                continue
+
+            reset_nodes.append(entry.node)
+            dropped_patches.update(entry.node_list_patches)
+            sub_entry_stack = list(entry.children)
+
+            while sub_entry_stack:
+                sub_entry = sub_entry_stack.pop()
+
+                dropped_patches.update(sub_entry.attribute_patches)
+                dropped_patches.update(sub_entry.node_list_patches)
+                sub_entry_stack.extend(sub_entry.children)
+
+        self._patch_stack.patches = [
+            *patches[:start],
+            *[patch for index, patch in enumerate(batch_patches)
+              if index not in dropped_patches],
+        ]
+
+        for node in reset_nodes:
+            self.add_patch(
+                node_id=node.id,
+                patch_type=PATCH_TYPE.NODES,
+                operation=OPERATION.RESET,
+                payload=[
+                    [child_node._serialize()
+                     for child_node in node.nodes._nodes],
+                ],
+            )
+
+    # diffing #################################################################
+    # when diffing is enabled, and a new HTML tree gets applied, the new tree
+    # gets compared to the old one and only the differences get sent to the
+    # client. Nodes that match their counterpart in the old tree, adopt its
+    # node id, so the client can reuse the already rendered node.
+
+    def _nodes_match(self, old_data, new_data):
+        # TODO: remove in 2.0
+        # legacy widgets are rendered as ranges of nodes by client1 and
+        # never get reused
+        if (old_data[0] is not new_data[0] or
+                old_data[0] is NODE_TYPE.WIDGET):
+
+            return False
+
+        if old_data[0] is NODE_TYPE.TEXT_NODE:
+            return old_data[2] == new_data[2]
+
+        # namespace, tag name and widget class
+        return (
+            old_data[2] == new_data[2] and
+            old_data[3] == new_data[3] and
+            old_data[9] == new_data[9]
+        )
+
+    def _diff(self, old_html, new_html):
+        # returns False if the new tree can't be diffed against the old one
+
+        # the new nodes get their ids before they get serialized, because
+        # they can't be renamed after they were sent
+        if self.compact_node_ids:
+            self._assign_node_ids(new_html)
+
+        old_data = old_html._serialize()
+        new_data = new_html._serialize()
+
+        if not self._nodes_match(old_data, new_data):
+            return False
+
+        stack = [(old_html, new_html, old_data, new_data)]
+
+        while stack:
+            old_node, new_node, old_data, new_data = stack.pop()
+
+            # the serialized data of the new tree may be part of pending
+            # patches, so it must not be changed. The adopted node id gets
+            # set on the node, which invalidates its serialization cache
+            node_id = old_data[1]
+
+            self._set_node_id(new_node, node_id)
+
+            if old_data[0] is NODE_TYPE.TEXT_NODE:
+                continue
+
+            # attributes
+            for patch_type, index in ((PATCH_TYPE.ID_LIST, 4),
+                                      (PATCH_TYPE.CLASS_LIST, 5),
+                                      (PATCH_TYPE.STYLE, 6),
+                                      (PATCH_TYPE.ATTRIBUTES, 7)):
+
+                if old_data[index] != new_data[index]:
+                    self.add_patch(
+                        node_id=node_id,
+                        patch_type=patch_type,
+                        operation=OPERATION.RESET,
+                        payload=[
+                            new_data[index],
+                        ],
+                    )
+
+            # widget data
+            if old_data[9] and old_data[10] != new_data[10]:
+                self.add_patch(
+                    node_id=node_id,
+                    patch_type=PATCH_TYPE.WIDGET_DATA,
+                    operation=OPERATION.RESET,
+                    payload=[
+                        [],
+                        new_data[10],
+                    ],
+                )
+
+            # child nodes
+            old_nodes = old_node.nodes._nodes
+            new_nodes = new_node.nodes._nodes
+            old_node_data = old_data[8]
+            new_node_data = new_data[8]
+
+            # frozen node lists may serialize sub nodes that are not part of
+            # their node list, so they get reset as a whole
+            if old_node.nodes._frozen or new_node.nodes._frozen:
+                if old_node_data != new_node_data:
+                    self.add_patch(
+                        node_id=node_id,
+                        patch_type=PATCH_TYPE.NODES,
+                        operation=OPERATION.RESET,
+                        payload=[
+                            new_node_data,
+                        ],
+                    )
+
+                continue
+
+            for index in range(min(len(old_nodes), len(new_nodes))):
+                if self._nodes_match(old_node_data[index],
+                                     new_node_data[index]):
+
+                    stack.append((
+                        old_nodes[index],
+                        new_nodes[index],
+                        old_node_data[index],
+                        new_node_data[index],
+                    ))
+
+                    continue
+
+                self.add_patch(
+                    node_id=node_id,
+                    patch_type=PATCH_TYPE.NODES,
+                    operation=OPERATION.SET,
+                    payload=[
+                        index,
+                        new_node_data[index],
+                    ],
+                )
+
+            if not new_nodes and old_nodes:
+                self.add_patch(
+                    node_id=node_id,
+                    patch_type=PATCH_TYPE.NODES,
+                    operation=OPERATION.CLEAR,
+                    payload=[],
+                )
+
+            elif len(old_nodes) > len(new_nodes):
+                for data in old_node_data[len(new_nodes):]:
+                    self.add_patch(
+                        node_id=node_id,
+                        patch_type=PATCH_TYPE.NODES,
+                        operation=OPERATION.REMOVE,
+                        payload=[
+                            data[1],
+                        ],
+                    )
+
+            elif len(new_nodes) == len(old_nodes) + 1:
+                self.add_patch(
+                    node_id=node_id,
+                    patch_type=PATCH_TYPE.NODES,
+                    operation=OPERATION.INSERT,
+                    payload=[
+                        len(old_nodes),
+                        new_node_data[-1],
+                    ],
+                )
+
+            elif len(new_nodes) > len(old_nodes):
+                self.add_patch(
+                    node_id=node_id,
+                    patch_type=PATCH_TYPE.NODES,
+                    operation=OPERATION.INSERT_MULTIPLE,
+                    payload=[
+                        len(old_nodes),
+                        new_node_data[len(old_nodes):],
+                    ],
+                )
+
+        return True
+
+    # full render fallback ####################################################
+    # when full_render_ratio is set, and the patches of an update are
+    # estimated to be bigger than the serialized HTML tree times the ratio,
+    # the whole tree gets sent instead.
+    # Patches that were issued by a client (input events) always get sent as
+    # patches, because rerendering the tree would reset the state of the
+    # issuing input on the client.
+
+    def _should_render_html_tree(self, patches):
+        if self.full_render_ratio is None:
+            return False
+
+        patches_size = 0
+
+        for patch in patches:
+            if patch.issuer:
+                return False
+
+            patches_size += estimate_size(patch.data)
+
+        limit = patches_size / self.full_render_ratio
+
+        html_tree_size = estimate_size(
+            self.html._serialize(),
+            limit=limit,
+        )
+
+        if html_tree_size >= limit:
+            return False
+
+        logger.debug(
+            'sending HTML tree instead of %s patches (estimated size: %s '
+            'instead of %s)',
+            len(patches),
+            html_tree_size,
+            patches_size,
+        )
+
+        return True
+
     # html ####################################################################
     def get_node(self, node_id):
-        node = None
         nodes = []
 
-        with self.lock:
-            if self.html.id == node_id:
-                node = self.html
+        # node ids that come from the client are strings
+        if (self.compact_node_ids and
+                isinstance(node_id, str) and
+                node_id.isdigit()):
 
-            else:
-                for _node in self.html.iter_nodes():
-                    if _node.id == node_id:
-                        node = _node
+            node_id = int(node_id)
 
-                        break
+        with self.lock:
+            node = self._node_index.get(node_id, None)
 
             if node is None:
                 return []
@@ -71,14 +607,37 @@ class Document:
             if not self._patch_stack.has_patches():
                 return self.title, None, None
 
+            self.eliminated_patch_count = self._patch_stack.compact(
+                node_index=self._node_index,
+            )
+
             patches = self._patch_stack.get_patches()
             self._patch_stack.clear()
 
+            if self._should_render_html_tree(patches):
+                return self.title, DATA_TYPE.HTML_TREE, self.html._serialize()
+
             return self.title, DATA_TYPE.HTML_UPDATE, patches
 
+        # HTML diff
+        elif (self.diffing and
+              isinstance(self.html, AbstractNode) and
+              isinstance(html, AbstractNode) and
+              html.parent is None and
+              self._diff(old_html=self.html, new_html=html)):
+
+            self._node_index.clear()
+            self.html._set_document(None)
+            self.html = html
+            self.html._set_document(self)
+
+            return self.apply(title=title, html=html)
+
         # HTML
         else:
             self._patch_stack.clear()
+            self._node_index.clear()
+            self._node_ids = count(1)
 
             if isinstance(self.html, AbstractNode):
                 self.html._set_document(None)
@@ -1,14 +1,16 @@
 from __future__ import annotations
 
 from collections.abc import Iterable
+from copy import deepcopy, copy
 from textwrap import indent
 
+from lona.html.abstract_node import get_hashable_value, AbstractNode
+from lona.html.widget_data import get_initial_data, WidgetData
 from lona.html.attribute_dict import AttributeDict, StyleDict
 from lona.html.attribute_list import ClassList, IDList
 from lona.html.node_event_list import NodeEventList
 from lona.events import ChangeEventType, EventType
-from lona.html.abstract_node import AbstractNode
-from lona.html.widget_data import WidgetData
+from lona.html.rendering import render_html
 from lona.html.node_list import NodeList
 from lona.protocol import NODE_TYPE
 from lona.html.widget import Widget
@@ -46,6 +48,24 @@ class Node(AbstractNode):
     WIDGET: str = ''
     WIDGET_DATA: dict | list = {}
 
+    # node attributes get stored in slots and all attribute containers get
+    # created on first access, to keep the memory footprint of big node trees
+    # small. Subclasses still have a __dict__ for custom attributes.
+    __slots__ = (
+        '_id_list',
+        '_class_list',
+        '_style',
+        '_attributes',
+        '_nodes',
+        '_events',
+        '_widget',
+        '_widget_data',
+        '_namespace',
+        '_tag_name',
+        'self_closing_tag',
+        '__dict__',
+    )
+
     def __init__(
             self,
             *args,
@@ -57,18 +77,25 @@ class Node(AbstractNode):
             **kwargs,
     ):
 
-        self._id_list = IDList(self, self.ID_LIST)
-        self._class_list = ClassList(self, self.CLASS_LIST)
-        self._style = StyleDict(self, self.STYLE)
-        self._attributes = AttributeDict(self, self.ATTRIBUTES)
-        self._nodes = NodeList(self)
-        self._events = NodeEventList(self, self.EVENTS)
+        self._parent = None
+        self._document = None
+        self._serialization_cache = None
+        self._content_hash = None
+        self._id_list = None
+        self._class_list = None
+        self._style = None
+        self._attributes = None
+        self._nodes = None
+        self._events = None
         self._widget = widget or self.WIDGET
+        self._widget_data = None
+
+        if widget_data:
+            self._widget_data = WidgetData(widget=self, value=widget_data)
 
-        self._widget_data = WidgetData(
-            widget=self,
-            value=widget_data or self.WIDGET_DATA,
-        )
+        # events are stored in the node attributes
+        if self.EVENTS:
+            self._events = NodeEventList(self, self.EVENTS)
 
         # tag overrides
         self._namespace = namespace or self.NAMESPACE
@@ -81,16 +108,20 @@ class Node(AbstractNode):
             self.self_closing_tag = self_closing_tag
 
         # args (nodes)
+        nodes = []
+
         for arg in args:
             if isinstance(arg, (AbstractNode, str)):
-                self.append(arg)
+                nodes.append(arg)
 
             elif isinstance(arg, Iterable):
-                for node in list(arg):
-                    self.append(node)
+                nodes.extend(arg)
 
             else:
-                self.append(arg)
+                nodes.append(arg)
+
+        if nodes:
+            self.nodes.extend(nodes)
 
         # kwargs (attributes)
         for name, value in kwargs.items():
@@ -118,7 +149,7 @@ class Node(AbstractNode):
                 if isinstance(value, str):
                     value = value.split(' ')
 
-                self._id_list.extend(value)
+                self.id_list.extend(value)
 
             elif name == 'class':
                 if not isinstance(value, (str, list)):
@@ -129,7 +160,7 @@ class Node(AbstractNode):
                 if isinstance(value, str):
                     value = value.split(' ')
 
-                self._class_list.extend(value)
+                self.class_list.extend(value)
 
             elif name == 'style':
                 if not isinstance(value, (dict, str)):
@@ -138,25 +169,25 @@ class Node(AbstractNode):
                 if isinstance(value, str):
                     value = parse_style_string(value)
 
-                self._style.update(value)
+                self.style.update(value)
 
             elif name == 'attributes':
                 if not isinstance(value, dict):
                     raise ValueError('attributes has to be dict')
 
-                self._attributes.update(value)
+                self.attributes.update(value)
 
             elif name == 'events':
                 if not isinstance(value, list):
                     raise ValueError('events have to be list')
 
-                self._events.extend(value)
+                self.events.extend(value)
 
             elif name == 'nodes':
                 if not isinstance(value, list):
                     value = [value]
 
-                self._nodes._reset(value)
+                self.nodes._reset(value)
 
             elif name == 'handle-change':  # '_' was replaced to '-' above
                 if not callable(value):
@@ -190,7 +221,7 @@ class Node(AbstractNode):
 
             # misc attributes
             else:
-                self._attributes[name] = value
+                self.attributes[name] = value
 
     # node attributes  ########################################################
     # read-only
@@ -229,77 +260,115 @@ class Node(AbstractNode):
     # id_list
     @property
     def id_list(self):
+        if self._id_list is None:
+            with self.lock:
+                if self._id_list is None:
+                    self._id_list = IDList(self, self.ID_LIST)
+
         return self._id_list
 
     @id_list.setter
     def id_list(self, value):
-        self._id_list._reset(value)
+        self.id_list._reset(value)
 
     # class_list
     @property
     def class_list(self):
+        if self._class_list is None:
+            with self.lock:
+                if self._class_list is None:
+                    self._class_list = ClassList(self, self.CLASS_LIST)
+
         return self._class_list
 
     @class_list.setter
     def class_list(self, value):
-        self._class_list._reset(value)
+        self.class_list._reset(value)
 
     # style
     @property
     def style(self):
+        if self._style is None:
+            with self.lock:
+                if self._style is None:
+                    self._style = StyleDict(self, self.STYLE)
+
         return self._style
 
     @style.setter
     def style(self, value):
-        self._style._reset(value)
+        self.style._reset(value)
 
     # attributes
     @property
     def attributes(self):
+        if self._attributes is None:
+            with self.lock:
+                if self._attributes is None:
+                    self._attributes = AttributeDict(self, self.ATTRIBUTES)
+
         return self._attributes
 
     @attributes.setter
     def attributes(self, value):
-        self._attributes._reset(value)
+        self.attributes._reset(value)
 
     # events
     @property
     def events(self):
+        if self._events is None:
+            with self.lock:
+                if self._events is None:
+                    self._events = NodeEventList(self, self.EVENTS)
+
         return self._events
 
     @events.setter
     def events(self, value):
-        self._events._reset(value)
+        self.events._reset(value)
 
     # nodes
     @property
     def nodes(self):
+        if self._nodes is None:
+            with self.lock:
+                if self._nodes is None:
+                    self._nodes = NodeList(self)
+
         return self._nodes
 
     @nodes.setter
     def nodes(self, value):
-        self._nodes._reset(value)
+        self.nodes._reset(value)
 
     # widget_data
     @property
     def widget_data(self):
+        if self._widget_data is None:
+            with self.lock:
+                if self._widget_data is None:
+                    self._widget_data = WidgetData(
+                        widget=self,
+                        value=self.WIDGET_DATA,
+                    )
+
         return self._widget_data
 
     @widget_data.setter
     def widget_data(self, value):
-        self._widget_data._reset(value)
+        self.widget_data._reset(value)
 
     # lona attribute helper ###################################################
     def has_class(self, class_name):
-        return class_name in self._class_list
+        return class_name in self.class_list
 
     def has_id(self, id_name):
-        return id_name in self._id_list
+        return id_name in self.id_list
 
     # lona attributes #########################################################
     @property
     def ignore(self):
-        return 'data-lona-ignore' in self._attributes
+        return 'data-lona-ignore' in self.attributes
 
     @ignore.setter
     def ignore(self, value):
@@ -307,28 +376,120 @@ class Node(AbstractNode):
             raise TypeError('ignore is a boolean property')
 
         if value:
-            self._attributes['data-lona-ignore'] = ''
+            self.attributes['data-lona-ignore'] = ''
 
         else:
-            del self._attributes['data-lona-ignore']
+            del self.attributes['data-lona-ignore']
+
+    # cloning #################################################################
+    def _clone(self):
+        node = self.__class__.__new__(self.__class__)
+
+        # custom attributes of subclasses
+        node.__dict__.update(self.__dict__)
+
+        node._parent = None
+        node._document = None
+        node._serialization_cache = None
+        node._content_hash = None
+        node._id_list = None
+        node._class_list = None
+        node._style = None
+        node._attributes = None
+        node._nodes = None
+        node._events = None
+        node._widget = self._widget
+        node._widget_data = None
+        node._namespace = self._namespace
+        node._tag_name = self._tag_name
+        node.self_closing_tag = self.self_closing_tag
+
+        if self._id_list is not None:
+            node._id_list = self._id_list._clone(node)
+
+        if self._class_list is not None:
+            node._class_list = self._class_list._clone(node)
+
+        if self._style is not None:
+            node._style = self._style._clone(node)
+
+        if self._attributes is not None:
+            node._attributes = self._attributes._clone(node)
+
+        if self._events is not None:
+            node._events = self._events._clone(node)
+
+        if self._widget_data is not None:
+            node._widget_data = self._widget_data._clone(node)
+
+        if hasattr(self, '_state'):
+            node._state = State(
+                initial_data=copy(self._state._data),
+                node=node,
+            )
+
+        return node
+
+    def _finish_clone(self, clone, clones):
+        # custom attributes that reference nodes of the cloned sub tree get
+        # pointed to their clones
+        for name, value in clone.__dict__.items():
+            if isinstance(value, AbstractNode) and id(value) in clones:
+                clone.__dict__[name] = clones[id(value)]
 
     # serialization ###########################################################
     def _serialize(self, include_node_ids=True):
+        namespace = self.namespace
+
+        # the namespace is part of the cache key because it can be inherited
+        # from the parent node, which might have changed in the meantime
+        if (include_node_ids and
+                self._serialization_cache is not None and
+                self._serialization_cache[0] == namespace):
+
+            return self._serialization_cache[1]
+
+        # attribute containers that were not created yet, are serialized
+        # from the class defaults
+        id_list = sorted(set(self.ID_LIST))
+        class_list = sorted(set(self.CLASS_LIST))
+        style = dict(self.STYLE)
+        attributes = dict(self.ATTRIBUTES)
+        nodes = []
         widget_data = None
 
+        if self._id_list is not None:
+            id_list = self._id_list._serialize()
+
+        if self._class_list is not None:
+            class_list = self._class_list._serialize()
+
+        if self._style is not None:
+            style = self._style._serialize()
+
+        if self._attributes is not None:
+            attributes = self._attributes._serialize()
+
+        if self._nodes is not None:
+            nodes = self._nodes._serialize(include_node_ids=include_node_ids)
+
         if self._widget:
-            widget_data = self._widget_data._serialize()
+            if self._widget_data is not None:
+                widget_data = self._widget_data._serialize()
+
+            else:
+                widget_data = deepcopy(get_initial_data(self.WIDGET_DATA))
 
         data = [
             self.NODE_TYPE,
             self.id,
-            self.namespace,
+            namespace,
             self.tag_name,
-            self._id_list._serialize(),
-            self._class_list._serialize(),
-            self._style._serialize(),
-            self._attributes._serialize(),
-            self._nodes._serialize(include_node_ids=include_node_ids),
+            id_list,
+            class_list,
+            style,
+            attributes,
+            nodes,
             self._widget,
             widget_data,
         ]
@@ -336,14 +497,53 @@ class Node(AbstractNode):
         if not include_node_ids:
             data.pop(1)
 
+        else:
+            self._serialization_cache = (namespace, data)
+
         return data
 
+    def _compute_content_hash(self, content_hashes):
+        # the hash has to be equal for equal nodes (see AbstractNode.__eq__)
+
+        id_list = self.ID_LIST
+        class_list = self.CLASS_LIST
+        style = self.STYLE
+        attributes = self.ATTRIBUTES
+        widget_data = get_initial_data(self.WIDGET_DATA)
+
+        if self._id_list is not None:
+            id_list = self._id_list._attributes
+
+        if self._class_list is not None:
+            class_list = self._class_list._attributes
+
+        if self._style is not None:
+            style = self._style._attributes
+
+        if self._attributes is not None:
+            attributes = self._attributes._attributes
+
+        if self._widget_data is not None:
+            widget_data = self._widget_data._data
+
+        return hash((
+            self.NODE_TYPE,
+            self.tag_name,
+            frozenset(id_list),
+            frozenset(class_list),
+            get_hashable_value(style),
+            get_hashable_value(attributes),
+            self._get_sub_node_content_hashes(content_hashes),
+            self._widget,
+            get_hashable_value(widget_data),
+        ))
+
     # node list helper ########################################################
     def insert(self, index, node):
-        self._nodes.insert(index, node)
+        self.nodes.insert(index, node)
 
     def append(self, node):
-        self._nodes.append(node)
+        self.nodes.append(node)
 
     def remove(self, node=None):
         if not node:
@@ -354,59 +554,91 @@ class Node(AbstractNode):
 
             return
 
-        self._nodes.remove(node)
+        self.nodes.remove(node)
 
     def pop(self, index):
-        return self._nodes.pop(index)
+        return self.nodes.pop(index)
 
     def clear(self):
+        if self._nodes is None:
+            return
+
         self._nodes.clear()
 
     def __getitem__(self, index):
-        return self._nodes[index]
+        return self.nodes[index]
 
     def __setitem__(self, index, value):
-        self._nodes[index] = value
+        self.nodes[index] = value
 
     def __iter__(self):
+        if self._nodes is None:
+            return iter(())
+
         return self._nodes.__iter__()
 
     def __len__(self):
+        if self._nodes is None:
+            return 0
+
         return self._nodes.__len__()
 
     def __bool__(self):
         return True
 
     def __contains__(self, other):
+        if self._nodes is None:
+            return False
+
         return self._nodes.__contains__(other)
 
     # string representation ###################################################
-    def __str__(self, node_string=None, skip_value=False):
-        with self.lock:
-            # opening tag
-            string = f'<{self.tag_name} data-lona-node-id="{self.id}"'
+    def _render_opening_tag(self, skip_value=False):
+        string = [f'<{self.tag_name} data-lona-node-id="{self.id}"']
 
+        # attribute containers that were not created yet, and have no class
+        # defaults, are empty
+        if self._id_list is not None or self.ID_LIST:
             if self.id_list:
-                string += f' id="{self.id_list}"'
+                string.append(f' id="{self.id_list}"')
 
+        if self._class_list is not None or self.CLASS_LIST:
             if self.class_list:
-                string += f' class="{self.class_list}"'
+                string.append(f' class="{self.class_list}"')
 
+        if self._style is not None or self.STYLE:
             if self.style:
-                string += f' style="{self.style.to_sub_attribute_string()}"'
+                string.append(
+                    f' style="{self.style.to_sub_attribute_string()}"',
+                )
 
+        if self._attributes is not None or self.ATTRIBUTES:
             if self.attributes:
-                string += ' '
+                string.append(' ')
 
-                string += self.attributes.to_attribute_string(
-                    skip_value=skip_value,
+                string.append(
+                    self.attributes.to_attribute_string(
+                        skip_value=skip_value,
+                    ),
                 )
 
-            if self.self_closing_tag:
-                string += ' />'
+        if self.self_closing_tag:
+            string.append(' />')
 
-            else:
-                string += '>'
+        else:
+            string.append('>')
+
+        return ''.join(string)
+
+    def _render_closing_tag(self):
+        return f'</{self.tag_name}>'
+
+    def __str__(self, node_string=None, skip_value=False):
+        if node_string is None and not skip_value:
+            return render_html(self)
+
+        with self.lock:
+            string = self._render_opening_tag(skip_value=skip_value)
 
             # nodes
             if node_string:
@@ -414,14 +646,14 @@ class Node(AbstractNode):
                 string += indent(node_string, '  ')
                 string += '\n'
 
-            elif self.nodes:
+            elif self._nodes:
                 string += '\n'
-                string += indent(str(self.nodes), '  ')
+                string += indent(str(self._nodes), '  ')
                 string += '\n'
 
             # closing tag
             if not self.self_closing_tag:
-                string += f'</{self.tag_name}>'
+                string += self._render_closing_tag()
 
             return string
 
@@ -4,6 +4,8 @@ ATTRIBUTE_NAME = 'data-lona-events'
 
 
 class NodeEventList:
+    __slots__ = ('_node', '_event_types')
+
     def __init__(self, node, event_types):
         self._node = node
         self._event_types = copy(event_types)
@@ -13,6 +15,16 @@ class NodeEventList:
     def __repr__(self):
         return f'<NodeEventList({self._event_types})>'
 
+    def _clone(self, node):
+        # the event types are stored in the node attributes too, which get
+        # cloned separately
+
+        node_event_list = self.__class__.__new__(self.__class__)
+        node_event_list._node = node
+        node_event_list._event_types = copy(self._event_types)
+
+        return node_event_list
+
     @property
     def lock(self):
         return self._node.lock
@@ -1,11 +1,77 @@
 from collections.abc import Iterable
 
+from lona.protocol import PATCH_TYPE, OPERATION, NODE_TYPE
 from lona.html.abstract_node import AbstractNode
-from lona.protocol import PATCH_TYPE, OPERATION
 from lona.html.text_node import TextNode
 
 
+def _remove_duplicates(values):
+    # nodes that are passed multiple times end up on their last position
+
+    last_positions = {}
+
+    for position, value in enumerate(values):
+        if isinstance(value, AbstractNode):
+            last_positions[id(value)] = position
+
+    return [
+        value for position, value in enumerate(values)
+        if not isinstance(value, AbstractNode) or
+        last_positions[id(value)] == position
+    ]
+
+
+def _index(nodes, node):
+    # list.index() compares nodes by value, not by identity
+
+    for index, _node in enumerate(nodes):
+        if _node is node:
+            return index
+
+    raise ValueError(f'{node!r} is not in list')
+
+
+def _get_longest_increasing_subsequence(sequence):
+    # returns the positions of the longest increasing subsequence
+
+    tail_positions = []  # position of the smallest tail of each length
+    predecessors = [-1] * len(sequence)
+
+    for position, value in enumerate(sequence):
+        low = 0
+        high = len(tail_positions)
+
+        while low < high:
+            middle = (low + high) // 2
+
+            if sequence[tail_positions[middle]] < value:
+                low = middle + 1
+
+            else:
+                high = middle
+
+        if low > 0:
+            predecessors[position] = tail_positions[low - 1]
+
+        if low == len(tail_positions):
+            tail_positions.append(position)
+
+        else:
+            tail_positions[low] = position
+
+    positions = set()
+    position = tail_positions[-1] if tail_positions else -1
+
+    while position > -1:
+        positions.add(position)
+        position = predecessors[position]
+
+    return positions
+
+
 class NodeList:
+    __slots__ = ('_node', '_nodes', '_frozen')
+
     def __init__(self, node):
         self._node = node
         self._nodes = []
@@ -23,20 +89,34 @@ class NodeList:
         if not isinstance(value, (AbstractNode, str, int, float, bool)):
             raise ValueError(f'unsupported type: {type(value)}')
 
+    def _check_loop(self, node):
+        # a node can not be mounted into itself or into one of its own sub
+        # nodes. Nodes without sub nodes can only be mounted into themselves.
+        if node is self._node or getattr(node, '_nodes', None):
+            parent = self._node
+
+            while parent is not None:
+                if parent is node:
+                    raise RuntimeError('loop detected')
+
+                parent = parent.parent
+
     def _prepare_node(self, node):
         if isinstance(node, (str, int, float, bool)):
             node = TextNode(node)
 
+        self._check_loop(node)
+
         if node.parent:
             node.parent.remove(node)
 
-        if node.root is self._node.root:
-            raise RuntimeError('loop detected')
-
         node._set_parent(self._node)
 
         return node
 
+    def _unmount_node(self, node):
+        node._set_parent(None)
+
     def insert(self, index, value):
         self._assert_not_frozen()
         self._check_value(value)
@@ -48,15 +128,8 @@ class NodeList:
 
             index = self._nodes.index(node)
 
-            self._node.document.add_patch(
-                node_id=self._node.id,
-                patch_type=PATCH_TYPE.NODES,
-                operation=OPERATION.INSERT,
-                payload=[
-                    index,
-                    node._serialize(),
-                ],
-            )
+            self._node._invalidate_serialization_cache()
+            self._add_insert_patch(index, [node])
 
     def append(self, value):
         self._assert_not_frozen()
@@ -69,22 +142,74 @@ class NodeList:
 
             index = len(self._nodes) - 1
 
+            self._node._invalidate_serialization_cache()
+            self._add_insert_patch(index, [node])
+
+    def _add_insert_patch(self, index, nodes):
+        # nodes that are not mounted into a document don't need patches,
+        # so the inserted nodes don't have to be serialized
+        if getattr(self._node, '_document', None) is None:
+            return
+
+        if len(nodes) == 1:
             self._node.document.add_patch(
                 node_id=self._node.id,
                 patch_type=PATCH_TYPE.NODES,
                 operation=OPERATION.INSERT,
                 payload=[
                     index,
-                    node._serialize(),
+                    nodes[0]._serialize(),
                 ],
             )
 
+            return
+
+        self._node.document.add_patch(
+            node_id=self._node.id,
+            patch_type=PATCH_TYPE.NODES,
+            operation=OPERATION.INSERT_MULTIPLE,
+            payload=[
+                index,
+                [node._serialize() for node in nodes],
+            ],
+        )
+
+    def _insert_nodes(self, values, index=None):
+        # inserts multiple nodes at once and issues one patch for all of them.
+        # If no index is given, the nodes get appended.
+
+        values = _remove_duplicates(values)
+
+        # all values get checked before the first one gets mounted, so
+        # this list stays unchanged if one of them would create a loop
+        for value in values:
+            self._check_loop(value)
+
+        # nodes that are already part of this list get removed while
+        # preparing them, so the index has to be calculated afterwards
+        nodes = [self._prepare_node(value) for value in values]
+
+        if not nodes:
+            return
+
+        if index is None:
+            index = len(self._nodes)
+
+        self._nodes[index:index] = nodes
+
+        self._node._invalidate_serialization_cache()
+        self._add_insert_patch(index, nodes)
+
     def extend(self, nodes):
         self._assert_not_frozen()
 
+        nodes = list(nodes)
+
+        for node in nodes:
+            self._check_value(node)
+
         with self._node.lock:
-            for node in nodes:
-                self.append(node)
+            self._insert_nodes(nodes)
 
     def remove(self, node):
         self._assert_not_frozen()
@@ -92,7 +217,9 @@ class NodeList:
         with self._node.lock:
             self._nodes.remove(node)
 
-            node._set_parent(None)
+            self._unmount_node(node)
+
+            self._node._invalidate_serialization_cache()
 
             self._node.document.add_patch(
                 node_id=self._node.id,
@@ -109,7 +236,9 @@ class NodeList:
         with self._node.lock:
             node = self._nodes.pop(index)
 
-            node._set_parent(None)
+            self._unmount_node(node)
+
+            self._node._invalidate_serialization_cache()
 
             self._node.document.add_patch(
                 node_id=self._node.id,
@@ -130,10 +259,12 @@ class NodeList:
                 return
 
             for node in list(self._nodes):
-                node._set_parent(None)
+                self._unmount_node(node)
 
             self._nodes.clear()
 
+            self._node._invalidate_serialization_cache()
+
             self._node.document.add_patch(
                 node_id=self._node.id,
                 patch_type=PATCH_TYPE.NODES,
@@ -149,8 +280,88 @@ class NodeList:
         with self._node.lock:
             return self._nodes[index]
 
+    def _set_slice(self, _slice, values):
+        if isinstance(values, (AbstractNode, str)):
+            values = [values]
+
+        values = list(values)
+
+        for value in values:
+            self._check_value(value)
+
+        with self._node.lock:
+            start, stop, step = _slice.indices(len(self._nodes))
+
+            # extended slices
+            if step != 1:
+                indices = range(start, stop, step)
+
+                if len(values) != len(indices):
+                    raise ValueError(
+                        f'attempt to assign sequence of size {len(values)} to extended slice of size {len(indices)}',  # NOQA: E501
+                    )
+
+                for index, value in zip(indices, values):
+                    self[index] = value
+
+                return
+
+            stop = max(start, stop)
+
+            # the nodes left of the slice, that are not part of the new
+            # values, define the index of the new nodes
+            value_ids = {
+                id(value) for value in values
+                if isinstance(value, AbstractNode)
+            }
+
+            index = len([
+                node for node in self._nodes[:start]
+                if id(node) not in value_ids
+            ])
+
+            for value in values:
+                self._check_loop(value)
+
+            # unmounting old nodes
+            old_nodes = self._nodes[start:stop]
+
+            if old_nodes:
+                del self._nodes[start:stop]
+
+                for node in old_nodes:
+                    self._unmount_node(node)
+
+                self._node._invalidate_serialization_cache()
+
+                if not self._nodes:
+                    self._node.document.add_patch(
+                        node_id=self._node.id,
+                        patch_type=PATCH_TYPE.NODES,
+                        operation=OPERATION.CLEAR,
+                        payload=[],
+                    )
+
+                else:
+                    for node in old_nodes:
+                        self._node.document.add_patch(
+                            node_id=self._node.id,
+                            patch_type=PATCH_TYPE.NODES,
+                            operation=OPERATION.REMOVE,
+                            payload=[
+                                node.id,
+                            ],
+                        )
+
+            # mounting new nodes
+            self._insert_nodes(values, index=index)
+
     def __setitem__(self, index, value):
         self._assert_not_frozen()
+
+        if isinstance(index, slice):
+            return self._set_slice(index, value)
+
         self._check_value(value)
 
         with self._node.lock:
@@ -158,13 +369,15 @@ class NodeList:
             # unmounting old node
             old_node = self._nodes[index]
 
-            old_node._set_parent(None)
+            self._unmount_node(old_node)
 
             # mounting new node
             node = self._prepare_node(value)
 
             self._nodes[index] = node
 
+            self._node._invalidate_serialization_cache()
+
             self._node.document.add_patch(
                 node_id=self._node.id,
                 patch_type=PATCH_TYPE.NODES,
@@ -217,6 +430,17 @@ class NodeList:
             return False
 
     # serialization ###########################################################
+    def _clone(self, node, nodes):
+        # nodes have to be clones of the nodes in this list, which have
+        # `node` set as their parent already
+
+        node_list = self.__class__.__new__(self.__class__)
+        node_list._node = node
+        node_list._nodes = nodes
+        node_list._frozen = self._frozen
+
+        return node_list
+
     def _reset(self, values):
         self._assert_not_frozen()
 
@@ -225,19 +449,35 @@ class NodeList:
 
             values = [values]
 
+        values = list(values)
+
+        for value in values:
+            self._check_value(value)
+
         with self._node.lock:
+
+            # all values get checked before the old nodes get unmounted, so
+            # this list stays unchanged if one of them would create a loop
+            for value in values:
+                self._check_loop(value)
+
+            if self._can_reconcile(values):
+                self._reconcile(values)
+
+                return
+
             for node in self._nodes:
-                node._set_parent(None)
+                self._unmount_node(node)
 
             self._nodes.clear()
 
             for value in values:
-                self._check_value(value)
-
                 node = self._prepare_node(value)
 
                 self._nodes.append(node)
 
+            self._node._invalidate_serialization_cache()
+
             self._node.document.add_patch(
                 node_id=self._node.id,
                 patch_type=PATCH_TYPE.NODES,
@@ -247,6 +487,145 @@ class NodeList:
                 ],
             )
 
+    # reconciliation ##########################################################
+    # when a node list gets reset with a list that contains nodes that are
+    # already part of this list, only the differences get sent to the client
+    # instead of re-rendering all nodes. Nodes are identified by identity.
+
+    def _can_reconcile(self, values):
+        # TODO: remove in 2.0
+        # legacy widgets are rendered as ranges of nodes by client1 and
+        # can't be moved
+        if self._node.NODE_TYPE is NODE_TYPE.WIDGET:
+            return False
+
+        for node in self._nodes:
+            if node.NODE_TYPE is NODE_TYPE.WIDGET:
+                return False
+
+        for value in values:
+            if (isinstance(value, AbstractNode) and
+                    value.NODE_TYPE is NODE_TYPE.WIDGET):
+
+                return False
+
+        # reconciliation is only useful if at least one node gets reused
+        for value in values:
+            if (isinstance(value, AbstractNode) and
+                    value.parent is self._node):
+
+                return True
+
+        return False
+
+    def _reconcile(self, values):
+        values = _remove_duplicates(values)
+
+        new_node_ids = {
+            id(value) for value in values
+            if isinstance(value, AbstractNode)
+        }
+
+        # remove all nodes that are not part of the new nodes
+        nodes = []
+
+        for node in self._nodes:
+            if id(node) in new_node_ids:
+                nodes.append(node)
+
+                continue
+
+            self._unmount_node(node)
+
+            self._node.document.add_patch(
+                node_id=self._node.id,
+                patch_type=PATCH_TYPE.NODES,
+                operation=OPERATION.REMOVE,
+                payload=[
+                    node.id,
+                ],
+            )
+
+        self._nodes = nodes
+
+        # prepare all new nodes
+        positions = {id(node): position for position, node in enumerate(nodes)}
+
+        new_nodes = [
+            value if id(value) in positions else self._prepare_node(value)
+            for value in values
+        ]
+
+        # nodes that are part of the longest increasing subsequence of old
+        # positions keep their place. All other nodes get moved or inserted
+        # from right to left, in front of the nodes that were placed last.
+        reused_nodes = [node for node in new_nodes if id(node) in positions]
+
+        stable_node_ids = {
+            id(reused_nodes[position])
+            for position in _get_longest_increasing_subsequence(
+                [positions[id(node)] for node in reused_nodes],
+            )
+        }
+
+        anchor = None
+        pending_nodes = []
+
+        def get_index():
+            if anchor is None:
+                return len(nodes)
+
+            return _index(nodes, anchor)
+
+        def insert_pending_nodes():
+            nonlocal anchor
+
+            if not pending_nodes:
+                return
+
+            index = get_index()
+
+            nodes[index:index] = pending_nodes
+            anchor = pending_nodes[0]
+
+            self._add_insert_patch(index, list(pending_nodes))
+
+            pending_nodes.clear()
+
+        for node in reversed(new_nodes):
+
+            # new nodes
+            if id(node) not in positions:
+                pending_nodes.insert(0, node)
+
+                continue
+
+            insert_pending_nodes()
+
+            # moved nodes
+            if id(node) not in stable_node_ids:
+                nodes.pop(_index(nodes, node))
+
+                index = get_index()
+
+                nodes.insert(index, node)
+
+                self._node.document.add_patch(
+                    node_id=self._node.id,
+                    patch_type=PATCH_TYPE.NODES,
+                    operation=OPERATION.MOVE,
+                    payload=[
+                        index,
+                        node.id,
+                    ],
+                )
+
+            anchor = node
+
+        insert_pending_nodes()
+
+        self._node._invalidate_serialization_cache()
+
     def _serialize(self, include_node_ids=True):
         return [i._serialize(include_node_ids=include_node_ids)
                 for i in self._nodes]
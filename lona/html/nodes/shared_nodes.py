@@ -0,0 +1,118 @@
+from lona.protocol import NODE_TYPE
+from lona.html.node import Node
+from lona.html import Div
+
+SHARED_NODE_ID_PREFIX = 'shared-'
+
+
+class SharedHTML:
+    """
+    Frozen nodes that can be mounted into any number of documents at the
+    same time, using SharedNode. The nodes get serialized and rendered only
+    once per process, and the result gets reused for every SharedNode.
+
+    The nodes can't be changed after they were shared, and they don't
+    receive input events.
+    """
+
+    def __init__(self, *nodes):
+        self._node = Div(*nodes)
+        self._serialized_nodes = None
+        self._html_string = None
+
+        for node in self._node.iter_nodes():
+            self._set_node_id(node)
+
+        for node in [self._node, *self._node.iter_nodes()]:
+            if not isinstance(node, Node):
+                continue
+
+            node.id_list._freeze()
+            node.class_list._freeze()
+            node.style._freeze()
+            node.attributes._freeze()
+            node.widget_data._freeze()
+            node.nodes._freeze()
+
+    def _set_node_id(self, node):
+        # shared nodes are never part of a node index, so they never get
+        # compact node ids. Their ids get prefixed, so they can't collide
+        # with the integer ids of documents with compact node ids, neither
+        # on the client, nor when input events get routed.
+
+        if str(node.id).startswith(SHARED_NODE_ID_PREFIX):
+            return
+
+        node._id = f'{SHARED_NODE_ID_PREFIX}{node.id}'
+
+        # node ids are part of the serialized nodes of the parent nodes
+        # text nodes have no cache of their own
+        if node.NODE_TYPE is NODE_TYPE.TEXT_NODE:
+            node = node.parent
+
+        node._invalidate_serialization_cache()
+
+    def __repr__(self):
+        return f'<SharedHTML({self._node.nodes!r})>'
+
+    def _get_content_hash(self):
+        return self._node._get_content_hash()
+
+    def _serialize(self, include_node_ids=True):
+        if not include_node_ids:
+            return self._node.nodes._serialize(include_node_ids=False)
+
+        if self._serialized_nodes is None:
+            self._serialized_nodes = self._node.nodes._serialize()
+
+        return self._serialized_nodes
+
+    def _render(self):
+        if self._html_string is None:
+            self._html_string = str(self._node.nodes)
+
+        return self._html_string
+
+
+class SharedNode(Node):
+    """
+    Mounts the nodes of a SharedHTML object as its sub nodes. The node itself
+    is a normal node and can be changed, its sub nodes are frozen.
+    """
+
+    TAG_NAME = 'div'
+
+    def __init__(self, shared_html, **kwargs):
+        super().__init__(**kwargs)
+
+        self.shared_html = shared_html
+        self.nodes._freeze()
+
+    def __eq__(self, other):
+        if not isinstance(other, SharedNode):
+            return False
+
+        if not super().__eq__(other):
+            return False
+
+        return (
+            other.shared_html is self.shared_html or
+            other.shared_html._node.nodes == self.shared_html._node.nodes
+        )
+
+    # serialization ###########################################################
+    def _compute_content_hash(self, content_hashes):
+        return hash((
+            super()._compute_content_hash(content_hashes),
+            self.shared_html._get_content_hash(),
+        ))
+
+    def _serialize(self, include_node_ids=True):
+        data = super()._serialize(include_node_ids=include_node_ids)
+        data[-3] = self.shared_html._serialize(include_node_ids)
+
+        return data
+
+    # string representation ###################################################
+    def __str__(self):
+        return super().__str__(node_string=self.shared_html._render())
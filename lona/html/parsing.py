@@ -6,6 +6,7 @@ from html.parser import (  # type: ignore[attr-defined]
     HTMLParser,
 )
 from typing import List, Dict, cast
+from functools import lru_cache
 from html import unescape
 import logging
 
@@ -18,6 +19,62 @@ import lona.warnings
 
 logger = logging.getLogger('lona')
 
+PARSE_HTML_CACHE_MAX_SIZE = 1000
+
+
+class NodeTemplate:
+    """
+    Parsed representation of a node, that can be used to create the same node
+    multiple times without parsing the HTML again.
+    """
+
+    __slots__ = (
+        'node_class',
+        'node_kwargs',
+        'attributes',
+        'tag_name',
+        'parent',
+        'nodes',
+        'value',
+    )
+
+    def __init__(self, node_class=Node, node_kwargs=None, attributes=None,
+                 tag_name='', parent=None):
+
+        self.node_class = node_class
+        self.node_kwargs = node_kwargs or {}
+        self.attributes = attributes or {}
+        self.tag_name = tag_name
+        self.parent = parent
+        self.nodes = []  # node templates and strings
+        self.value = None
+
+    def create_nodes(self):
+        # returns new nodes for all sub templates
+
+        nodes = []
+
+        for template in self.nodes:
+            if isinstance(template, str):
+                nodes.append(TextNode(template))
+
+                continue
+
+            node = template.node_class(**template.node_kwargs)
+
+            if template.attributes:
+                node.attributes.update(template.attributes)
+
+            if template.nodes:
+                node.nodes.extend(template.create_nodes())
+
+            if template.value is not None:
+                node.value = template.value
+
+            nodes.append(node)
+
+        return nodes
+
 
 class NodeHTMLParser(HTMLParser):
     CDATA_CONTENT_ELEMENTS = HTMLParser.CDATA_CONTENT_ELEMENTS + ('textarea',)
@@ -158,14 +215,16 @@ class NodeHTMLParser(HTMLParser):
             if key in node_attributes:
                 node_kwargs[key] = node_attributes.pop(key)
 
-        node_class = self.get_node_class(tag, node_attributes)
-        node = node_class(**node_kwargs)
-
-        # set attributes
-        node.attributes.update(node_attributes)
+        node = NodeTemplate(
+            node_class=self.get_node_class(tag, node_attributes),
+            node_kwargs=node_kwargs,
+            attributes=node_attributes,
+            tag_name=tag,
+            parent=self._node,
+        )
 
         # setup node
-        self._node.append(node)
+        self._node.nodes.append(node)
         if not self_closing:
             self.set_current_node(node)
 
@@ -184,7 +243,7 @@ class NodeHTMLParser(HTMLParser):
 
         # normal nodes
         else:
-            self._node.append(TextNode(text))
+            self._node.nodes.append(text)
 
     def handle_endtag(self, tag):
         if self._node.parent is None:
@@ -199,6 +258,39 @@ class NodeHTMLParser(HTMLParser):
         self.set_current_node(self._node.parent)
 
 
+@lru_cache(PARSE_HTML_CACHE_MAX_SIZE)
+def _parse_html(html_string, use_high_level_nodes, node_classes,
+                use_future_node_classes):
+
+    root_node = NodeTemplate()
+
+    html_parser = NodeHTMLParser(
+        use_high_level_nodes=use_high_level_nodes,
+        node_classes=dict(node_classes),
+    )
+
+    # TODO: remove in 2.0
+    html_parser.use_future_node_classes = use_future_node_classes
+
+    html_parser.set_current_node(root_node)
+    html_parser.feed(html_string)
+
+    if html_parser._node is not root_node:
+        raise ValueError(
+            f'Invalid html: missing end tag </{html_parser._node.tag_name}>',
+        )
+
+    return root_node
+
+
+def get_parse_html_cache_info():
+    return _parse_html.cache_info()
+
+
+def clear_parse_html_cache():
+    return _parse_html.cache_clear()
+
+
 def parse_html(
         html_string: str,
         use_high_level_nodes: bool = True,
@@ -224,25 +316,18 @@ def parse_html(
 
     """
 
-    root_node: Node = Node()
-    nodes: List[AbstractNode] = []
-
-    html_parser = NodeHTMLParser(
+    # parsed HTML strings get cached as node templates, so parsing the same
+    # string again only creates new nodes
+    template = _parse_html(
+        html_string=html_string,
         use_high_level_nodes=use_high_level_nodes,
-        node_classes=node_classes or {},
-    )
-
-    html_parser.set_current_node(root_node)
-    html_parser.feed(html_string)
+        node_classes=tuple((node_classes or {}).items()),
 
-    if html_parser._node is not root_node:
-        raise ValueError(
-            f'Invalid html: missing end tag </{html_parser._node.tag_name}>',
-        )
+        # TODO: remove in 2.0
+        use_future_node_classes=get_use_future_node_classes(),
+    )
 
-    for node in list(root_node.nodes):
-        node.remove()
-        nodes.append(node)
+    nodes: List[AbstractNode] = template.create_nodes()
 
     if flat and len(nodes) == 1:
         return nodes[0]
@@ -1,3 +1,10 @@
+import logging
+
+from lona.protocol import PATCH_TYPE, OPERATION, NODE_TYPE
+
+logger = logging.getLogger('lona.html.patches')
+
+
 class Patch:
     def __init__(self, node_id, patch_type, operation, payload, issuer=None):
         self.issuer = issuer
@@ -12,6 +19,397 @@ class Patch:
     def __repr__(self):
         return f'<Patch({self.data[0]}, {self.data[1]}, {self.data[2]})>'
 
+    @property
+    def node_id(self):
+        return self.data[0]
+
+    @property
+    def patch_type(self):
+        return self.data[1]
+
+    @property
+    def operation(self):
+        return self.data[2]
+
+    def get_serialized_nodes(self):
+        # returns all serialized nodes that get mounted by this patch
+
+        if self.data[1] is not PATCH_TYPE.NODES:
+            return []
+
+        if self.data[2] in (OPERATION.INSERT, OPERATION.SET):
+            return [self.data[4]]
+
+        if self.data[2] is OPERATION.INSERT_MULTIPLE:
+            return self.data[4]
+
+        if self.data[2] is OPERATION.RESET:
+            return self.data[3]
+
+        return []
+
+    def get_node_ids(self):
+        # returns the ids of all nodes that get (re)rendered by this patch,
+        # including all of their sub nodes
+
+        node_ids = []
+        stack = list(self.get_serialized_nodes())
+
+        while stack:
+            serialized_node = stack.pop()
+
+            node_ids.append(serialized_node[1])
+
+            if serialized_node[0] is NODE_TYPE.NODE:
+                stack.extend(serialized_node[8])
+
+            # TODO: remove in 2.0
+            elif serialized_node[0] is NODE_TYPE.WIDGET:
+                stack.extend(serialized_node[3])
+
+        return node_ids
+
+
+def estimate_size(data, limit=None):
+    """
+    Returns a rough estimation of the size of the given data, encoded as
+    JSON, without encoding it. When a limit is given, the estimation stops
+    as soon as the limit is exceeded.
+    """
+
+    size = 0
+    stack = [data]
+
+    while stack:
+        value = stack.pop()
+
+        if isinstance(value, str):
+            size += len(value) + 3
+
+        elif isinstance(value, (list, tuple)):
+            size += len(value) + 2
+            stack.extend(value)
+
+        elif isinstance(value, dict):
+            size += len(value) * 2 + 2
+            stack.extend(value.keys())
+            stack.extend(value.values())
+
+        # numbers, booleans, enums and None
+        else:
+            size += 4
+
+        if limit is not None and size > limit:
+            break
+
+    return size
+
+
+def _drop_sub_tree_patches(patches, dropped, indices, end):
+    # drops all given patches and all patches up to `end` that target nodes
+    # that got mounted by them. Nodes that get mounted somewhere else in the
+    # meantime are not affected.
+
+    indices = set(indices)
+    node_ids = set()
+
+    for index in range(min(indices), end):
+        patch = patches[index]
+
+        if index in indices:
+            node_ids.update(patch.get_node_ids())
+
+            continue
+
+        if dropped[index]:
+            continue
+
+        if patch.node_id in node_ids:
+            dropped[index] = True
+            node_ids.update(patch.get_node_ids())
+
+        else:
+            node_ids.difference_update(patch.get_node_ids())
+
+    for index in indices:
+        dropped[index] = True
+
+
+def _compact_node_lists(patches, dropped):
+    node_list_patches = {}  # parent node id: indices since last CLEAR/RESET
+    mounted_by = {}  # node id: index of the INSERT patch that mounted it
+
+    for index, patch in enumerate(patches):
+        if dropped[index] or patch.patch_type is not PATCH_TYPE.NODES:
+            continue
+
+        node_id = patch.node_id
+        operation = patch.operation
+
+        history = [
+            i for i in node_list_patches.get(node_id, []) if not dropped[i]
+        ]
+
+        node_list_patches[node_id] = history
+
+        # nodes that get rendered by this patch start with a fresh history
+        for mounted_node_id in patch.get_node_ids():
+            node_list_patches.pop(mounted_node_id, None)
+            mounted_by.pop(mounted_node_id, None)
+
+        # INSERT + REMOVE
+        if operation is OPERATION.REMOVE:
+            insert_index = mounted_by.pop(patch.data[3], None)
+
+            if (insert_index is not None and
+                    not dropped[insert_index] and
+                    history and
+                    history[-1] == insert_index):
+
+                history.pop()
+
+                _drop_sub_tree_patches(
+                    patches=patches,
+                    dropped=dropped,
+                    indices=[insert_index, index],
+                    end=index,
+                )
+
+                continue
+
+            history.append(index)
+
+        # CLEAR / RESET
+        elif operation in (OPERATION.CLEAR, OPERATION.RESET):
+            obsolete_patches = []
+            mounted_node_ids = set()
+
+            # REMOVE patches are only obsolete if the removed node was
+            # mounted by one of the preceding obsolete patches. Nodes that
+            # were mounted before, might get mounted somewhere else later.
+            for i in history:
+                if patches[i].operation is not OPERATION.REMOVE:
+                    obsolete_patches.append(i)
+                    mounted_node_ids.update(
+                        serialized_node[1] for serialized_node
+                        in patches[i].get_serialized_nodes()
+                    )
+
+                elif patches[i].data[3] in mounted_node_ids:
+                    obsolete_patches.append(i)
+
+            if obsolete_patches:
+                _drop_sub_tree_patches(
+                    patches=patches,
+                    dropped=dropped,
+                    indices=obsolete_patches,
+                    end=index,
+                )
+
+            node_list_patches[node_id] = [index]
+
+        # INSERT / SET
+        else:
+            history.append(index)
+
+            if operation is OPERATION.INSERT:
+                mounted_by[patch.data[4][1]] = index
+
+
+def _compact_attributes(patches, dropped):
+    # node id: {patch type: (indices, {key: index})}
+    node_states = {}
+
+    for index, patch in enumerate(patches):
+        if dropped[index]:
+            continue
+
+        node_id = patch.node_id
+        patch_type = patch.patch_type
+        operation = patch.operation
+
+        # nodes that get rendered by a node list patch start with a fresh
+        # state
+        if patch_type is PATCH_TYPE.NODES:
+            for mounted_node_id in patch.get_node_ids():
+                node_states.pop(mounted_node_id, None)
+
+            continue
+
+        indices, keys = node_states.setdefault(node_id, {}).setdefault(
+            patch_type,
+            ([], {}),
+        )
+
+        # widget data
+        if patch_type is PATCH_TYPE.WIDGET_DATA:
+            if operation is OPERATION.RESET and not patch.data[3]:
+                for i in indices:
+                    dropped[i] = True
+
+                indices.clear()
+
+            indices.append(index)
+
+        # CLEAR / RESET
+        elif operation in (OPERATION.CLEAR, OPERATION.RESET):
+            for i in indices:
+                dropped[i] = True
+
+            indices.clear()
+            keys.clear()
+            indices.append(index)
+
+        # style and attributes (SET / REMOVE)
+        elif patch_type in (PATCH_TYPE.STYLE, PATCH_TYPE.ATTRIBUTES):
+            key = patch.data[3]
+
+            if key in keys:
+                dropped[keys[key]] = True
+
+            keys[key] = index
+            indices.append(index)
+
+        # id list and class list (ADD / REMOVE)
+        else:
+            value = patch.data[3]
+            previous_index = keys.pop(value, None)
+
+            if (previous_index is not None and
+                    patches[previous_index].operation is not operation):
+
+                dropped[previous_index] = True
+                dropped[index] = True
+
+                continue
+
+            keys[value] = index
+            indices.append(index)
+
+
+def compact_patches(patches):
+    """
+    Takes a list of patches and returns a list of patches that leads to the
+    same result, when applied, but contains no redundant patches.
+
+      - Multiple SETs of the same attribute or style get collapsed into the
+        last one
+      - ADD and REMOVE of the same id or class cancel each other out
+      - Patches, that precede a CLEAR or RESET of the same node list or
+        attribute container, get dropped
+      - INSERT and REMOVE of the same node cancel each other out, including
+        all patches that targeted the inserted sub tree
+
+    """
+
+    dropped = [False] * len(patches)
+
+    _compact_node_lists(patches, dropped)
+    _compact_attributes(patches, dropped)
+
+    return [
+        patch for index, patch in enumerate(patches) if not dropped[index]
+    ]
+
+
+def _get_parent_id(node):
+    parent = node.parent
+
+    if parent is None:
+        return None
+
+    return parent.id
+
+
+def fold_patches(patches, node_index):
+    """
+    Takes a list of patches and the node index of their document and folds
+    all attribute, style, id list, class list and widget data patches, that
+    target sub trees that got mounted by a preceding patch of the same list,
+    into the patch that mounted them, by serializing the mounted nodes
+    again.
+
+    Sub trees whose nodes get mounted, moved or unmounted by a later patch,
+    whose nodes got patched by a client, or that are not mounted anymore,
+    are not folded.
+
+    Returns a new list of patches.
+    """
+
+    mounted_by = {}  # node id: index of the patch that mounted it
+    folded_patches = {}  # index of a mounting patch: indices of its patches
+    blocked_patches = set()  # indices of mounting patches
+
+    for index, patch in enumerate(patches):
+        mounting_index = mounted_by.get(patch.node_id, None)
+
+        if patch.patch_type is PATCH_TYPE.NODES:
+            if mounting_index is not None:
+                blocked_patches.add(mounting_index)
+
+            for node_id in patch.get_node_ids():
+                if node_id in mounted_by:
+                    blocked_patches.add(mounted_by[node_id])
+
+                mounted_by[node_id] = index
+
+            continue
+
+        if mounting_index is None:
+            continue
+
+        if patch.issuer:
+            blocked_patches.add(mounting_index)
+
+            continue
+
+        folded_patches.setdefault(mounting_index, []).append(index)
+
+    dropped_patches = set()
+    patches = list(patches)
+
+    for index, indices in folded_patches.items():
+        if index in blocked_patches:
+            continue
+
+        patch = patches[index]
+        nodes = []
+
+        for serialized_node in patch.get_serialized_nodes():
+            node = node_index.get(serialized_node[1], None)
+
+            if node is None or _get_parent_id(node) != patch.node_id:
+                break
+
+            nodes.append(node)
+
+        else:
+            serialized_nodes = [node._serialize() for node in nodes]
+
+            if patch.operation in (OPERATION.INSERT, OPERATION.SET):
+                payload = [patch.data[3], serialized_nodes[0]]
+
+            elif patch.operation is OPERATION.INSERT_MULTIPLE:
+                payload = [patch.data[3], serialized_nodes]
+
+            else:
+                payload = [serialized_nodes]
+
+            patches[index] = Patch(
+                node_id=patch.node_id,
+                patch_type=patch.patch_type,
+                operation=patch.operation,
+                payload=payload,
+                issuer=patch.issuer,
+            )
+
+            dropped_patches.update(indices)
+
+    return [
+        patch for index, patch in enumerate(patches)
+        if index not in dropped_patches
+    ]
+
 
 class PatchStack:
     def __init__(self):
@@ -23,6 +421,25 @@ class PatchStack:
     def has_patches(self):
         return bool(self.patches)
 
+    def compact(self, node_index=None):
+        patch_count = len(self.patches)
+
+        self.patches = compact_patches(self.patches)
+
+        if node_index is not None:
+            self.patches = fold_patches(self.patches, node_index)
+
+        eliminated_patch_count = patch_count - len(self.patches)
+
+        if eliminated_patch_count:
+            logger.debug(
+                '%s of %s patches were eliminated',
+                eliminated_patch_count,
+                patch_count,
+            )
+
+        return eliminated_patch_count
+
     def get_patches(self):
         patch_data = []
 
@@ -0,0 +1,86 @@
+from textwrap import indent
+
+from lona.protocol import NODE_TYPE
+
+INDENTATION = '  '
+
+
+def _iter_html(node, minified=False):
+    # yields the HTML of the given node in chunks. The tree gets walked
+    # iteratively, so no intermediate strings for sub trees are built.
+    # Has to be called with node.lock acquired
+
+    # this step is necessary to avoid import loops with lona.html.node
+    from lona.html.node import Node
+
+    # the stack contains (node, depth) tuples and strings, which get
+    # yielded as they are, to close tags after all their sub nodes
+    # were rendered
+    stack = [(node, 0)]
+
+    while stack:
+        entry = stack.pop()
+
+        if isinstance(entry, str):
+            yield entry
+
+            continue
+
+        node, depth = entry
+        prefix = '' if minified else INDENTATION * depth
+
+        # text nodes, legacy widgets and nodes with custom rendering
+        if (node.NODE_TYPE is not NODE_TYPE.NODE or
+                type(node).__str__ is not Node.__str__):
+
+            string = str(node)
+
+            if prefix:
+                string = indent(string, prefix)
+
+            yield string
+
+            continue
+
+        # opening tag
+        yield prefix
+        yield node._render_opening_tag()
+
+        nodes = node._nodes._nodes if node._nodes is not None else ()
+
+        if minified:
+            if not node.self_closing_tag:
+                stack.append(node._render_closing_tag())
+
+            for child in reversed(nodes):
+                stack.append((child, 0))
+
+            continue
+
+        # closing tag
+        if nodes and node.self_closing_tag:
+            stack.append('\n')
+
+        elif nodes:
+            stack.append(f'\n{prefix}{node._render_closing_tag()}')
+
+        elif not node.self_closing_tag:
+            stack.append(node._render_closing_tag())
+
+        # sub nodes, one per line
+        for child in reversed(nodes):
+            stack.append((child, depth + 1))
+            stack.append('\n')
+
+
+def render_html(node, minified=False):
+    """
+    Renders the given node into HTML. The tree gets walked iteratively, so
+    deep trees render without recursion. When minified is set, no line
+    breaks and indentation get added.
+
+    Nodes that implement their own `__str__()` get rendered using it.
+    """
+
+    with node.lock:
+        return ''.join(_iter_html(node, minified=minified))
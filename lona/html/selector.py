@@ -1,10 +1,30 @@
+from functools import lru_cache
 import re
 
+from lona.protocol import NODE_TYPE
+
 SELECTOR_RE = re.compile(r'([#.])?(([^#.\[\]]+)|(\[([^=\[\]]+)=([^=\[\]]+)\]))')
-UNSUPPORTED_CHARACTERS = re.compile(r'([ $|!~>+])')
+UNSUPPORTED_CHARACTERS = re.compile(r'([$|!~+])')
+
+SELECTOR_CACHE_MAX_SIZE = 1000
+
+DESCENDANT = ' '
+CHILD = '>'
 
 
 class Selector:
+    """
+    Selectors get compiled into a list of chains, one per comma separated
+    selector. A chain contains tuples of combinators and compound selectors,
+    from right to left. Compound selectors are tuples of
+    (tag_name, ids, classes, attributes).
+
+        'div#foo > .bar'
+            -> [[(None, ('', (), ('bar',), ())),
+                 ('>', ('div', ('foo',), (), ()))]]
+
+    """
+
     def __init__(self, raw_selector_string):
         self.raw_selector_string = raw_selector_string
 
@@ -22,83 +42,232 @@ class Selector:
                 f'unsupported selector feature: {match.group()!r}',
             )
 
+    def _parse_compound_selector(self, selector_string):
+        tag_name = ''
+        ids = []
+        classes = []
+        attributes = {}
+
+        for match in SELECTOR_RE.findall(selector_string):
+            prefix, name, _, _, attribute_name, attribute_value = match
+
+            if prefix == '#':
+                ids.append(name)
+
+            elif prefix == '.':
+                classes.append(name)
+
+            elif not prefix and not attribute_name:
+                tag_name = name
+
+            elif attribute_name and attribute_value:
+                attribute_value = attribute_value.replace('"', '')
+                attribute_value = attribute_value.replace("'", '')
+
+                attributes[attribute_name] = attribute_value
+
+        return (
+            tag_name,
+            tuple(ids),
+            tuple(classes),
+            tuple(attributes.items()),
+        )
+
+    def _tokenize(self):
+        # splits the raw selector string into one list of tokens per comma
+        # separated selector. Tokens are compound selectors or combinators.
+        # Attribute selectors are never split, so their values may contain
+        # whitespace, commas and combinators.
+
+        selectors = []
+        tokens = []
+        token = ''
+        quote = ''
+        in_attribute_selector = False
+
+        for character in self.raw_selector_string:
+            if quote:
+                if character == quote:
+                    quote = ''
+
+                token += character
+
+            elif in_attribute_selector:
+                if character in ('"', "'"):
+                    quote = character
+
+                elif character == ']':
+                    in_attribute_selector = False
+
+                token += character
+
+            elif character == '[':
+                in_attribute_selector = True
+                token += character
+
+            elif character.isspace() or character in (CHILD, ','):
+                if token:
+                    tokens.append(token)
+                    token = ''
+
+                if character == CHILD:
+                    tokens.append(CHILD)
+
+                elif character == ',':
+                    selectors.append(tokens)
+                    tokens = []
+
+            else:
+                token += character
+
+        if quote or in_attribute_selector:
+            raise ValueError(
+                f'invalid selector: {self.raw_selector_string!r}',
+            )
+
+        if token:
+            tokens.append(token)
+
+        selectors.append(tokens)
+
+        return selectors
+
     def parse_selector(self):
         self.selectors = []
 
-        selector_strings = self.raw_selector_string.split(',')
+        for tokens in self._tokenize():
+            chain = []
+            combinator = None
 
-        for selector_string in selector_strings:
-            selector = {
-                'tag_name': '',
-                'ids': [],
-                'classes': [],
-                'attributes': {},
-            }
+            # empty selectors match every node
+            if not tokens:
+                tokens = ['']
 
-            for match in SELECTOR_RE.findall(selector_string):
-                prefix, name, _, _, attribute_name, attribute_value = match
+            for token in reversed(tokens):
+                if token == CHILD:
+                    if not chain or combinator == CHILD:
+                        raise ValueError(
+                            f'invalid selector: {self.raw_selector_string!r}',
+                        )
 
-                if prefix == '#':
-                    selector['ids'].append(name)
+                    combinator = CHILD
 
-                elif prefix == '.':
-                    selector['classes'].append(name)
+                    continue
 
-                elif not prefix and not attribute_name:
-                    selector['tag_name'] = name
+                if chain and combinator is None:
+                    combinator = DESCENDANT
 
-                elif attribute_name and attribute_value:
-                    attribute_value = attribute_value.replace('"', '')
-                    attribute_value = attribute_value.replace("'", '')
+                chain.append((
+                    combinator,
+                    self._parse_compound_selector(token),
+                ))
 
-                    selector['attributes'][attribute_name] = attribute_value
+                combinator = None
 
-            self.selectors.append(selector)
+            if combinator is not None:
+                raise ValueError(
+                    f'invalid selector: {self.raw_selector_string!r}',
+                )
 
-    def _match_selector(self, node, selector):
-        # tag name
-        if selector['tag_name']:
-            if not hasattr(node, 'tag_name'):
-                return False
+            self.selectors.append(chain)
+
+    def _match_compound_selector(self, node, compound_selector):
+        tag_name, ids, classes, attributes = compound_selector
+
+        # text nodes and legacy widgets have no tag name or attributes
+        if node.NODE_TYPE is not NODE_TYPE.NODE:
+            return not (tag_name or ids or classes or attributes)
 
-            if node.tag_name != selector['tag_name']:
-                return False
+        # tag name
+        if tag_name and node._tag_name != tag_name:
+            return False
 
+        # attribute containers, that were not created yet, get only created
+        # if the class defaults are set. The containers are accessed directly
+        # because this runs with the node lock held.
         # ids
-        if selector['ids']:
-            if not hasattr(node, 'id_list'):
-                return False
+        if ids and (node._id_list is not None or node.ID_LIST):
+            id_list = node.id_list._attributes
 
-            for id_name in selector['ids']:
-                if id_name not in node.id_list:
+            for id_name in ids:
+                if id_name not in id_list:
                     return False
 
+        elif ids:
+            return False
+
         # classes
-        if selector['classes']:
-            if not hasattr(node, 'class_list'):
-                return False
+        if classes and (node._class_list is not None or node.CLASS_LIST):
+            class_list = node.class_list._attributes
 
-            for class_name in selector['classes']:
-                if class_name not in node.class_list:
+            for class_name in classes:
+                if class_name not in class_list:
                     return False
 
+        elif classes:
+            return False
+
         # attributes
-        if selector['attributes']:
-            if not hasattr(node, 'attributes'):
-                return False
+        if attributes and (node._attributes is not None or node.ATTRIBUTES):
+            node_attributes = node.attributes._attributes
 
-            for name, value in selector['attributes'].items():
-                if name not in node.attributes:
+            for name, value in attributes:
+                if name not in node_attributes:
                     return False
 
-                if node.attributes[name] != value:
+                if node_attributes[name] != value:
                     return False
 
+        elif attributes:
+            return False
+
         return True
 
+    def _match_chain(self, node, chain, index=0):
+        if not self._match_compound_selector(node, chain[index][1]):
+            return False
+
+        if index == len(chain) - 1:
+            return True
+
+        combinator = chain[index + 1][0]
+        parent = node.parent
+
+        if combinator == CHILD:
+            return (
+                parent is not None and
+                self._match_chain(parent, chain, index + 1)
+            )
+
+        # descendant
+        while parent is not None:
+            if self._match_chain(parent, chain, index + 1):
+                return True
+
+            parent = parent.parent
+
+        return False
+
     def match(self, node):
         for selector in self.selectors:
-            if self._match_selector(node, selector):
+            if len(selector) == 1:
+                if self._match_compound_selector(node, selector[0][1]):
+                    return True
+
+            elif self._match_chain(node, selector):
                 return True
 
         return False
+
+
+@lru_cache(SELECTOR_CACHE_MAX_SIZE)
+def get_selector(raw_selector_string):
+    return Selector(raw_selector_string)
+
+
+def get_selector_cache_info():
+    return get_selector.cache_info()
+
+
+def clear_selector_cache():
+    return get_selector.cache_clear()
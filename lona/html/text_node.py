@@ -1,14 +1,23 @@
 from lona.html.abstract_node import AbstractNode
 from lona.protocol import NODE_TYPE
+import lona.warnings
 
 
 class TextNode(AbstractNode):
     NODE_TYPE = NODE_TYPE.TEXT_NODE
 
+    __slots__ = ('_string', '__dict__')
+
     def __init__(self, string):
         self._string = str(string)
 
     def wrap_method(self, method):
+        # TODO: remove in 2.0
+        # string methods are proxied on the class, so this is not used
+        # anymore
+
+        lona.warnings.remove_2_0()
+
         def wrapper(*args, **kwargs):
             return_value = method(*args, **kwargs)
 
@@ -19,18 +28,6 @@ class TextNode(AbstractNode):
 
         return wrapper
 
-    def __getattribute__(self, name):
-        if name in ('id', '_string'):
-            return super().__getattribute__(name)
-
-        if hasattr(self, '_string') and hasattr(self._string, name):
-            attribute = getattr(self._string, name)
-
-            if callable(attribute):
-                return self.wrap_method(attribute)
-
-        return super().__getattribute__(name)
-
     def __dir__(self):
         return dir(self._string)
 
@@ -61,6 +58,9 @@ class TextNode(AbstractNode):
         return f'<TextNode({self._string!r})>'
 
     # serialization ###########################################################
+    def _clone(self):
+        return TextNode(self._string)
+
     def _serialize(self, include_node_ids=True):
         data = [self.NODE_TYPE, self.id, self._string]
 
@@ -69,6 +69,9 @@ class TextNode(AbstractNode):
 
         return data
 
+    def _compute_content_hash(self, content_hashes):
+        return hash((self.NODE_TYPE, self._string))
+
     # node helper #############################################################
     def remove(self):
         if not self._parent:
@@ -78,3 +81,39 @@ class TextNode(AbstractNode):
 
     def get_text(self):
         return self._string
+
+
+# string methods ##############################################################
+# all public methods of str get proxied explicitly, instead of looking them up
+# on every attribute access. Strings that get returned get wrapped into
+# TextNodes.
+
+def _get_string_method_proxy(name):
+    string_method = getattr(str, name)
+
+    def method(self, *args, **kwargs):
+        return_value = string_method(self._string, *args, **kwargs)
+
+        if isinstance(return_value, str):
+            return TextNode(return_value)
+
+        return return_value
+
+    method.__name__ = name
+    method.__qualname__ = f'TextNode.{name}'
+    method.__doc__ = string_method.__doc__
+
+    return method
+
+
+for _name in dir(str):
+    if _name.startswith('_') or hasattr(TextNode, _name):
+        continue
+
+    # str.maketrans
+    if isinstance(str.__dict__[_name], staticmethod):
+        setattr(TextNode, _name, str.__dict__[_name])
+
+        continue
+
+    setattr(TextNode, _name, _get_string_method_proxy(_name))
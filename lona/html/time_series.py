@@ -0,0 +1,243 @@
+from collections import deque
+from math import ceil
+
+MINMAX = 'minmax'
+LTTB = 'lttb'
+
+
+class Bucket:
+    __slots__ = ('points', 'min_index', 'max_index', 'selected_point')
+
+    def __init__(self, point):
+        self.points = [point]
+        self.min_index = 0
+        self.max_index = 0
+        self.selected_point = None
+
+    def append(self, point):
+        self.points.append(point)
+
+        index = len(self.points) - 1
+
+        if point[1] < self.points[self.min_index][1]:
+            self.min_index = index
+
+        if point[1] > self.points[self.max_index][1]:
+            self.max_index = index
+
+
+def select_lttb_point(points, previous_point, next_points):
+    # Largest-Triangle-Three-Buckets: selects the point that forms the
+    # largest triangle with the previously selected point and the average
+    # of the next bucket
+
+    ax, ay = previous_point
+    cx = sum(point[0] for point in next_points) / len(next_points)
+    cy = sum(point[1] for point in next_points) / len(next_points)
+
+    selected_point = points[0]
+    max_area = -1
+
+    for point in points:
+        area = abs((ax - cx) * (point[1] - ay) - (ax - point[0]) * (cy - ay))
+
+        if area > max_area:
+            selected_point = point
+            max_area = area
+
+    return selected_point
+
+
+class TimeSeries:
+    """
+    Keeps the last points of a time series in a ring buffer and mirrors
+    them into a list in the widget data of the given node.
+
+    Every point is a list of `[x, y]`. When the ring buffer is full, the
+    oldest points get evicted. When `max_points` is set, the points get
+    grouped into buckets, and every bucket gets sent to the client as its
+    minimum and maximum (`decimation='minmax'`), or as one point, selected
+    by Largest-Triangle-Three-Buckets (`decimation='lttb'`).
+
+    With decimation, `max_points // 2` buckets (minmax) or `max_points`
+    buckets (lttb) get used. Their size gets rounded up, so the ring buffer
+    holds at least `capacity` points, and at most one more per bucket.
+
+    Appending a point results in at most one INSERT or SET patch per sent
+    point, evicting a bucket results in one REMOVE patch per sent point.
+    """
+
+    def __init__(
+            self,
+            node,
+            key,
+            capacity=1000,
+            max_points=None,
+            decimation=MINMAX,
+            points=None,
+    ):
+
+        if decimation not in (MINMAX, LTTB):
+            raise ValueError(f'unknown decimation: {decimation!r}')
+
+        if capacity < 1:
+            raise ValueError('capacity has to be 1 or higher')
+
+        if max_points is not None and max_points < 2:
+            raise ValueError('max_points has to be 2 or higher')
+
+        self.node = node
+        self.key = key
+        self.capacity = capacity
+        self.max_points = max_points
+        self.decimation = decimation
+
+        # without decimation every point is its own bucket
+        self._bucket_size = 1
+        self._bucket_count = capacity
+        self._slot_count = 1
+
+        # with decimation the number of buckets is derived from max_points,
+        # so all points that may be sent get used, and the bucket size gets
+        # rounded up, so the buckets can hold at least capacity points
+        if max_points is not None and max_points < capacity:
+            if decimation == MINMAX:
+                self._slot_count = 2
+
+            self._bucket_count = max_points // self._slot_count
+            self._bucket_size = ceil(capacity / self._bucket_count)
+
+        self._buckets = deque()
+
+        with self.node.lock:
+            self.node.widget_data[self.key] = []
+
+            if points:
+                self.extend(points)
+
+    def __repr__(self):
+        return f'<TimeSeries({self.key!r}, {len(self)} points)>'
+
+    def __len__(self):
+        with self.node.lock:
+            return sum(len(bucket.points) for bucket in self._buckets)
+
+    @property
+    def points(self):
+        with self.node.lock:
+            return [
+                point for bucket in self._buckets for point in bucket.points
+            ]
+
+    # rendering ###############################################################
+    def _get_slots(self, bucket):
+        # returns the points that get sent to the client for a bucket
+
+        if self._bucket_size == 1:
+            return bucket.points
+
+        if self.decimation == LTTB:
+            return [bucket.selected_point or bucket.points[-1]]
+
+        min_index = bucket.min_index
+        max_index = bucket.max_index
+
+        if min_index > max_index:
+            min_index, max_index = max_index, min_index
+
+        return [bucket.points[min_index], bucket.points[max_index]]
+
+    def _render(self):
+        return [
+            point
+            for bucket in self._buckets
+            for point in self._get_slots(bucket)
+        ]
+
+    # updates #################################################################
+    def _append(self, point, data=None):
+        # when data is set, all changes get applied to it, so patches get
+        # sent
+
+        buckets = self._buckets
+        slot_count = self._slot_count
+
+        # open bucket
+        if buckets and len(buckets[-1].points) < self._bucket_size:
+            bucket = buckets[-1]
+            slots = self._get_slots(bucket)
+
+            bucket.append(point)
+
+            if data is None:
+                return
+
+            offset = len(data) - slot_count
+
+            for index, slot in enumerate(self._get_slots(bucket)):
+                if slot is not slots[index]:
+                    data[offset + index] = slot
+
+            return
+
+        # the previous bucket is complete now, so the bucket before that can
+        # be decimated
+        if (self.decimation == LTTB and
+                self._bucket_size > 1 and
+                len(buckets) > 1):
+
+            bucket = buckets[-2]
+
+            if len(buckets) > 2:
+                previous_point = buckets[-3].selected_point
+
+            else:
+                previous_point = bucket.points[0]
+
+            bucket.selected_point = select_lttb_point(
+                points=bucket.points,
+                previous_point=previous_point,
+                next_points=buckets[-1].points,
+            )
+
+            if data is not None:
+                data[len(buckets) - 2] = bucket.selected_point
+
+        # evict the oldest bucket
+        if len(buckets) == self._bucket_count:
+            buckets.popleft()
+
+            if data is not None:
+                for _ in range(slot_count):
+                    data.pop(0)
+
+        # new bucket
+        bucket = Bucket(point)
+        buckets.append(bucket)
+
+        if data is not None:
+            for slot in self._get_slots(bucket):
+                data.append(slot)
+
+    def append(self, x, y):
+        with self.node.lock:
+            self._append(
+                point=[x, y],
+                data=self.node.widget_data[self.key],
+            )
+
+    def extend(self, points):
+        # all points get added at once, and the client data gets sent in one
+        # patch
+
+        with self.node.lock:
+            for x, y in points:
+                self._append(point=[x, y])
+
+            self.node.widget_data[self.key] = self._render()
+
+    def clear(self):
+        with self.node.lock:
+            self._buckets.clear()
+
+            self.node.widget_data[self.key] = []
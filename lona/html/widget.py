@@ -1,4 +1,4 @@
-from lona.html.abstract_node import AbstractNode
+from lona.html.abstract_node import get_hashable_value, AbstractNode
 from lona.html.widget_data import WidgetData
 from lona.html.node_list import NodeList
 from lona.protocol import NODE_TYPE
@@ -47,6 +47,9 @@ class Widget(AbstractNode):
         self.parent.remove(self)
 
     # serialization ###########################################################
+    def _clone(self):
+        raise RuntimeError('legacy widgets can not be cloned')
+
     def _serialize(self, include_node_ids=True):
         return [
             self.NODE_TYPE,
@@ -56,6 +59,13 @@ class Widget(AbstractNode):
             self.data._serialize(),
         ]
 
+    def _compute_content_hash(self, content_hashes):
+        return hash((
+            self.NODE_TYPE,
+            self._get_sub_node_content_hashes(content_hashes),
+            get_hashable_value(self.data._data),
+        ))
+
     # string representation ###################################################
     def __str__(self):
         return f'<!--lona-widget:{self.id}-->\n{self.nodes}\n<!--end-lona-widget:{self.id}-->'
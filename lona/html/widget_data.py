@@ -1,37 +1,70 @@
-from copy import deepcopy
-
 from lona.protocol import PATCH_TYPE, OPERATION
 
+SCALAR_TYPES = (bool, int, float, str)
+
+
+def get_initial_data(value):
+    # returns the data that widget data gets created with. Nodes use this to
+    # serialize and hash their widget data without creating it
+
+    return value or {}
+
+
+def check_value(value, owned_containers=None):
+    # when owned containers are given, all containers that are part of the
+    # value get removed from them, because they get shared from now on
+
+    values = [value]
+
+    while values:
+        value = values.pop()
+
+        if value is None or isinstance(value, SCALAR_TYPES):
+            continue
+
+        if isinstance(value, list):
+            values.extend(value)
 
-def check_value(value):
-    if value is None:
-        return
+        elif isinstance(value, dict):
+            values.extend(value.keys())
+            values.extend(value.values())
 
-    if not isinstance(value, (bool, int, float, str, list, dict)):
-        raise ValueError(f'unsupported type: {type(value)}')
+        else:
+            raise ValueError(f'unsupported type: {type(value)}')
 
-    if isinstance(value, list):
-        for i in value:
-            check_value(i)
+        if owned_containers:
+            owned_containers.pop(id(value), None)
 
-    if isinstance(value, dict):
-        for k, v in value.items():
-            check_value(k)
-            check_value(v)
+
+def _get_insert_index(data, index):
+    # returns the index an item ends up at when calling list.insert()
+
+    if index < 0:
+        return max(len(data) + index, 0)
+
+    return min(index, len(data))
 
 
 class ListOverlay:
-    def __init__(self, widget_data, key_path, original_data):
+    __slots__ = ('_widget_data', '_widget', '_key_path')
+
+    def __init__(self, widget_data, key_path):
         self._widget_data = widget_data
         self._widget = widget_data._widget
         self._key_path = key_path
-        self._original_data = original_data
 
-    def append(self, item):
-        check_value(item)
+    @property
+    def _original_data(self):
+        return self._widget_data._get_data(self._key_path)
 
+    def append(self, item):
         with self._widget.lock:
-            self._original_data.append(item)
+            self._widget_data._check_value(item)
+
+            data = self._widget_data._get_owned_data(self._key_path)
+            data.append(item)
+
+            self._widget._invalidate_serialization_cache()
 
             self._widget.document.add_patch(
                 node_id=self._widget.id,
@@ -39,14 +72,16 @@ class ListOverlay:
                 operation=OPERATION.INSERT,
                 payload=[
                     self._key_path,
-                    len(self._original_data) - 1,
-                    deepcopy(item),
+                    len(data) - 1,
+                    item,
                 ],
             )
 
     def clear(self):
         with self._widget.lock:
-            self._original_data.clear()
+            self._widget_data._get_owned_data(self._key_path).clear()
+
+            self._widget._invalidate_serialization_cache()
 
             self._widget.document.add_patch(
                 node_id=self._widget.id,
@@ -77,10 +112,14 @@ class ListOverlay:
             return self._original_data.index(*args, **kwargs)
 
     def insert(self, index, item):
-        check_value(item)
-
         with self._widget.lock:
-            self._original_data.insert(index, item)
+            self._widget_data._check_value(item)
+
+            data = self._widget_data._get_owned_data(self._key_path)
+            index = _get_insert_index(data, index)
+            data.insert(index, item)
+
+            self._widget._invalidate_serialization_cache()
 
             self._widget.document.add_patch(
                 node_id=self._widget.id,
@@ -88,14 +127,17 @@ class ListOverlay:
                 operation=OPERATION.INSERT,
                 payload=[
                     self._key_path,
-                    self._original_data.index(item),
-                    deepcopy(item),
+                    index,
+                    item,
                 ],
             )
 
     def pop(self, index):
         with self._widget.lock:
-            item = self._original_data.pop(index)
+            data = self._widget_data._get_owned_data(self._key_path)
+            item = data.pop(index)
+
+            self._widget._invalidate_serialization_cache()
 
             self._widget.document.add_patch(
                 node_id=self._widget.id,
@@ -111,23 +153,21 @@ class ListOverlay:
 
     def remove(self, item):
         with self._widget.lock:
-            index = 0
+            index = self._original_data.index(item)
 
-            for i in self._original_data:
-                if i == item:
-                    self._widget.document.add_patch(
-                        node_id=self._widget.id,
-                        patch_type=PATCH_TYPE.WIDGET_DATA,
-                        operation=OPERATION.REMOVE,
-                        payload=[
-                            self._key_path,
-                            index,
-                        ],
-                    )
+            self._widget_data._get_owned_data(self._key_path).pop(index)
 
-                index += 1
+            self._widget._invalidate_serialization_cache()
 
-            self._original_data.remove(item)
+            self._widget.document.add_patch(
+                node_id=self._widget.id,
+                patch_type=PATCH_TYPE.WIDGET_DATA,
+                operation=OPERATION.REMOVE,
+                payload=[
+                    self._key_path,
+                    index,
+                ],
+            )
 
     def reverse(self, *args, **kwargs):
         raise NotImplementedError
@@ -138,9 +178,12 @@ class ListOverlay:
     def __setitem__(self, name, item):
         with self._widget.lock:
             check_value(name)
-            check_value(item)
+            self._widget_data._check_value(item)
+
+            data = self._widget_data._get_owned_data(self._key_path)
+            data[name] = item
 
-            self._original_data[name] = item
+            self._widget._invalidate_serialization_cache()
 
             self._widget.document.add_patch(
                 node_id=self._widget.id,
@@ -149,7 +192,7 @@ class ListOverlay:
                 payload=[
                     self._key_path,
                     name,
-                    deepcopy(item),
+                    item,
                 ],
             )
 
@@ -161,21 +204,21 @@ class ListOverlay:
                 return ListOverlay(
                     widget_data=self._widget_data,
                     key_path=self._key_path + [name],
-                    original_data=item,
                 )
 
             if isinstance(item, dict):
                 return DictOverlay(
                     widget_data=self._widget_data,
                     key_path=self._key_path + [name],
-                    original_data=item,
                 )
 
             return item
 
     def __delitem__(self, name):
         with self._widget.lock:
-            del self._original_data[name]
+            del self._widget_data._get_owned_data(self._key_path)[name]
+
+            self._widget._invalidate_serialization_cache()
 
             self._widget.document.add_patch(
                 node_id=self._widget.id,
@@ -214,15 +257,22 @@ class ListOverlay:
 
 
 class DictOverlay:
-    def __init__(self, widget_data, key_path, original_data):
+    __slots__ = ('_widget_data', '_widget', '_key_path')
+
+    def __init__(self, widget_data, key_path):
         self._widget_data = widget_data
         self._widget = widget_data._widget
         self._key_path = key_path
-        self._original_data = original_data
+
+    @property
+    def _original_data(self):
+        return self._widget_data._get_data(self._key_path)
 
     def clear(self):
         with self._widget.lock:
-            self._original_data.clear()
+            self._widget_data._get_owned_data(self._key_path).clear()
+
+            self._widget._invalidate_serialization_cache()
 
             self._widget.document.add_patch(
                 node_id=self._widget.id,
@@ -254,7 +304,9 @@ class DictOverlay:
 
     def pop(self, key):
         with self._widget.lock:
-            item = self._original_data.pop(key)
+            item = self._widget_data._get_owned_data(self._key_path).pop(key)
+
+            self._widget._invalidate_serialization_cache()
 
             self._widget.document.add_patch(
                 node_id=self._widget.id,
@@ -270,7 +322,10 @@ class DictOverlay:
 
     def popitem(self):
         with self._widget.lock:
-            key, value = self._original_data.popitem()
+            data = self._widget_data._get_owned_data(self._key_path)
+            key, value = data.popitem()
+
+            self._widget._invalidate_serialization_cache()
 
             self._widget.document.add_patch(
                 node_id=self._widget.id,
@@ -290,18 +345,7 @@ class DictOverlay:
     def update(self, update_dict):
         with self._widget.lock:
             for key, value in update_dict.items():
-                self._original_data[key] = value
-
-                self._widget.document.add_patch(
-                    node_id=self._widget.id,
-                    patch_type=PATCH_TYPE.WIDGET_DATA,
-                    operation=OPERATION.SET,
-                    payload=[
-                        self._key_path,
-                        key,
-                        deepcopy(value),
-                    ],
-                )
+                self[key] = value
 
     def values(self, *args, **kwargs):
         with self._widget.lock:
@@ -310,9 +354,12 @@ class DictOverlay:
     def __setitem__(self, name, item):
         with self._widget.lock:
             check_value(name)
-            check_value(item)
+            self._widget_data._check_value(item)
+
+            data = self._widget_data._get_owned_data(self._key_path)
+            data[name] = item
 
-            self._original_data[name] = item
+            self._widget._invalidate_serialization_cache()
 
             self._widget.document.add_patch(
                 node_id=self._widget.id,
@@ -321,7 +368,7 @@ class DictOverlay:
                 payload=[
                     self._key_path,
                     name,
-                    deepcopy(item),
+                    item,
                 ],
             )
 
@@ -333,21 +380,21 @@ class DictOverlay:
                 return ListOverlay(
                     widget_data=self._widget_data,
                     key_path=self._key_path + [name],
-                    original_data=item,
                 )
 
             if isinstance(item, dict):
                 return DictOverlay(
                     widget_data=self._widget_data,
                     key_path=self._key_path + [name],
-                    original_data=item,
                 )
 
             return item
 
     def __delitem__(self, name):
         with self._widget.lock:
-            del self._original_data[name]
+            del self._widget_data._get_owned_data(self._key_path)[name]
+
+            self._widget._invalidate_serialization_cache()
 
             self._widget.document.add_patch(
                 node_id=self._widget.id,
@@ -386,10 +433,19 @@ class DictOverlay:
 
 
 class WidgetData:
+    __slots__ = (
+        '_widget',
+        '_data',
+        '_overlay',
+        '_owned_containers',
+        '_frozen',
+    )
+
     def __init__(self, widget, value=None):
         self._widget = widget
+        self._frozen = False
 
-        self._reset(value or {}, initial=True)
+        self._reset(get_initial_data(value), initial=True)
 
     def __getitem__(self, *args, **kwargs):
         return self._overlay.__getitem__(*args, **kwargs)
@@ -402,11 +458,11 @@ class WidgetData:
 
     def __len__(self, *args, **kwargs):
         with self._widget.lock:
-            return len(self._original_data)
+            return len(self._data)
 
     def __bool__(self, *args, **kwargs):
         with self._widget.lock:
-            return bool(self._original_data)
+            return bool(self._data)
 
     def __getattribute__(self, name):
         if name.startswith('_'):
@@ -432,24 +488,109 @@ class WidgetData:
 
         return self._data == other
 
+    # copy on write ###########################################################
+    # the data is shared with patch payloads and serialized nodes, without
+    # copying it. Before a container gets changed, it gets copied shallowly,
+    # including all containers on its key path, unless it is owned by this
+    # widget data already. Copied containers are owned until the data gets
+    # shared again.
+    # Owned containers are stored by their id. The containers themselves are
+    # stored too, so their ids can't get reused while they are owned.
+
+    def _get_data(self, key_path):
+        data = self._data
+
+        for key in key_path:
+            data = data[key]
+
+        return data
+
+    def _get_owned_data(self, key_path):
+        # all changes to the data get the containers to change from here
+        self._assert_not_frozen()
+
+        owned_containers = self._owned_containers
+        data = self._data
+
+        if id(data) not in owned_containers:
+            data = data.copy()
+            owned_containers[id(data)] = data
+            self._data = data
+
+        for key in key_path:
+            parent = data
+            data = parent[key]
+
+            if id(data) not in owned_containers:
+                data = data.copy()
+                owned_containers[id(data)] = data
+                parent[key] = data
+
+        return data
+
+    def _check_value(self, value):
+        # values get shared with a patch payload, so the containers they
+        # contain can't be owned anymore
+
+        check_value(value, self._owned_containers)
+
+    def _freeze(self):
+        self._frozen = True
+
+    def _assert_not_frozen(self):
+        if self._frozen:
+            raise RuntimeError('Cannot modify frozen WidgetData')
+
+    def _share(self):
+        self._owned_containers = {}
+
+        return self._data
+
     # serialization ###########################################################
+    def _clone(self, widget):
+        widget_data = self.__class__.__new__(self.__class__)
+        widget_data._widget = widget
+        widget_data._data = self._share()
+        widget_data._owned_containers = {}
+        widget_data._frozen = self._frozen
+
+        if isinstance(self._data, list):
+            widget_data._overlay = ListOverlay(
+                widget_data=widget_data,
+                key_path=[],
+            )
+
+        else:
+            widget_data._overlay = DictOverlay(
+                widget_data=widget_data,
+                key_path=[],
+            )
+
+        return widget_data
+
     def _reset(self, value, initial=False):
         if not isinstance(value, (dict, list)):
             raise ValueError('widget state has to be dict or list')
 
+        if not initial:
+            self._assert_not_frozen()
+
         check_value(value)
 
         with self._widget.lock:
             self._data = value
+            self._owned_containers = {}
 
             if not initial:
+                self._widget._invalidate_serialization_cache()
+
                 self._widget.document.add_patch(
                     node_id=self._widget.id,
                     patch_type=PATCH_TYPE.WIDGET_DATA,
                     operation=OPERATION.RESET,
                     payload=[
                         [],
-                        deepcopy(value),
+                        value,
                     ],
                 )
 
@@ -457,18 +598,16 @@ class WidgetData:
                 self._overlay = ListOverlay(
                     widget_data=self,
                     key_path=[],
-                    original_data=self._data,
                 )
 
             elif isinstance(value, dict):
                 self._overlay = DictOverlay(
                     widget_data=self,
                     key_path=[],
-                    original_data=self._data,
                 )
 
     def _serialize(self):
-        return deepcopy(self._data)
+        return self._share()
 
     # string representation ###################################################
     def __repr__(self):
@@ -25,7 +25,10 @@ class LonaMessageMiddleware:
             return data
 
         if method == METHOD.PING:
-            data.connection.send_str(encode_pong(), wait=False)
+            data.connection.send_message(
+                encode_pong(binary=data.connection.binary),
+                wait=False,
+            )
 
             return
 
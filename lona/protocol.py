@@ -4,13 +4,16 @@ from typing import Union, Dict, Any
 from enum import Enum
 import json
 
-from lona._json import dumps
+from lona._msgpack import packb
+from lona._json import ENUM_VALUES, dumps
 
 NoneType = type(None)
 
 
 class PROTOCOL(Enum):
     MESSAGE_PREFIX = 'lona:'
+    JSON_SUBPROTOCOL = 'lona.json'
+    MSGPACK_SUBPROTOCOL = 'lona.msgpack'
 
 
 class EXIT_CODE(Enum):
@@ -72,6 +75,8 @@ class OPERATION(Enum):
     CLEAR = 704
     INSERT = 705
     REMOVE = 706
+    INSERT_MULTIPLE = 707
+    MOVE = 708
 
 
 ENUMS = [
@@ -85,6 +90,10 @@ ENUMS = [
     OPERATION,
 ]
 
+ENUM_VALUES.update({
+    enum_value: enum_value.value for enum in ENUMS for enum_value in enum
+})
+
 
 def get_enum_values() -> Dict[str, Dict[str, Any]]:
     enums = {}
@@ -205,43 +214,101 @@ def decode_message(raw_message: str) -> tuple[
     return (EXIT_CODE.INVALID_METHOD, *message)
 
 
-def encode_input_event_ack(window_id, view_runtime_id, input_event_id):
-    return PROTOCOL.MESSAGE_PREFIX.value + dumps(
+def encode_message(message, binary=False):
+    """
+    Encodes a message as a string, prefixed with PROTOCOL.MESSAGE_PREFIX,
+    or as MessagePack bytes when the connection negotiated the binary
+    protocol. Binary messages need no prefix because the client only
+    receives binary frames from Lona itself.
+    """
+
+    if binary:
+        return packb(message)
+
+    return PROTOCOL.MESSAGE_PREFIX.value + dumps(message)
+
+
+class SharedMessage:
+    """
+    A message that gets sent to multiple windows. The message gets encoded
+    once per encoding, and only the window id gets encoded per window.
+    """
+
+    def __init__(self, view_runtime_id, method, payload):
+        self.message = [view_runtime_id, method, payload]
+        self._encoded_messages = {}
+
+    def encode(self, window_id, binary=False):
+        if binary not in self._encoded_messages:
+            if binary:
+                self._encoded_messages[binary] = b''.join(
+                    packb(value) for value in self.message
+                )
+
+            else:
+                # the message without its opening bracket
+                self._encoded_messages[binary] = dumps(self.message)[1:]
+
+        encoded_message = self._encoded_messages[binary]
+
+        if binary:
+            # fixarray with 4 items
+            return b'\x94' + packb(window_id) + encoded_message
+
+        return (
+            f'{PROTOCOL.MESSAGE_PREFIX.value}[{dumps(window_id)},'
+            f'{encoded_message}'
+        )
+
+
+def encode_input_event_ack(window_id, view_runtime_id, input_event_id,
+                           binary=False):
+
+    return encode_message(
         [window_id, view_runtime_id, METHOD.INPUT_EVENT_ACK, input_event_id],
+        binary=binary,
     )
 
 
-def encode_redirect(window_id, view_runtime_id, target_url):
-    return PROTOCOL.MESSAGE_PREFIX.value + dumps(
+def encode_redirect(window_id, view_runtime_id, target_url, binary=False):
+    return encode_message(
         [window_id, view_runtime_id, METHOD.REDIRECT, target_url],
+        binary=binary,
     )
 
 
-def encode_http_redirect(window_id, view_runtime_id, target_url):
-    return PROTOCOL.MESSAGE_PREFIX.value + dumps(
+def encode_http_redirect(window_id, view_runtime_id, target_url,
+                         binary=False):
+
+    return encode_message(
         [window_id, view_runtime_id, METHOD.HTTP_REDIRECT, target_url],
+        binary=binary,
     )
 
 
-def encode_data(window_id, view_runtime_id, title, data):
-    return PROTOCOL.MESSAGE_PREFIX.value + dumps(
+def encode_data(window_id, view_runtime_id, title, data, binary=False):
+    return encode_message(
         [window_id, view_runtime_id, METHOD.DATA, [title, data]],
+        binary=binary,
     )
 
 
-def encode_view_start(window_id, view_runtime_id):
-    return PROTOCOL.MESSAGE_PREFIX.value + dumps(
+def encode_view_start(window_id, view_runtime_id, binary=False):
+    return encode_message(
         [window_id, view_runtime_id, METHOD.VIEW_START, None],
+        binary=binary,
     )
 
 
-def encode_view_stop(window_id, view_runtime_id):
-    return PROTOCOL.MESSAGE_PREFIX.value + dumps(
+def encode_view_stop(window_id, view_runtime_id, binary=False):
+    return encode_message(
         [window_id, view_runtime_id, METHOD.VIEW_STOP, None],
+        binary=binary,
     )
 
 
-def encode_pong():
-    return PROTOCOL.MESSAGE_PREFIX.value + dumps(
+def encode_pong(binary=False):
+    return encode_message(
         [None, None, METHOD.PONG, None],
+        binary=binary,
     )
@@ -35,17 +35,18 @@ from lona.view_runtime_controller import ViewRuntimeController
 from lona.responses import FileResponse as LonaFileResponse
 from lona.responses import AbstractResponse as LonaResponse
 from lona.middleware_controller import MiddlewareController
+from lona._json import set_backend as set_json_backend
 from lona.responses import JsonResponse, HtmlResponse
 from lona.static_file_loader import StaticFileLoader
 from lona.templating import TemplatingEngine
 from lona.imports import acquire as _acquire
+from lona.protocol import PROTOCOL, METHOD
 from lona.worker_pool import WorkerPool
 from lona.view_loader import ViewLoader
 from lona.routing import Router, Route
 from lona.connection import Connection
 from lona.settings import Settings
 from lona.request import Request
-from lona.protocol import METHOD
 from lona.channels import Worker
 from lona.state import State
 from lona.view import View
@@ -107,6 +108,18 @@ class Server:
 
             self.settings.update(settings_post_overrides)
 
+        # setup json backend
+        set_json_backend(self.settings.JSON_BACKEND)
+
+        # check websocket queue settings
+        if (self.settings.WEBSOCKET_QUEUE_HIGH_WATER_MARK >=
+                self.settings.WEBSOCKET_QUEUE_MAX_SIZE):
+
+            raise ValueError(
+                'settings.WEBSOCKET_QUEUE_HIGH_WATER_MARK has to be lower '
+                'than settings.WEBSOCKET_QUEUE_MAX_SIZE',
+            )
+
         # set feature flags
         # TODO: remove in 2.0
         set_client_version(self.settings.CLIENT_VERSION)
@@ -321,6 +334,8 @@ class Server:
         return connection, (handled, data, middleware)
 
     def _remove_connection(self, connection):
+        connection._close()
+
         self._view_runtime_controller.remove_connection(connection)
 
         if connection in self._websocket_connections:
@@ -474,7 +489,14 @@ class Server:
             websockets_logger.debug('%s closed', connection)
 
         # setup websocket
-        websocket = WebSocketResponse()
+        # clients that support the binary protocol offer it as websocket
+        # subprotocol, next to the json protocol
+        protocols = [PROTOCOL.JSON_SUBPROTOCOL.value]
+
+        if self.settings.WEBSOCKET_BINARY_PROTOCOL:
+            protocols.insert(0, PROTOCOL.MSGPACK_SUBPROTOCOL.value)
+
+        websocket = WebSocketResponse(protocols=protocols)
         await websocket.prepare(http_request)
 
         # setup connection
@@ -493,7 +515,7 @@ class Server:
                         f'{middleware}.handle_connection returned non string data',
                     )
 
-                await connection.send_str(data, wait=False)
+                await websocket.send_str(data)
 
             await close_websocket()
 
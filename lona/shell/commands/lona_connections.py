@@ -22,11 +22,14 @@ class LonaConnectionsCommand:
         server = self.repl.globals['server']
 
         # write connections
-        rows = [['User', 'URL']]
+        rows = [['User', 'URL', 'Queue Depth', 'Send Latency']]
 
         for connection in server._websocket_connections:
-            rows.append(
-                [repr(connection.user), connection.http_request.url.path],
-            )
+            rows.append([
+                repr(connection.user),
+                connection.http_request.url.path,
+                str(connection.queue_depth),
+                f'{connection.send_latency * 1000:.1f}ms',
+            ])
 
         write_table(rows, self.repl.write)
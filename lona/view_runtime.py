@@ -3,6 +3,7 @@ from __future__ import annotations
 from typing import TYPE_CHECKING, Tuple, List, Dict, Any
 from collections.abc import Container, Awaitable
 from concurrent.futures import CancelledError
+from functools import partial
 from datetime import datetime
 from enum import Enum
 import threading
@@ -29,8 +30,10 @@ from lona.protocol import (
     encode_view_start,
     encode_view_stop,
     encode_redirect,
+    SharedMessage,
     encode_data,
     DATA_TYPE,
+    METHOD,
 )
 from lona.errors import ForbiddenError, NotFoundError, ClientError
 from lona.exceptions import StopReason, ServerStop, UserAbort
@@ -113,7 +116,23 @@ class ViewRuntime:
 
         # setup state
         self.connections: Dict[Connection, Tuple[int, URL]] = {}
-        self.document = Document()
+        self.document = Document(
+            diffing=getattr(
+                self.view,
+                'HTML_DIFFING',
+                self.server.settings.HTML_DIFFING,
+            ),
+            full_render_ratio=getattr(
+                self.view,
+                'HTML_FULL_RENDER_RATIO',
+                self.server.settings.HTML_FULL_RENDER_RATIO,
+            ),
+            compact_node_ids=getattr(
+                self.view,
+                'HTML_COMPACT_NODE_IDS',
+                self.server.settings.HTML_COMPACT_NODE_IDS,
+            ),
+        )
         self.interactive: bool = bool(self.route and self.route.interactive)
 
         self.stopped: asyncio.Future[Literal[True]] = asyncio.Future(loop=self.server.loop)  # NOQA: LN001
@@ -520,9 +539,10 @@ class ViewRuntime:
                     window_id=window_id,
                     view_runtime_id=self.view_runtime_id,
                     target_url=target_url,
+                    binary=connection.binary,
                 )
 
-                connection.send_str(message)
+                connection.send_message(message)
 
     def send_http_redirect(self, target_url, connections=None):
         with self.document.lock:
@@ -536,9 +556,10 @@ class ViewRuntime:
                     window_id=window_id,
                     view_runtime_id=self.view_runtime_id,
                     target_url=target_url,
+                    binary=connection.binary,
                 )
 
-                connection.send_str(message)
+                connection.send_message(message)
 
     def _send_html_update(self, title, data, connections=None):
         with self.document.lock:
@@ -546,10 +567,43 @@ class ViewRuntime:
 
             data_type, patches = data
 
+            # connections that issued patches don't get them sent back, so
+            # their messages have to be encoded separately. All other
+            # connections share one message
+            issuers = {patch.issuer for patch in patches if patch.issuer}
+
+            shared_message = SharedMessage(
+                view_runtime_id=self.view_runtime_id,
+                method=METHOD.DATA,
+                payload=[title, [data_type, [patch.data for patch in patches]]],
+            )
+
             for connection, (window_id, _url) in connections.items():
                 if not connection.interactive:
                     continue
 
+                # html updates to connections that fell behind get dropped
+                # and replaced by a snapshot
+                resync_key = (self.view_runtime_id, window_id)
+
+                resync = partial(
+                    self._resync_connection,
+                    connection=connection,
+                    window_id=window_id,
+                )
+
+                if (connection, window_id) not in issuers:
+                    connection.send_message(
+                        shared_message.encode(
+                            window_id=window_id,
+                            binary=connection.binary,
+                        ),
+                        resync_key=resync_key,
+                        resync=resync,
+                    )
+
+                    continue
+
                 # filter patches
                 _patches = []
 
@@ -567,9 +621,53 @@ class ViewRuntime:
                     view_runtime_id=self.view_runtime_id,
                     title=title,
                     data=[data_type, _patches],
+                    binary=connection.binary,
                 )
 
-                connection.send_str(message)
+                connection.send_message(
+                    message,
+                    resync_key=resync_key,
+                    resync=resync,
+                )
+
+    def _resync_connection(self, connection, window_id):
+        # sends a snapshot of the document to a connection that fell behind
+        # and dropped html updates
+
+        with self.document.lock:
+            resync_key = (self.view_runtime_id, window_id)
+
+            # the snapshot would contain changes that the view did not show
+            # yet, so it gets taken with the next html update of the view,
+            # which then gets dropped for this window.
+            # Stopped views show no html updates anymore, so their windows
+            # get the current state of the document
+            if (self.document._patch_stack.has_patches() and
+                    not self.is_stopped):
+
+                return connection._finish_resync(
+                    resync_key=resync_key,
+                    defer=True,
+                )
+
+            message = None
+
+            if self.connections.get(connection, (None, ))[0] == window_id:
+                title, data_type, data = self.document.serialize()
+
+                if data_type and data:
+                    message = encode_data(
+                        window_id=window_id,
+                        view_runtime_id=self.view_runtime_id,
+                        title=title,
+                        data=[data_type, data],
+                        binary=connection.binary,
+                    )
+
+            connection._finish_resync(
+                resync_key=resync_key,
+                message=message,
+            )
 
     def send_data(self, title=None, data=None, connections=None):
         if data and data[0] == DATA_TYPE.HTML_UPDATE:
@@ -582,19 +680,23 @@ class ViewRuntime:
         with self.document.lock:
             connections = connections or self.connections
 
+            shared_message = SharedMessage(
+                view_runtime_id=self.view_runtime_id,
+                method=METHOD.DATA,
+                payload=[title, data],
+            )
+
             # send message
             for connection, (window_id, _url) in connections.items():
                 if not connection.interactive:
                     continue
 
-                message = encode_data(
+                message = shared_message.encode(
                     window_id=window_id,
-                    view_runtime_id=self.view_runtime_id,
-                    title=title,
-                    data=data,
+                    binary=connection.binary,
                 )
 
-                connection.send_str(message)
+                connection.send_message(message)
 
     def send_view_start(self, connections=None):
         with self.document.lock:
@@ -607,9 +709,10 @@ class ViewRuntime:
                 message = encode_view_start(
                     window_id=window_id,
                     view_runtime_id=self.view_runtime_id,
+                    binary=connection.binary,
                 )
 
-                connection.send_str(message)
+                connection.send_message(message)
 
     def send_view_stop(self, connections=None):
         with self.document.lock:
@@ -622,9 +725,10 @@ class ViewRuntime:
                 message = encode_view_stop(
                     window_id=window_id,
                     view_runtime_id=self.view_runtime_id,
+                    binary=connection.binary,
                 )
 
-                connection.send_str(message)
+                connection.send_message(message)
 
     def handle_response(self, response, connections=None):
         connections = connections or self.connections
@@ -761,11 +865,12 @@ class ViewRuntime:
             if self.server.settings.TEST_INPUT_EVENT_TIMEOUT:
                 time.sleep(self.server.settings.CLIENT_INPUT_EVENT_TIMEOUT + 1)
 
-            connection.send_str(
+            connection.send_message(
                 encode_input_event_ack(
                     window_id=self.connections[connection][0],
                     view_runtime_id=self.view_runtime_id,
                     input_event_id=payload[0],
+                    binary=connection.binary,
                 ),
             )
 
@@ -177,9 +177,10 @@ class ViewRuntimeController:
                 window_id=window_id,
                 view_runtime_id=None,
                 target_url=url,
+                binary=connection.binary,
             )
 
-            connection.send_str(message)
+            connection.send_message(message)
 
             views_logger.debug('message handled')
 
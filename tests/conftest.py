@@ -0,0 +1,14 @@
+import pytest
+
+from lona.html import Table, Tr, Td
+
+
+@pytest.fixture
+def table():
+    # a 100x20 table for tests that check the cost of operations on big
+    # trees. Tests that need multiple tables can clone it
+
+    return Table(*[
+        Tr(*[Td(f'{row}:{column}') for column in range(20)])
+        for row in range(100)
+    ])
@@ -1,6 +1,7 @@
 import pytest
 
-from lona.html import Div
+from lona.html.document import Document
+from lona.html import Span, Div
 
 
 def test_nodes_in_nodes():
@@ -118,6 +119,36 @@ def test_node_loop_detection():
     with pytest.raises(RuntimeError, match='loop detected'):
         div[0][0][0].append(div[0][0])
 
+    # bulk insertion
+    def extend(node_list, nodes):
+        node_list.extend(nodes)
+
+    def set_slice(node_list, nodes):
+        node_list[0:1] = nodes
+
+    def reset(node_list, nodes):
+        node_list._node.nodes = nodes
+
+    for insert in (extend, set_slice, reset):
+        span1 = Span('1')
+        span2 = Span('2')
+        outer = Div(span1)
+        inner = Div(Span('3'))
+        root = Div(outer, inner)
+        document = Document()
+
+        document.apply(html=root)
+
+        with pytest.raises(RuntimeError, match='loop detected'):
+            insert(inner.nodes, [span1, span2, root])
+
+        assert not document.is_dirty
+        assert inner[0].parent is inner
+        assert span1.parent is outer
+        assert span2.parent is None
+        assert list(outer.nodes) == [span1]
+        assert len(inner.nodes) == 1
+
 
 def test_sub_node_reset_with_node():
     div1 = Div()
@@ -137,3 +168,67 @@ def test_sub_node_reset_with_node_list():
 
     assert len(div1.nodes) == 1
     assert div1.nodes[0] is div2
+
+
+def test_extend():
+    div1 = Div()
+    div2 = Div()
+    div3 = Div()
+    outer_div = Div(div1)
+
+    outer_div.nodes.extend([div2, 'foo', div3])
+
+    assert len(outer_div) == 4
+    assert outer_div[1] is div2
+    assert str(outer_div[2]) == 'foo'
+    assert outer_div[3] is div3
+
+    # nodes that are already mounted get moved
+    outer_div.nodes.extend([div1, div2])
+
+    assert len(outer_div) == 4
+    assert outer_div[2] is div1
+    assert outer_div[3] is div2
+
+    # nodes that are passed multiple times end up on their last position
+    outer_div.nodes.extend([div3, div1, div3])
+
+    assert len(outer_div) == 4
+    assert outer_div[1] is div2
+    assert outer_div[2] is div1
+    assert outer_div[3] is div3
+
+
+def test_slice_assignment():
+    divs = [Div() for _ in range(6)]
+    outer_div = Div(divs[0:4])
+
+    # replace
+    outer_div.nodes[1:3] = [divs[4], divs[5]]
+
+    assert list(outer_div) == [divs[0], divs[4], divs[5], divs[3]]
+    assert divs[1].parent is None
+    assert divs[2].parent is None
+
+    # insert
+    outer_div.nodes[1:1] = [divs[1]]
+
+    assert list(outer_div) == [divs[0], divs[1], divs[4], divs[5], divs[3]]
+
+    # delete
+    outer_div.nodes[1:3] = []
+
+    assert list(outer_div) == [divs[0], divs[5], divs[3]]
+
+    # move nodes from the left of the slice
+    outer_div.nodes[2:] = [divs[0], divs[2]]
+
+    assert list(outer_div) == [divs[5], divs[0], divs[2]]
+
+    # extended slices
+    outer_div.nodes[::2] = [divs[3], divs[4]]
+
+    assert list(outer_div) == [divs[3], divs[0], divs[4]]
+
+    with pytest.raises(ValueError, match='extended slice'):
+        outer_div.nodes[::2] = [divs[1]]
@@ -2,6 +2,7 @@ import pytest
 
 from lona.html import (
     NumberInput,
+    parse_html,
     TextInput,
     TextArea,
     CheckBox,
@@ -16,6 +17,7 @@ from lona.html import (
     Node,
     Div,
 )
+from lona.html.parsing import get_parse_html_cache_info, clear_parse_html_cache
 from lona.compat import set_use_future_node_classes
 
 
@@ -362,3 +364,84 @@ def test_attribute_cases():
 
     assert node1.attributes['preserveAspectRatio'] == 'none'
     assert node2.attributes['preserveAspectRatio'] == 'none'
+
+
+# parse_html cache ############################################################
+def test_parse_html_cache():
+    clear_parse_html_cache()
+
+    html_string = '<div class="card"><span>foo</span><input type="number"></div>'
+
+    node1 = parse_html(html_string)
+    node2 = parse_html(html_string)
+
+    cache_info = get_parse_html_cache_info()
+
+    assert cache_info.hits == 1
+    assert cache_info.misses == 1
+
+    # every call returns a new tree
+    assert node1 is not node2
+    assert node1.id != node2.id
+    assert node1[0][0] is not node2[0][0]
+    assert node1[0][0].id != node2[0][0].id
+    assert isinstance(node2[1], NumberInput)
+    assert node1 == node2
+
+    node1.class_list.add('foo')
+    node1[0].append('bar')
+
+    assert parse_html(html_string) == node2
+
+    # node classes are part of the cache key
+    class CustomSpan(Node):
+        TAG_NAME = 'span'
+
+    node3 = parse_html(html_string, node_classes={'span': CustomSpan})
+
+    assert isinstance(node3[0], CustomSpan)
+    assert not isinstance(parse_html(html_string)[0], CustomSpan)
+    assert type(parse_html(html_string, use_high_level_nodes=False)[1]) is Node
+
+
+def test_parse_html_cache_with_custom_node_state():
+    clear_parse_html_cache()
+
+    class Card(Node):
+        TAG_NAME = 'div'
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+
+            self.title = Node(tag_name='span')
+            self.items = []
+
+    html_string = '<div>foo</div>'
+    node_classes = {'div': Card}
+
+    card1 = parse_html(html_string, node_classes=node_classes)
+
+    card1.title.nodes = 'changed'
+    card1.items.append(1)
+
+    card2 = parse_html(html_string, node_classes=node_classes)
+
+    # the constructors run on every call, so custom instance state is never
+    # shared between the returned trees
+    assert card2.title is not card1.title
+    assert card2.title.nodes == []
+    assert card2.items == []
+
+
+def test_parse_html_cache_with_textarea():
+    textarea1 = parse_html('<textarea>foo</textarea>')
+    textarea2 = parse_html('<textarea>foo</textarea>')
+
+    assert textarea1 is not textarea2
+    assert textarea2.value == 'foo'
+
+
+def test_parse_html_cache_with_errors():
+    for _ in range(2):
+        with pytest.raises(ValueError, match='missing end tag'):
+            parse_html('<div>')
@@ -1,11 +1,18 @@
 import pytest
 
+from lona.html.selector import get_selector_cache_info, clear_selector_cache
 from lona.html import HTML1, Span, Div, H1
 
 
 def test_unsupported_selector():
     with pytest.raises(ValueError, match='unsupported selector feature:*'):
-        HTML1().query_selector('div > div')
+        HTML1().query_selector('div + div')
+
+
+def test_invalid_selector():
+    for selector in ('> div', 'div >', 'div > > div'):
+        with pytest.raises(ValueError, match='invalid selector:*'):
+            HTML1().query_selector(selector)
 
 
 def test_query_selector():
@@ -97,3 +104,106 @@ def test_closest():
     node = span.closest('div#foo')
 
     assert node is html[0]
+
+
+def test_combinators():
+    html = Div(
+        Div(
+            Span(_class='foo'),
+            Div(
+                Span(_class='foo'),
+            ),
+            _id='foo',
+        ),
+        Span(_class='foo'),
+        _class='root',
+    )
+
+    # descendant
+    assert html.query_selector_all('#foo .foo') == [
+        html[0][0],
+        html[0][1][0],
+    ]
+
+    assert html.query_selector_all('.root .foo') == [
+        html[0][0],
+        html[0][1][0],
+        html[1],
+    ]
+
+    # child
+    assert html.query_selector_all('#foo > .foo') == [html[0][0]]
+    assert html.query_selector_all('#foo>span') == [html[0][0]]
+    assert html.query_selector_all('.root > .foo') == [html[1]]
+
+    # mixed
+    assert html.query_selector_all('.root > div span') == [
+        html[0][0],
+        html[0][1][0],
+    ]
+
+    assert html.query_selector_all('.root div > div > span') == [
+        html[0][1][0],
+    ]
+
+    # comma separated
+    assert html.query_selector_all('#foo > span, .root > span') == [
+        html[0][0],
+        html[1],
+    ]
+
+    # closest
+    assert html[0][1][0].closest('.root > div') is html[0]
+
+
+def test_quoted_attribute_values():
+    html = Div(
+        Div(
+            Span(data_x='b'),
+            data_x='a',
+        ),
+        Span(data_x='a b'),
+        Span(data_x='a > b, c'),
+    )
+
+    # whitespace, combinators and commas in attribute values
+    assert html.query_selector_all('[data-x="a b"]') == [html[1]]
+    assert html.query_selector_all("span[data-x='a > b, c']") == [html[2]]
+
+    assert html.query_selector_all('div > [data-x="a b"], [data-x=b]') == [
+        html[0][0],
+        html[1],
+    ]
+
+    # unterminated attribute selectors and quotes
+    for selector in ('[data-x="a b"', '[data-x="a b]'):
+        with pytest.raises(ValueError, match='invalid selector:*'):
+            html.query_selector(selector)
+
+
+def test_selector_cache():
+    clear_selector_cache()
+
+    html = Div(Span(_class='foo'))
+
+    for _ in range(3):
+        assert html.query_selector('div .foo') is html[0]
+
+    cache_info = get_selector_cache_info()
+
+    assert cache_info.hits == 2
+    assert cache_info.misses == 1
+
+
+def test_deep_trees():
+    html = Div()
+    node = html
+
+    for _ in range(2000):
+        node.append(Div())
+        node = node[0]
+
+    node.append(Span(_class='foo'))
+
+    assert html.query_selector('.foo') is node[0]
+    assert len(html.query_selector_all('div')) == 2000
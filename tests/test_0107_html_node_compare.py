@@ -89,3 +89,98 @@ def test_widget_data():
     assert Div(widget_data=['foo']) == Div(widget_data=['foo'])
     assert Div(widget_data=['foo']) != Div(widget_data=['foo', 'bar'])
     assert Div(widget_data=['foo']) != Div()
+
+    # nodes with untouched widget data have to be equal to nodes whose
+    # widget data was created from the same defaults
+    class ListNode(Div):
+        WIDGET_DATA = []
+
+    node1 = ListNode()
+    node2 = ListNode()
+
+    node2.widget_data
+
+    assert node1._get_content_hash() == node2._get_content_hash()
+    assert node1 == node2
+
+
+def test_content_hashes():
+    div1 = Div(Div(Span('foo'), _class='foo'), style={'color': 'red'})
+    div2 = Div(Div(Span('foo'), _class='foo'), style={'color': 'red'})
+
+    assert div1._get_content_hash() == div2._get_content_hash()
+
+    # content hashes get invalidated up the parent chain
+    div2[0][0].attributes['foo'] = 'bar'
+
+    assert div1._get_content_hash() != div2._get_content_hash()
+    assert div1 != div2
+
+    del div2[0][0].attributes['foo']
+
+    assert div1._get_content_hash() == div2._get_content_hash()
+    assert div1 == div2
+
+    # widget data
+    div2[0].widget_data = {'foo': ['bar']}
+
+    assert div1._get_content_hash() != div2._get_content_hash()
+    assert div1 != div2
+
+
+def test_content_hashes_of_deep_trees():
+    def render():
+        html = Div()
+        node = html
+
+        for _ in range(2000):
+            child = Div()
+            node.append(child)
+            node = child
+
+        return html, node
+
+    html1, node1 = render()
+    html2, node2 = render()
+
+    assert html1._get_content_hash() == html2._get_content_hash()
+
+    # the comparison stops at the root node
+    node2.append(Span())
+
+    assert html1 != html2
+
+
+def test_inherited_namespaces():
+    # namespaces are not part of the content hash, but still get compared
+    assert Div(Div(), namespace='foo')[0] == Div(Div(namespace='foo'))[0]
+    assert Div(Div(), namespace='foo')[0] != Div(Div())[0]
+
+
+def test_node_comparison_cache_hits(mocker, table):
+    # a 100x20 table gets compared to a copy, that differs in its last cell,
+    # multiple times
+
+    other_table = table.clone()
+    other_table[-1][-1][0] = 'foo'
+
+    spy = mocker.spy(Node, '_compute_content_hash')
+
+    # the first comparison computes the content hashes of both tables
+    assert table != other_table
+    assert spy.call_count == 2 * (1 + 100 + 100 * 20)
+
+    # the content hashes are cached, so the comparison stops at the root
+    spy.reset_mock()
+
+    for _ in range(100):
+        assert table != other_table
+
+    assert spy.call_count == 0
+
+    # mutations invalidate only the content hashes of the changed node and
+    # its ancestors
+    other_table[-1][-1][0] = '99:19'
+
+    assert table == other_table
+    assert spy.call_count == 3
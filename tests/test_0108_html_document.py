@@ -0,0 +1,250 @@
+import pytest
+
+from lona.html.abstract_node import DummyDocument
+from lona.html.document import Document
+from lona.html import Span, Div
+from lona._json import dumps
+from lona import unique_ids
+
+
+def setup_document(html):
+    document = Document()
+    document.apply(html=html)
+
+    return document
+
+
+def test_get_node():
+    span = Span('foo')
+    div = Div(Div(span))
+    document = setup_document(div)
+
+    assert document.get_node(div.id) == [div]
+    assert document.get_node(span.id) == [span, div[0], div]
+    assert document.get_node(span[0].id) == [span[0], span, div[0], div]
+    assert document.get_node('unknown-node-id') == []
+
+
+def test_node_index_on_mount():
+    div = Div()
+    document = setup_document(div)
+
+    # append
+    span1 = Span(Span())
+    div.append(span1)
+
+    assert document.get_node(span1.id)[0] is span1
+    assert document.get_node(span1[0].id)[0] is span1[0]
+
+    # insert
+    span2 = Span()
+    div.insert(0, span2)
+
+    assert document.get_node(span2.id)[0] is span2
+
+    # set
+    span3 = Span()
+    div[0] = span3
+
+    assert document.get_node(span3.id)[0] is span3
+    assert document.get_node(span2.id) == []
+
+    # reset
+    span4 = Span()
+    div.nodes = [span1, span4]
+
+    assert document.get_node(span1.id)[0] is span1
+    assert document.get_node(span4.id)[0] is span4
+    assert document.get_node(span3.id) == []
+
+
+def test_node_index_on_unmount():
+    span1 = Span(Span())
+    span2 = Span()
+    span3 = Span()
+    div = Div(span1, span2, span3)
+    document = setup_document(div)
+
+    # remove
+    div.remove(span1)
+
+    assert document.get_node(span1.id) == []
+    assert document.get_node(span1[0].id) == []
+
+    # pop
+    div.pop(0)
+
+    assert document.get_node(span2.id) == []
+
+    # clear
+    div.clear()
+
+    assert document.get_node(span3.id) == []
+    assert document.get_node(div.id) == [div]
+
+
+def test_node_index_on_move():
+    span = Span()
+    div1 = Div(span)
+    div2 = Div()
+    document = setup_document(Div(div1, div2))
+
+    div2.append(span)
+
+    assert document.get_node(span.id)[0:2] == [span, div2]
+    assert document.get_node(span.id)[1] is div2
+
+
+def test_node_index_on_detached_nodes():
+    div = Div()
+    document = setup_document(div)
+
+    span = Span()
+    inner_span = Span()
+
+    div.append(span)
+    div.remove(span)
+
+    # changes on detached sub trees must not leak into the index
+    span.append(inner_span)
+
+    assert document.get_node(span.id) == []
+    assert document.get_node(inner_span.id) == []
+
+
+def test_node_index_on_new_html():
+    span1 = Span()
+    span2 = Span()
+    document = setup_document(Div(span1))
+
+    document.apply(html=Div(span2))
+
+    assert document.get_node(span1.id) == []
+    assert document.get_node(span2.id)[0] is span2
+
+
+def test_document_propagation():
+    span = Span(Span())
+    div = Div(span)
+
+    assert isinstance(span[0].document, DummyDocument)
+
+    # mount
+    document = setup_document(div)
+
+    assert div.document is document
+    assert span.document is document
+    assert span[0].document is document
+
+    # unmount
+    div.remove(span)
+
+    assert isinstance(span.document, DummyDocument)
+    assert isinstance(span[0].document, DummyDocument)
+
+    # mount into another document
+    other_div = Div()
+    other_document = setup_document(other_div)
+
+    other_div.append(span)
+
+    assert span[0].document is other_document
+    assert other_document.get_node(span[0].id)[0] is span[0]
+    assert document.get_node(span[0].id) == []
+
+    # new html
+    other_document.apply(html=Div())
+
+    assert isinstance(other_div.document, DummyDocument)
+    assert isinstance(span[0].document, DummyDocument)
+
+
+def test_loop_detection():
+    span = Span()
+    div = Div(Div(span))
+
+    with pytest.raises(RuntimeError, match='loop detected'):
+        span.append(div)
+
+    with pytest.raises(RuntimeError, match='loop detected'):
+        div.append(div)
+
+    # the tree stays untouched
+    assert span.parent is div[0]
+    assert div.parent is None
+
+
+def test_compact_node_ids():
+    span = Span('foo')
+    div = Div(Div(span))
+    document = Document(compact_node_ids=True)
+
+    # nodes get small integer ids when they get mounted
+    _, _, data = document.apply(html=div)
+
+    assert sorted(i.id for i in [div, *div.iter_nodes()]) == [1, 2, 3, 4]
+    assert data[1] == div.id
+
+    # node ids from the client are strings
+    assert document.get_node(str(span.id)) == [span, div[0], div]
+    assert document.get_node(span.id) == [span, div[0], div]
+
+    # remounted nodes keep their ids
+    node_id = span.id
+
+    div[0].remove(span)
+    div.append(span)
+
+    assert span.id == node_id
+    assert document.get_node(node_id)[0] is span
+
+    # nodes that got their ids outside the document get new ids
+    new_span = Span()
+    new_span_id = new_span.id
+
+    div.append(new_span)
+
+    assert new_span.id == 5
+    assert new_span_id != 5
+
+    # ids that are taken already, get replaced
+    other_document = Document(compact_node_ids=True)
+    other_div = Div(Div(), Div())
+    other_document.apply(html=other_div)
+
+    div.append(other_div[1])
+
+    assert div[-1].id == 6
+    assert document.get_node(6)[0] is div[-1]
+
+
+def test_compact_node_ids_size(monkeypatch, table):
+    # a process that created millions of nodes already, shows a 100x20
+    # table and updates one cell per row
+
+    monkeypatch.setattr(unique_ids._name_spaces['nodes'], '_value', 10000000)
+
+    results = {}
+
+    for compact_node_ids in (False, True):
+        # clones get new node ids
+        html = table.clone()
+        document = Document(compact_node_ids=compact_node_ids)
+
+        _, _, data = document.apply(html=html)
+        html_tree_size = len(dumps(data))
+
+        for row in html:
+            row[0][0] = 'foo'
+
+        _, _, patches = document.apply(html=html)
+        patches_size = len(dumps([patch.data for patch in patches]))
+
+        results[compact_node_ids] = (html_tree_size, patches_size)
+
+    # every node id shrinks from a quoted 8 digit string to an integer with
+    # up to 4 digits
+    node_count = 1 + 100 + 100 * 20 * 2
+
+    assert results[False][0] - results[True][0] >= node_count * (10 - 4)
+    assert results[False][1] - results[True][1] >= 100 * 2 * (10 - 4)
@@ -0,0 +1,979 @@
+from contextlib import nullcontext
+import itertools
+import random
+
+import pytest
+
+from lona.protocol import PATCH_TYPE, OPERATION, NODE_TYPE, DATA_TYPE
+from lona.html.document import Document
+from lona.html import Span, Div
+from lona._json import dumps
+
+
+class Client:
+    """
+    Minimal model of the client side rendering engine, that is used to check
+    that applying a list of patches leads to the same HTML tree as on the
+    server. Like client2, it raises errors on unknown or duplicate node ids.
+    """
+
+    def __init__(self):
+        self.nodes = {}
+        self.root = None
+
+    def _render_node(self, data):
+        node_type, node_id = data[0], data[1]
+
+        if node_id in self.nodes:
+            raise RuntimeError(f'node with id {node_id} is already cached')
+
+        if node_type == NODE_TYPE.TEXT_NODE:
+            node = {'data': [node_type, node_id, data[2]], 'parent': None}
+
+        else:
+            node = {
+                'data': [
+                    node_type,
+                    node_id,
+                    data[2],
+                    data[3],
+                    set(data[4]),
+                    set(data[5]),
+                    dict(data[6]),
+                    dict(data[7]),
+                    [],
+                    data[9],
+                    data[10],
+                ],
+                'parent': None,
+            }
+
+            for child_data in data[8]:
+                self._mount_node(node, self._render_node(child_data))
+
+        self.nodes[node_id] = node
+
+        return node
+
+    def _mount_node(self, parent, node, index=None):
+        if index is None:
+            index = len(parent['data'][8])
+
+        parent['data'][8].insert(index, node)
+        node['parent'] = parent
+
+    def _unmount_node(self, node):
+        node['parent']['data'][8].remove(node)
+        node['parent'] = None
+
+    def _get_node(self, node_id):
+        if node_id not in self.nodes:
+            raise RuntimeError(f'unknown node id: {node_id}')
+
+        return self.nodes[node_id]
+
+    def _clean_node_cache(self):
+        for node_id, node in list(self.nodes.items()):
+            root = node
+
+            while root['parent'] is not None:
+                root = root['parent']
+
+            if root is not self.root:
+                self.nodes.pop(node_id)
+
+    def _apply_patch(self, patch):
+        node_id, patch_type, operation, *payload = patch
+        node = self._get_node(node_id)
+        data = node['data']
+
+        if patch_type == PATCH_TYPE.NODES:
+            if operation == OPERATION.INSERT:
+                self._mount_node(
+                    node,
+                    self._render_node(payload[1]),
+                    index=payload[0],
+                )
+
+            elif operation == OPERATION.INSERT_MULTIPLE:
+                for offset, child_data in enumerate(payload[1]):
+                    self._mount_node(
+                        node,
+                        self._render_node(child_data),
+                        index=payload[0] + offset,
+                    )
+
+            elif operation == OPERATION.MOVE:
+                child_node = self._get_node(payload[1])
+
+                self._unmount_node(child_node)
+                self._mount_node(node, child_node, index=payload[0])
+
+            elif operation == OPERATION.SET:
+                old_node = data[8][payload[0]]
+
+                self._unmount_node(old_node)
+
+                self._mount_node(
+                    node,
+                    self._render_node(payload[1]),
+                    index=payload[0],
+                )
+
+            elif operation == OPERATION.REMOVE:
+                self._unmount_node(self._get_node(payload[0]))
+
+            elif operation == OPERATION.CLEAR:
+                for child_node in list(data[8]):
+                    self._unmount_node(child_node)
+
+            elif operation == OPERATION.RESET:
+                for child_node in list(data[8]):
+                    self._unmount_node(child_node)
+
+                self._clean_node_cache()
+
+                for child_data in payload[0]:
+                    self._mount_node(node, self._render_node(child_data))
+
+            self._clean_node_cache()
+
+            return
+
+        if patch_type == PATCH_TYPE.WIDGET_DATA:
+            if operation == OPERATION.RESET and not payload[0]:
+                data[10] = payload[1]
+
+            else:
+                raise NotImplementedError()
+
+            return
+
+        container = {
+            PATCH_TYPE.ID_LIST: 4,
+            PATCH_TYPE.CLASS_LIST: 5,
+            PATCH_TYPE.STYLE: 6,
+            PATCH_TYPE.ATTRIBUTES: 7,
+        }[patch_type]
+
+        if operation == OPERATION.ADD:
+            data[container].add(payload[0])
+
+        elif operation == OPERATION.SET:
+            data[container][payload[0]] = payload[1]
+
+        elif operation == OPERATION.REMOVE:
+            if isinstance(data[container], set):
+                data[container].discard(payload[0])
+
+            else:
+                data[container].pop(payload[0], None)
+
+        elif operation == OPERATION.CLEAR:
+            data[container].clear()
+
+        elif operation == OPERATION.RESET:
+            data[container] = type(data[container])(payload[0])
+
+    def show_html(self, data_type, data):
+        if data_type == DATA_TYPE.HTML_TREE:
+            self.nodes.clear()
+            self.root = self._render_node(data)
+
+        elif data_type == DATA_TYPE.HTML_UPDATE:
+            for patch in data:
+                self._apply_patch(patch)
+
+    def serialize(self, node=None):
+        data = (node or self.root)['data']
+
+        if data[0] == NODE_TYPE.TEXT_NODE:
+            return list(data)
+
+        return [
+            *data[0:4],
+            sorted(data[4]),
+            sorted(data[5]),
+            data[6],
+            data[7],
+            [self.serialize(child_node) for child_node in data[8]],
+            *data[9:11],
+        ]
+
+
+def setup_document(
+        html,
+        diffing=False,
+        full_render_ratio=None,
+        compact_node_ids=False,
+):
+
+    document = Document(
+        diffing=diffing,
+        full_render_ratio=full_render_ratio,
+        compact_node_ids=compact_node_ids,
+    )
+
+    client = Client()
+
+    client.show_html(*document.apply(html=html)[1:])
+
+    return document, client
+
+
+def apply_patches(document, html, client):
+    _, data_type, patches = document.apply(html=html)
+
+    if data_type is None:
+        return []
+
+    client.show_html(data_type, [patch.data for patch in patches])
+
+    return patches
+
+
+def test_insert_multiple():
+    div = Div(Span('1'))
+    document, client = setup_document(div)
+
+    div.nodes.extend([Span('2'), Span('3'), Span('4')])
+    div.nodes[0:1] = [Span('5'), Span('6')]
+
+    patches = apply_patches(document, div, client)
+
+    assert [patch.operation for patch in patches] == [
+        OPERATION.INSERT_MULTIPLE,
+        OPERATION.REMOVE,
+        OPERATION.INSERT_MULTIPLE,
+    ]
+
+    assert client.serialize() == div._serialize()
+
+
+def test_repeated_sets():
+    div = Div()
+    document, client = setup_document(div)
+
+    for i in range(200):
+        div.style['width'] = f'{i}px'
+        div.attributes['foo'] = i
+
+    patches = apply_patches(document, div, client)
+
+    assert len(patches) == 2
+    assert document.eliminated_patch_count == 398
+    assert client.serialize() == div._serialize()
+
+
+def test_set_and_remove():
+    div = Div(foo='bar')
+    document, client = setup_document(div)
+
+    div.attributes['foo'] = 'baz'
+    del div.attributes['foo']
+
+    patches = apply_patches(document, div, client)
+
+    assert len(patches) == 1
+    assert patches[0].operation == OPERATION.REMOVE
+    assert client.serialize() == div._serialize()
+
+
+def test_add_and_remove():
+    div = Div(_class='foo')
+    document, client = setup_document(div)
+
+    div.class_list.add('bar')
+    div.class_list.remove('bar')
+    div.class_list.remove('foo')
+    div.class_list.add('foo')
+
+    assert apply_patches(document, div, client) == []
+    assert client.serialize() == div._serialize()
+
+
+def test_insert_and_remove():
+    div = Div(Span())
+    document, client = setup_document(div)
+
+    span = Span()
+
+    div.append(span)
+    span.append(Span())
+    span.style['color'] = 'red'
+    div.remove(span)
+
+    assert apply_patches(document, div, client) == []
+    assert client.serialize() == div._serialize()
+
+
+def test_insert_and_remove_with_interleaving_inserts():
+    div = Div()
+    document, client = setup_document(div)
+
+    span1 = Span('1')
+    span2 = Span('2')
+
+    div.append(span1)
+    div.insert(0, span2)
+    div.remove(span1)
+
+    patches = apply_patches(document, div, client)
+
+    assert len(patches) == 3
+    assert client.serialize() == div._serialize()
+
+
+def test_patches_of_inserted_sub_trees():
+    div = Div()
+    document, client = setup_document(div)
+
+    span = Span(Span())
+
+    div.append(span)
+    span.attributes['foo'] = 'bar'
+    span.style['color'] = 'red'
+    span.class_list.add('foo')
+    span[0].attributes['bar'] = 'baz'
+
+    patches = apply_patches(document, div, client)
+
+    assert len(patches) == 1
+    assert patches[0].operation == OPERATION.INSERT
+    assert patches[0].data[4] == span._serialize()
+    assert document.eliminated_patch_count == 4
+    assert client.serialize() == div._serialize()
+
+
+def test_patches_of_changed_inserted_sub_trees():
+    div = Div()
+    document, client = setup_document(div)
+
+    span = Span(Span())
+
+    # sub trees whose nodes get mounted or unmounted after they were
+    # inserted are not folded
+    div.append(span)
+    span.attributes['foo'] = 'bar'
+    span.append(Span())
+    span[0].style['color'] = 'red'
+
+    patches = apply_patches(document, div, client)
+
+    assert [patch.patch_type for patch in patches] == [
+        PATCH_TYPE.NODES,
+        PATCH_TYPE.ATTRIBUTES,
+        PATCH_TYPE.NODES,
+        PATCH_TYPE.STYLE,
+    ]
+
+    assert client.serialize() == div._serialize()
+
+
+def test_clear():
+    div = Div(Span(), Span())
+    document, client = setup_document(div)
+
+    for i in range(10):
+        div.append(Span(i))
+
+    div[-1].class_list.add('foo')
+    div.clear()
+
+    patches = apply_patches(document, div, client)
+
+    assert len(patches) == 1
+    assert patches[0].operation == OPERATION.CLEAR
+    assert client.serialize() == div._serialize()
+
+
+def test_reset():
+    span = Span('1')
+    div = Div(span)
+    document, client = setup_document(div)
+
+    div.append(Span('2'))
+    div.remove(span)
+    div.nodes = [Span('3'), span]
+
+    patches = apply_patches(document, div, client)
+
+    assert [patch.operation for patch in patches] == [
+        OPERATION.REMOVE,
+        OPERATION.RESET,
+    ]
+
+    assert client.serialize() == div._serialize()
+
+
+def test_reset_with_reordered_nodes():
+    spans = [Span(str(i)) for i in range(10)]
+    div = Div(*spans)
+    document, client = setup_document(div)
+
+    # reverse
+    div.nodes = spans[::-1]
+
+    patches = apply_patches(document, div, client)
+
+    assert len(patches) == 9
+    assert all(patch.operation == OPERATION.MOVE for patch in patches)
+    assert client.serialize() == div._serialize()
+
+    # rotate
+    div.nodes = [*div.nodes[1:], div.nodes[0]]
+
+    patches = apply_patches(document, div, client)
+
+    assert [patch.operation for patch in patches] == [OPERATION.MOVE]
+    assert client.serialize() == div._serialize()
+
+    # unchanged
+    div.nodes = list(div.nodes)
+
+    assert apply_patches(document, div, client) == []
+
+
+def test_reset_with_added_and_removed_nodes():
+    spans = [Span(str(i)) for i in range(10)]
+    div = Div(*spans)
+    document, client = setup_document(div)
+
+    # add
+    div.nodes = [*spans[:5], Span('a'), Span('b'), *spans[5:]]
+
+    patches = apply_patches(document, div, client)
+
+    assert [patch.operation for patch in patches] == [
+        OPERATION.INSERT_MULTIPLE,
+    ]
+
+    assert patches[0].data[3] == 5
+    assert client.serialize() == div._serialize()
+
+    # remove and move
+    div.nodes = [spans[9], *spans[1:5], Span('c')]
+
+    patches = apply_patches(document, div, client)
+
+    assert [patch.operation for patch in patches] == [
+        OPERATION.REMOVE,
+        OPERATION.REMOVE,
+        OPERATION.REMOVE,
+        OPERATION.REMOVE,
+        OPERATION.REMOVE,
+        OPERATION.REMOVE,
+        OPERATION.REMOVE,
+        OPERATION.INSERT,
+        OPERATION.MOVE,
+    ]
+
+    assert client.serialize() == div._serialize()
+
+
+def test_node_moved_out_of_removed_sub_tree():
+    div1 = Div()
+    div2 = Div()
+    div = Div(div1, div2)
+    document, client = setup_document(div)
+
+    inner_span = Span()
+    span = Span(inner_span)
+
+    div1.append(span)
+    div2.append(inner_span)
+    inner_span.class_list.add('foo')
+    div1.remove(span)
+
+    apply_patches(document, div, client)
+
+    assert client.serialize() == div._serialize()
+
+
+def test_remounted_node_before_clear():
+    inner_div = Div(Span('1'))
+    div1 = Div(inner_div)
+    div2 = Div()
+    div = Div(div1, div2)
+    document, client = setup_document(div)
+
+    div1.remove(inner_div)
+    div1.append(inner_div)
+    div2.append(inner_div[0])
+    div1.clear()
+
+    apply_patches(document, div, client)
+
+    assert client.serialize() == div._serialize()
+
+
+@pytest.mark.parametrize('compact_node_ids', [False, True])
+@pytest.mark.parametrize('batch', [False, True])
+def test_random_mutations(batch, compact_node_ids):
+    # every node gets a unique attribute, because NodeList.remove() compares
+    # nodes by value
+    node_ids = itertools.count()
+
+    def div(*nodes):
+        return Div(*nodes, data_id=next(node_ids))
+
+    def get_nodes(node):
+        return [node, *node.iter_nodes()]
+
+    def get_element_nodes(node):
+        return [i for i in get_nodes(node) if isinstance(i, Div)]
+
+    def mutate(randomizer, root):
+        for _ in range(randomizer.randint(1, 25)):
+            nodes = get_element_nodes(root)
+            node = randomizer.choice(nodes)
+            action = randomizer.randint(0, 14)
+
+            if action == 0:
+                node.append(div(div(str(randomizer.random()))))
+
+            elif action == 1:
+                node.insert(randomizer.randint(0, len(node.nodes)), div())
+
+            elif action == 2 and node.nodes:
+                node.remove(randomizer.choice(list(node.nodes)))
+
+            elif action == 3 and node is not root:
+                sub_tree = get_nodes(node)
+
+                target = randomizer.choice([
+                    i for i in nodes
+                    if not any(i is j for j in sub_tree)
+                ])
+
+                target.append(node)
+
+            elif action == 4:
+                node.class_list.toggle(randomizer.choice('abc'))
+
+            elif action == 5:
+                node.style[randomizer.choice('xyz')] = randomizer.random()
+
+            elif action == 6:
+                node.style.pop(randomizer.choice('xyz'), None)
+
+            elif action == 7:
+                node.attributes['foo'] = randomizer.random()
+
+            elif action == 8 and randomizer.random() > 0.7:
+                node.clear()
+
+            elif action == 9 and randomizer.random() > 0.7:
+                node.nodes = [
+                    *[i for i in node.nodes if randomizer.random() > 0.5],
+                    div(),
+                ]
+
+            elif action == 10 and node.nodes:
+                node[randomizer.randint(0, len(node.nodes) - 1)] = div()
+
+            elif action == 11:
+                node.class_list = [randomizer.choice('abc')]
+
+            elif action == 12:
+                node.nodes.extend([
+                    div(str(randomizer.random()))
+                    for _ in range(randomizer.randint(0, 3))
+                ])
+
+            elif action == 13:
+                start = randomizer.randint(0, len(node.nodes))
+                stop = randomizer.randint(start, len(node.nodes))
+
+                node.nodes[start:stop] = [
+                    *[i for i in node.nodes if randomizer.random() > 0.7],
+                    *[div() for _ in range(randomizer.randint(0, 2))],
+                ]
+
+            elif action == 14:
+                nodes = [
+                    *[i for i in node.nodes if randomizer.random() > 0.2],
+                    *[div() for _ in range(randomizer.randint(0, 2))],
+                ]
+
+                randomizer.shuffle(nodes)
+                node.nodes = nodes
+
+    for seed in range(50):
+        randomizer = random.Random(seed)
+
+        root = div(div(div('a'), div('b')), div(div('c')))
+
+        document, client = setup_document(
+            root,
+            compact_node_ids=compact_node_ids,
+        )
+
+        raw_client = Client()
+        raw_client.show_html(DATA_TYPE.HTML_TREE, root._serialize())
+
+        for _ in range(10):
+            context = nullcontext()
+
+            if batch and randomizer.random() > 0.5:
+                context = document.batch()
+
+            elif batch:
+                context = randomizer.choice(get_element_nodes(root)).batch()
+
+            with context:
+                mutate(randomizer, root)
+
+            raw_patches = [
+                patch.data for patch in document._patch_stack.patches
+            ]
+
+            apply_patches(document, root, client)
+            raw_client.show_html(DATA_TYPE.HTML_UPDATE, raw_patches)
+
+            assert raw_client.serialize() == root._serialize()
+            assert client.serialize() == root._serialize()
+
+
+def update_span(span, value):
+    span.class_list.toggle(value)
+    span.style['color'] = value
+    span.style['width'] = value
+    span.style['height'] = value
+    span.attributes['title'] = value
+    span.attributes['data-value'] = value
+
+
+def test_batch():
+    spans = [Span(str(i)) for i in range(100)]
+    div = Div(*spans)
+    html = Div(Div(), div)
+    document, client = setup_document(html)
+
+    # many changes get replaced by one RESET
+    with document.batch():
+        html[0].class_list.add('foo')
+
+        for span in spans:
+            update_span(span, 'foo')
+
+    patches = apply_patches(document, html, client)
+
+    assert [(patch.node_id, patch.operation) for patch in patches] == [
+        (html[0].id, OPERATION.ADD),
+        (div.id, OPERATION.RESET),
+    ]
+
+    assert client.serialize() == html._serialize()
+
+    # single changes are kept
+    with document.batch():
+        spans[0].class_list.remove('foo')
+
+    patches = apply_patches(document, html, client)
+
+    assert [(patch.node_id, patch.operation) for patch in patches] == [
+        (spans[0].id, OPERATION.REMOVE),
+    ]
+
+    assert client.serialize() == html._serialize()
+
+
+def test_node_batch():
+    spans1 = [Span(str(i)) for i in range(100)]
+    spans2 = [Span(str(i)) for i in range(100)]
+    div1 = Div(*spans1)
+    div2 = Div(*spans2)
+    html = Div(div1, div2)
+    document, client = setup_document(html)
+
+    # patches outside of the batch node are kept
+    with div1.batch():
+        for span1, span2 in zip(spans1, spans2):
+            update_span(span1, 'foo')
+            update_span(span2, 'foo')
+
+    patches = apply_patches(document, html, client)
+
+    assert len(patches) == 601
+    assert patches[-1].node_id == div1.id
+    assert patches[-1].operation == OPERATION.RESET
+    assert client.serialize() == html._serialize()
+
+    # nested batches get flushed by the outermost batch
+    with html.batch():
+        with div1.batch():
+            for span in spans1:
+                update_span(span, 'bar')
+
+        assert len(document._patch_stack.patches) == 600
+
+        for span in spans2:
+            update_span(span, 'bar')
+
+    patches = apply_patches(document, html, client)
+
+    assert sorted(
+        (patch.node_id, patch.operation) for patch in patches
+    ) == sorted([
+        (div1.id, OPERATION.RESET),
+        (div2.id, OPERATION.RESET),
+    ])
+
+    assert client.serialize() == html._serialize()
+
+    # nodes without a document
+    with Div().batch():
+        pass
+
+
+def test_batch_with_moved_nodes():
+    spans = [Span(str(i)) for i in range(100)]
+    div1 = Div(*spans)
+    div2 = Div()
+    html = Div(div1, div2)
+    document, client = setup_document(html)
+
+    # div1 can't be reset, because the moved span would be rendered twice,
+    # but html can
+    with document.batch():
+        div2.append(spans[0])
+
+        for span in spans[1:]:
+            update_span(span, 'foo')
+
+    patches = apply_patches(document, html, client)
+
+    assert [(patch.node_id, patch.operation) for patch in patches] == [
+        (html.id, OPERATION.RESET),
+    ]
+
+    assert client.serialize() == html._serialize()
+
+    # div1 can't be reset, because div2 is outside of the batch
+    with div1.batch():
+        div2.append(spans[1])
+
+        for span in spans[2:]:
+            update_span(span, 'bar')
+
+    patches = apply_patches(document, html, client)
+
+    assert OPERATION.RESET not in [patch.operation for patch in patches]
+    assert client.serialize() == html._serialize()
+
+    # moves inside of div1
+    with document.batch():
+        div1.append(spans[2])
+
+        for span in spans[2:]:
+            update_span(span, 'baz')
+
+    patches = apply_patches(document, html, client)
+
+    assert [(patch.node_id, patch.operation) for patch in patches] == [
+        (div1.id, OPERATION.RESET),
+    ]
+
+    assert client.serialize() == html._serialize()
+
+
+def test_full_render_fallback():
+    html = Div([Div(Span(i)) for i in range(100)])
+    document, client = setup_document(html, full_render_ratio=1)
+
+    def rebuild():
+        for i in range(3):
+            for node in html:
+                node[0] = Span(node[0][0], style={'color': 'red'}, data_i=i)
+
+    # small updates get sent as patches
+    html[0][0].style['color'] = 'blue'
+
+    title, data_type, patches = document.apply(html=html)
+
+    assert data_type == DATA_TYPE.HTML_UPDATE
+    assert len(patches) == 1
+
+    # patches that are bigger than the tree get replaced by the tree
+    rebuild()
+
+    title, data_type, data = document.apply(html=html)
+
+    assert data_type == DATA_TYPE.HTML_TREE
+    assert data == html._serialize()
+    assert not document.is_dirty
+
+    client.show_html(data_type, data)
+
+    assert client.serialize() == html._serialize()
+
+    # patches that were issued by a client never get replaced
+    rebuild()
+    html.attributes.__setitem__('foo', 'bar', issuer=('connection', 1))
+
+    title, data_type, patches = document.apply(html=html)
+
+    assert data_type == DATA_TYPE.HTML_UPDATE
+
+    # disabled
+    document.full_render_ratio = None
+
+    rebuild()
+
+    title, data_type, patches = document.apply(html=html)
+
+    assert data_type == DATA_TYPE.HTML_UPDATE
+
+
+def test_diffing():
+    def render(items, color):
+        return Div(
+            Span('title', style={'color': color}),
+            Div(*[Span(item, _class=item) for item in items]),
+        )
+
+    html = render(['a', 'b', 'c'], 'red')
+    document, client = setup_document(html, diffing=True)
+
+    # changed attributes, text and appended nodes
+    new_html = render(['a', 'x', 'c', 'd', 'e'], 'blue')
+
+    title, data_type, patches = document.apply(html=new_html)
+
+    assert data_type == DATA_TYPE.HTML_UPDATE
+
+    client.show_html(data_type, [patch.data for patch in patches])
+
+    assert client.serialize() == new_html._serialize()
+    assert new_html.id == html.id
+    assert new_html[1][0].id == html[1][0].id
+    assert new_html[1][1].id == html[1][1].id
+    assert new_html[1][1][0].id != html[1][1][0].id
+    assert document.get_node(html.id)[0] is new_html
+
+    # removed nodes
+    html = new_html
+    new_html = render(['a'], 'blue')
+
+    patches = apply_patches(document, new_html, client)
+
+    assert [patch.operation for patch in patches] == [
+        OPERATION.REMOVE,
+        OPERATION.REMOVE,
+        OPERATION.REMOVE,
+        OPERATION.REMOVE,
+    ]
+
+    assert client.serialize() == new_html._serialize()
+
+    # unchanged tree
+    assert apply_patches(document, render(['a'], 'blue'), client) == []
+
+
+def test_diffing_with_pending_patches():
+    html = Div(Span('a'), Span('b'))
+    document, client = setup_document(html, diffing=True)
+
+    html.append(Span('c'))
+    html[0].attributes['foo'] = 'bar'
+
+    new_html = Div(Span('a'), Span('b'), Span('c'), Span('d'))
+
+    apply_patches(document, new_html, client)
+
+    assert client.serialize() == new_html._serialize()
+
+
+def test_diffing_with_pending_inserts_of_new_nodes():
+    html = Div(Div(Span('a')))
+    document, client = setup_document(html, diffing=True)
+
+    # the INSERT patch of span stays pending, because the REMOVE patch of
+    # the move can't be compacted with it
+    span = Span('a')
+
+    html.append(span)
+    html.append(Span('b'))
+
+    new_html = Div(Div(span))
+
+    apply_patches(document, new_html, client)
+
+    assert client.serialize() == new_html._serialize()
+
+
+def test_diffing_fallbacks():
+
+    # diffing disabled
+    document, client = setup_document(Div())
+
+    assert document.apply(html=Div())[1] == DATA_TYPE.HTML_TREE
+
+    # different root nodes
+    document, client = setup_document(Div(), diffing=True)
+
+    assert document.apply(html=Span())[1] == DATA_TYPE.HTML_TREE
+
+    # HTML strings
+    document, client = setup_document(Div(), diffing=True)
+
+    assert document.apply(html='<div></div>')[1] == DATA_TYPE.HTML
+    assert document.apply(html=Div())[1] == DATA_TYPE.HTML_TREE
+
+
+def test_diffing_patch_size(table):
+    # a view that rebuilds its table on every tick, while only one cell
+    # changes
+
+    sent_bytes = {}
+
+    for diffing in (False, True):
+        document = Document(diffing=diffing)
+        document.apply(html=table.clone())
+
+        sent_bytes[diffing] = 0
+
+        for tick in range(20):
+            html = table.clone()
+            html[tick][0][0] = str(tick)
+
+            _, data_type, data = document.apply(html=html)
+
+            if data_type == DATA_TYPE.HTML_UPDATE:
+                data = [patch.data for patch in data]
+
+            sent_bytes[diffing] += len(dumps([data_type, data]))
+
+    assert sent_bytes[True] < sent_bytes[False] / 100
+
+
+@pytest.mark.parametrize('compact_node_ids', [False, True])
+def test_random_diffs(compact_node_ids):
+    def render(randomizer, depth=0):
+        if depth > 3 or randomizer.random() > 0.8:
+            return randomizer.choice('ab')
+
+        return randomizer.choice([Div, Span])(
+            *[
+                render(randomizer, depth=depth + 1)
+                for _ in range(randomizer.randint(0, 4))
+            ],
+            _class=randomizer.choice(['', 'a', 'b']),
+        )
+
+    for seed in range(50):
+        randomizer = random.Random(seed)
+
+        document, client = setup_document(
+            Div(),
+            diffing=True,
+            compact_node_ids=compact_node_ids,
+        )
+
+        for _ in range(10):
+            html = Div(render(randomizer), render(randomizer))
+
+            apply_patches(document, html, client)
+
+            assert client.serialize() == html._serialize()
@@ -0,0 +1,116 @@
+from lona.html import Widget, Span, Node, Div
+
+
+def test_serialization_cache():
+    span = Span()
+    div = Div(span)
+
+    assert div._serialize() is div._serialize()
+
+    # changes of sub nodes invalidate all parent caches
+    data = div._serialize()
+
+    span.class_list.add('foo')
+
+    assert div._serialize() is not data
+    assert div._serialize()[8][0][5] == ['foo']
+
+    # attributes, style, ids and node lists
+    span.id_list.add('bar')
+    span.style['color'] = 'red'
+    span.attributes['foo'] = 'bar'
+    span.append('baz')
+
+    assert div._serialize()[8][0] == span._serialize()
+    assert div._serialize()[8][0][4] == ['bar']
+    assert div._serialize()[8][0][6] == {'color': 'red'}
+    assert div._serialize()[8][0][7] == {'foo': 'bar'}
+    assert div._serialize()[8][0][8][0][2] == 'baz'
+
+    # removed nodes
+    div.remove(span)
+
+    assert div._serialize()[8] == []
+
+    # serialization without node ids is not cached
+    assert div._serialize(include_node_ids=False) is not \
+        div._serialize(include_node_ids=False)
+
+
+def test_serialization_cache_with_widget_data():
+    div = Div(Div(widget='foo', widget_data={'foo': []}))
+
+    div._serialize()
+    div[0].widget_data['foo'].append(1)
+
+    assert div._serialize()[8][0][10] == {'foo': [1]}
+
+
+def test_serialization_cache_with_namespaces():
+    span = Span(Span())
+    svg = Node(namespace='http://www.w3.org/2000/svg')
+    div = Div(span, svg)
+
+    assert div._serialize()[8][0][8][0][2] == ''
+
+    # moved nodes inherit the namespace of their new parent
+    svg.append(span)
+
+    assert div._serialize()[8][0][8][0][2] == 'http://www.w3.org/2000/svg'
+    assert span._serialize()[8][0][2] == 'http://www.w3.org/2000/svg'
+
+
+def test_serialization_cache_with_legacy_widgets():
+    class TestWidget(Widget):
+        def __init__(self):
+            self.nodes = [Span()]
+
+    widget = TestWidget()
+    div = Div(widget)
+
+    div._serialize()
+    widget.nodes[0].class_list.add('foo')
+
+    assert div._serialize()[8][0][3][0][5] == ['foo']
+
+    div._serialize()
+    widget.data = {'foo': 'bar'}
+
+    assert div._serialize()[8][0][4] == {'foo': 'bar'}
+
+
+def test_lazy_attribute_containers():
+    class TestNode(Node):
+        TAG_NAME = 'test'
+        ID_LIST = ['foo']
+        CLASS_LIST = ['bar', 'baz']
+        STYLE = {'color': 'red'}
+        ATTRIBUTES = {'foo': 'bar'}
+        WIDGET = 'TestWidget'
+        WIDGET_DATA = {'foo': 'bar'}
+
+    node = TestNode()
+
+    assert node._id_list is None
+    assert node._nodes is None
+    assert len(node) == 0
+    assert list(node) == []
+
+    # unset containers get serialized from the class defaults
+    assert node._serialize()[4:] == [
+        ['foo'],
+        ['bar', 'baz'],
+        {'color': 'red'},
+        {'foo': 'bar'},
+        [],
+        'TestWidget',
+        {'foo': 'bar'},
+    ]
+
+    # containers get created on first access
+    assert node.class_list == ['bar', 'baz']
+    assert node._class_list is not None
+
+    node.class_list.remove('bar')
+
+    assert node._serialize()[5] == ['baz']
@@ -0,0 +1,92 @@
+from lona.html.rendering import render_html
+from lona.html import RawHTML, Span, Div, Br
+
+
+def test_rendering():
+    html = Div(
+        Span('foo', _class='foo'),
+        Br(),
+        Div(
+            'multi\nline',
+            style={'color': 'red'},
+        ),
+    )
+
+    assert str(html) == render_html(html)
+
+    assert str(html) == '\n'.join([
+        f'<div data-lona-node-id="{html.id}">',
+        f'  <span data-lona-node-id="{html[0].id}" class="foo">',
+        '    foo',
+        '  </span>',
+        f'  <br data-lona-node-id="{html[1].id}" />',
+        f'  <div data-lona-node-id="{html[2].id}" style="color: red">',
+        '    multi',
+        '    line',
+        '  </div>',
+        '</div>',
+    ])
+
+
+def test_minified_rendering():
+    html = Div(
+        Span('foo'),
+        Br(),
+        Div('multi\nline'),
+    )
+
+    assert render_html(html, minified=True) == ''.join([
+        f'<div data-lona-node-id="{html.id}">',
+        f'<span data-lona-node-id="{html[0].id}">foo</span>',
+        f'<br data-lona-node-id="{html[1].id}" />',
+        f'<div data-lona-node-id="{html[2].id}">multi\nline</div>',
+        '</div>',
+    ])
+
+
+def test_custom_rendering():
+    raw_html = RawHTML('<b>foo</b>')
+    html = Div(raw_html)
+
+    assert str(html) == '\n'.join([
+        f'<div data-lona-node-id="{html.id}">',
+        *[f'  {line}' for line in str(raw_html).splitlines()],
+        '</div>',
+    ])
+
+
+def test_deep_trees():
+    html = Div()
+    node = html
+
+    for _ in range(2000):
+        child = Div()
+        node.append(child)
+        node = child
+
+    assert render_html(html, minified=True) == (
+        ''.join(f'<div data-lona-node-id="{i.id}">' for i in [html, *html.iter_nodes()]) +  # NOQA: LN001
+        '</div>' * 2001
+    )
+
+
+async def test_html_responses(lona_app_context):
+    from aiohttp import ClientSession
+
+    from lona import View
+
+    html = Div([Div(Span(i)) for i in range(10000)])
+
+    def setup_app(app):
+        @app.route('/', interactive=False)
+        class HtmlResponseView(View):
+            def handle_request(self, request):
+                return html
+
+    context = await lona_app_context(setup_app)
+
+    async with ClientSession() as session:
+        async with session.get(context.make_url('/')) as response:
+            assert response.status == 200
+            assert response.content_type == 'text/html'
+            assert await response.text() == str(html)
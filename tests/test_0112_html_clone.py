@@ -0,0 +1,138 @@
+import pytest
+
+from lona.html import (
+    NumberInput,
+    RawHTML,
+    Widget,
+    Button,
+    CLICK,
+    Span,
+    Node,
+    Div,
+)
+from lona.html.document import Document
+
+
+def test_clone():
+    def handle_click(input_event):
+        pass
+
+    node = Div(
+        Span('foo', _class='foo bar', style={'color': 'red'}),
+        Button('click me', handle_click=handle_click),
+        NumberInput(value=10),
+        _id='foo',
+        data_foo='bar',
+        events=[CLICK],
+        widget='Widget',
+        widget_data={'foo': ['bar']},
+    )
+
+    node.state['foo'] = 'bar'
+
+    clone = node.clone()
+
+    assert clone == node
+    assert clone.parent is None
+    assert clone[0].parent is clone
+    assert clone[0][0].parent is clone[0]
+
+    # node ids
+    ids = {i.id for i in [node, *node.iter_nodes()]}
+    clone_ids = {i.id for i in [clone, *clone.iter_nodes()]}
+
+    assert not ids & clone_ids
+
+    # node classes and custom attributes
+    assert type(clone[1]) is Button
+    assert type(clone[2]) is NumberInput
+    assert clone[1].handle_click is handle_click
+    assert clone[2].value == 10
+    assert clone.state == {'foo': 'bar'}
+
+    # the clone is independent of the original
+    clone.class_list.add('baz')
+    clone[0].class_list.add('baz')
+    clone[0].style['color'] = 'blue'
+    clone.widget_data['foo'].append('baz')
+    clone.state['foo'] = 'baz'
+    clone.append(Div())
+
+    assert node.class_list == []
+    assert node[0].class_list == ['foo', 'bar']
+    assert node[0].style == {'color': 'red'}
+    assert node.widget_data == {'foo': ['bar']}
+    assert node.state == {'foo': 'bar'}
+    assert len(node.nodes) == 3
+
+
+def test_clone_custom_attributes():
+    class Card(Node):
+        TAG_NAME = 'div'
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+
+            self.title = Span()
+            self.outside = Span()
+            self.items = []
+
+            self.append(self.title)
+
+    class ListCard(Card):
+        def _finish_clone(self, clone, clones):
+            super()._finish_clone(clone, clones)
+
+            clone.items = list(self.items)
+
+    # node references
+    card = Card()
+    clone = Div(card).clone()[0]
+
+    assert clone.title is clone[0]
+    assert clone.title.parent is clone
+    assert clone.outside is card.outside
+
+    clone.title.append('foo')
+
+    assert card.title.nodes == []
+
+    # mutable custom attributes are shared, unless the node class copies
+    # them in _finish_clone()
+    assert card.clone().items is card.items
+
+    card = ListCard()
+    clone = card.clone()
+
+    clone.items.append(1)
+
+    assert card.items == []
+    assert clone.title is clone[0]
+
+
+def test_clone_mounted_nodes():
+    node = Div(Span('foo'))
+    document = Document()
+    document.apply(html=Div(node))
+
+    clone = node.clone()
+
+    assert clone.document is not document
+    assert clone[0].document is not document
+
+    # changes to the clone must not create patches
+    clone[0].class_list.add('foo')
+
+    assert not document.is_dirty
+
+
+def test_clone_frozen_node_lists():
+    raw_html = RawHTML('<b>foo</b>')
+
+    with pytest.raises(RuntimeError):
+        raw_html.clone().append(Div())
+
+
+def test_clone_legacy_widgets():
+    with pytest.raises(RuntimeError, match='can not be cloned'):
+        Div(Widget()).clone()
@@ -0,0 +1,212 @@
+import random
+import json
+
+import pytest
+
+from lona.html.widget_data import ListOverlay, DictOverlay
+from lona.html.document import Document
+from lona.protocol import OPERATION
+from lona._json import dumps
+from lona.html import Div
+
+
+def apply_patch(data, patch):
+    # minimal model of the client side widget data updater
+
+    _, _, operation, key_path, *payload = patch
+    operation = OPERATION(operation)
+
+    if operation == OPERATION.RESET and not key_path:
+        return payload[0]
+
+    for key in key_path:
+        data = data[key]
+
+    if operation in (OPERATION.SET, OPERATION.RESET):
+        data[payload[0]] = payload[1]
+
+    elif operation == OPERATION.INSERT:
+        data.insert(payload[0], payload[1])
+
+    elif operation == OPERATION.REMOVE:
+        data.pop(payload[0])
+
+    elif operation == OPERATION.CLEAR:
+        data.clear()
+
+    return data
+
+
+def send_patches(document, node, client_data):
+    _, _, patches = document.apply(html=node)
+
+    # the patches get encoded like when they get sent to the client
+    for patch in json.loads(dumps([patch.data for patch in patches or []])):
+        result = apply_patch(client_data, patch)
+
+        if patch[2] == OPERATION.RESET.value and not patch[3]:
+            client_data = result
+
+    return client_data
+
+
+def test_patch_payloads_are_not_copied():
+    div = Div(widget='Widget', widget_data={'points': []})
+    document = Document()
+    document.apply(html=div)
+
+    point = [1, 2]
+    div.widget_data['points'].append(point)
+
+    assert document._patch_stack.patches[0].data[5] is point
+
+
+def test_copy_on_write():
+    div = Div(widget='Widget', widget_data={'points': [[0, 0]]})
+    document = Document()
+    document.apply(html=div)
+
+    # serialized data is shared
+    data = div._serialize()[10]
+
+    assert data is div.widget_data._data
+
+    # changed containers, and their parents, get copied
+    div.widget_data['points'][0][1] = 1
+    div.widget_data['points'].append([1, 1])
+
+    assert data == {'points': [[0, 0]]}
+    assert div.widget_data == {'points': [[0, 1], [1, 1]]}
+
+    # pending patch payloads don't change
+    point = div.widget_data._data['points'][1]
+    div.widget_data['points'][1].append(2)
+
+    assert point == [1, 1]
+    assert div.widget_data['points'][1] == [1, 1, 2]
+
+    # owned containers get changed in place
+    points = div.widget_data._data['points']
+    div.widget_data['points'].append([2, 2])
+
+    assert div.widget_data._data['points'] is points
+
+
+def test_class_defaults_are_not_changed():
+    class Chart(Div):
+        WIDGET = 'Chart'
+        WIDGET_DATA = {'points': []}
+
+    chart = Chart()
+    chart.widget_data['points'].append([0, 0])
+
+    assert Chart.WIDGET_DATA == {'points': []}
+    assert Chart().widget_data == {'points': []}
+
+
+def test_unsupported_values():
+    div = Div(widget='Widget', widget_data={'list': []})
+
+    with pytest.raises(ValueError, match='unsupported type'):
+        div.widget_data['list'].append([object()])
+
+    with pytest.raises(ValueError, match='unsupported type'):
+        div.widget_data.update({'foo': {'bar': object()}})
+
+    assert div.widget_data == {'list': []}
+
+
+def get_random_value(randomizer, widget_data):
+    value = randomizer.choice([
+        lambda: randomizer.randint(0, 100),
+        lambda: [randomizer.randint(0, 100)],
+        lambda: {'value': [randomizer.randint(0, 100)]},
+    ])()
+
+    # values that contain containers of the widget data
+    if randomizer.random() > 0.8:
+        value = {'value': widget_data['list'].copy()}
+
+    return value
+
+
+def get_random_container(randomizer, widget_data):
+    container = widget_data[randomizer.choice(['list', 'dict'])]
+
+    # walk into nested containers
+    while True:
+        if isinstance(container, ListOverlay):
+            keys = list(range(len(container)))
+
+        else:
+            keys = list(container.keys())
+
+        nested_keys = [
+            key for key in keys
+            if isinstance(container[key], (ListOverlay, DictOverlay))
+        ]
+
+        if not nested_keys or randomizer.random() > 0.5:
+            return container
+
+        container = container[randomizer.choice(nested_keys)]
+
+
+def test_random_mutations():
+    for seed in range(50):
+        randomizer = random.Random(seed)
+
+        div = Div(widget='Widget', widget_data={'list': [], 'dict': {}})
+        widget_data = div.widget_data
+        document = Document()
+        client_data = json.loads(dumps(document.apply(html=div)[2][10]))
+
+        for _ in range(20):
+            for _ in range(randomizer.randint(1, 10)):
+                container = get_random_container(randomizer, widget_data)
+                value = get_random_value(randomizer, widget_data)
+                action = randomizer.randint(0, 4)
+
+                if isinstance(container, ListOverlay):
+                    index = randomizer.randint(0, max(len(container) - 1, 0))
+
+                    if action == 0:
+                        container.append(value)
+
+                    elif action == 1:
+                        container.insert(
+                            randomizer.randint(-2, len(container) + 2),
+                            value,
+                        )
+
+                    elif action == 2 and container:
+                        container.pop(index)
+
+                    elif action == 3 and container:
+                        container[index] = value
+
+                    elif action == 4:
+                        container.clear()
+
+                else:
+                    key = str(randomizer.randint(0, 5))
+
+                    if action in (0, 1):
+                        container[key] = value
+
+                    elif action == 2 and key in container.keys():
+                        container.pop(key)
+
+                    elif action == 3:
+                        container.update({key: value})
+
+                    elif action == 4:
+                        container.clear()
+
+                # serialized data gets shared
+                if randomizer.random() > 0.9:
+                    div._serialize()
+
+            client_data = send_patches(document, div, client_data)
+
+            assert client_data == json.loads(dumps(widget_data._data))
@@ -0,0 +1,194 @@
+import random
+import json
+
+import pytest
+
+from lona.html.time_series import TimeSeries, MINMAX, LTTB
+from lona.protocol import PATCH_TYPE, OPERATION
+from lona.html.document import Document
+from lona._json import dumps
+from lona.html import Div
+
+
+def setup_time_series(**kwargs):
+    div = Div(widget='Chart')
+    document = Document()
+    time_series = TimeSeries(div, 'points', **kwargs)
+
+    document.apply(html=div)
+
+    return div, document, time_series
+
+
+def get_patches(document, div):
+    _, _, patches = document.apply(html=div)
+
+    return [patch.data for patch in patches or []]
+
+
+def apply_patches(data, patches):
+    # minimal model of the client side widget data updater for flat lists
+
+    for _, _, operation, key_path, *payload in json.loads(dumps(patches)):
+        operation = OPERATION(operation)
+
+        if operation == OPERATION.RESET:
+            data = payload[0]
+
+        elif operation == OPERATION.SET and not key_path:
+            data[payload[0]] = payload[1]
+
+        elif operation == OPERATION.SET:
+            data[key_path[0]][payload[0]] = payload[1]
+
+        elif operation == OPERATION.INSERT:
+            data[key_path[0]].insert(payload[0], payload[1])
+
+        elif operation == OPERATION.REMOVE:
+            data[key_path[0]].pop(payload[0])
+
+    return data
+
+
+def test_ring_buffer():
+    div, document, time_series = setup_time_series(capacity=3)
+
+    time_series.append(0, 0)
+    time_series.append(1, 1)
+
+    assert div.widget_data == {'points': [[0, 0], [1, 1]]}
+
+    get_patches(document, div)
+
+    time_series.append(2, 2)
+    time_series.append(3, 3)
+
+    assert div.widget_data == {'points': [[1, 1], [2, 2], [3, 3]]}
+    assert time_series.points == [[1, 1], [2, 2], [3, 3]]
+    assert len(time_series) == 3
+
+    # appends and evictions
+    assert get_patches(document, div) == [
+        [div.id, PATCH_TYPE.WIDGET_DATA, OPERATION.INSERT, ['points'], 2, [2, 2]],
+        [div.id, PATCH_TYPE.WIDGET_DATA, OPERATION.REMOVE, ['points'], 0],
+        [div.id, PATCH_TYPE.WIDGET_DATA, OPERATION.INSERT, ['points'], 2, [3, 3]],
+    ]
+
+
+def test_minmax_decimation():
+    div, document, time_series = setup_time_series(
+        capacity=8,
+        max_points=4,
+        decimation=MINMAX,
+    )
+
+    # two buckets with four points each
+    for x, y in enumerate([3, 1, 4, 1, 5, 9, 2, 6]):
+        time_series.append(x, y)
+
+    assert div.widget_data['points'] == [[1, 1], [2, 4], [5, 9], [6, 2]]
+
+    get_patches(document, div)
+
+    # new buckets evict old ones
+    time_series.append(8, 5)
+    time_series.append(9, 3)
+
+    assert div.widget_data['points'] == [[5, 9], [6, 2], [8, 5], [9, 3]]
+
+    assert len(time_series) == 6
+
+    assert get_patches(document, div) == [
+        [div.id, PATCH_TYPE.WIDGET_DATA, OPERATION.REMOVE, ['points'], 0],
+        [div.id, PATCH_TYPE.WIDGET_DATA, OPERATION.REMOVE, ['points'], 0],
+        [div.id, PATCH_TYPE.WIDGET_DATA, OPERATION.INSERT, ['points'], 2, [8, 5]],
+        [div.id, PATCH_TYPE.WIDGET_DATA, OPERATION.INSERT, ['points'], 3, [8, 5]],
+        [div.id, PATCH_TYPE.WIDGET_DATA, OPERATION.SET, ['points'], 3, [9, 3]],
+    ]
+
+
+def test_lttb_decimation():
+    div, document, time_series = setup_time_series(
+        capacity=9,
+        max_points=3,
+        decimation=LTTB,
+    )
+
+    time_series.extend(
+        [[x, y] for x, y in enumerate([0, 5, 1, 0, 0, 0, 0, 8, 0])],
+    )
+
+    # the first bucket is decimated, the others show their last point
+    assert div.widget_data['points'] == [[1, 5], [5, 0], [8, 0]]
+
+    # the second bucket gets decimated as soon as the third one is complete
+    time_series.append(9, 0)
+
+    assert div.widget_data['points'] == [[3, 0], [8, 0], [9, 0]]
+
+
+@pytest.mark.parametrize('decimation', [MINMAX, LTTB])
+@pytest.mark.parametrize(('capacity', 'max_points'), [
+    (10, 6),
+    (10, 7),
+    (100, 60),
+    (1000, 100),
+])
+def test_capacity_and_max_points(decimation, capacity, max_points):
+    div, document, time_series = setup_time_series(
+        capacity=capacity,
+        max_points=max_points,
+        decimation=decimation,
+    )
+
+    # minmax sends two points per bucket
+    sent_points = max_points if decimation == LTTB else max_points // 2 * 2
+    point_counts = []
+
+    for x in range(capacity * 3):
+        time_series.append(x, x)
+        point_counts.append(len(time_series))
+
+        assert len(div.widget_data['points']) <= sent_points
+
+    # all sent points get used, and at least capacity points are kept
+    # before the oldest bucket gets evicted
+    assert len(div.widget_data['points']) == sent_points
+    assert capacity <= max(point_counts) < capacity + time_series._bucket_count
+
+
+def test_unknown_decimation():
+    with pytest.raises(ValueError, match='unknown decimation'):
+        TimeSeries(Div(), 'points', max_points=10, decimation='foo')
+
+
+@pytest.mark.parametrize('decimation', [MINMAX, LTTB])
+@pytest.mark.parametrize('max_points', [None, 2, 10, 50])
+def test_random_appends(decimation, max_points):
+    randomizer = random.Random(0)
+
+    div, document, time_series = setup_time_series(
+        capacity=100,
+        max_points=max_points,
+        decimation=decimation,
+    )
+
+    client_data = json.loads(dumps(div._serialize()[10]))
+    points = []
+
+    for _ in range(50):
+        for _ in range(randomizer.randint(0, 20)):
+            point = [len(points), randomizer.randint(-100, 100)]
+
+            time_series.append(*point)
+            points.append(point)
+
+        client_data = apply_patches(client_data, get_patches(document, div))
+
+        assert client_data == json.loads(dumps(div.widget_data._data))
+        assert len(client_data['points']) <= (max_points or 100)
+
+        # the client data only depends on the points
+        assert client_data['points'] == time_series._render()
+        assert time_series.points == points[-len(time_series):]
+        assert len(time_series) <= 100
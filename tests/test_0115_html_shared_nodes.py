@@ -0,0 +1,194 @@
+import pytest
+
+from lona.protocol import PATCH_TYPE, OPERATION, NODE_TYPE, DATA_TYPE
+from lona.html import SharedNode, SharedHTML, Span, Nav, Div, A
+from lona.html.rendering import render_html
+from lona.html.document import Document
+from lona import unique_ids
+
+
+def test_serialization():
+    shared_html = SharedHTML(Nav(A('Home', href='/')))
+    documents = []
+
+    for _ in range(3):
+        document = Document()
+        html = Div(SharedNode(shared_html, _class='navbar'), Span('foo'))
+
+        _, data_type, data = document.apply(html=html)
+
+        assert data_type == DATA_TYPE.HTML_TREE
+        assert data[8][0][5] == ['navbar']
+
+        documents.append(data)
+
+    # the shared nodes get serialized only once
+    assert documents[0][8][0][8] is documents[1][8][0][8]
+    assert documents[1][8][0][8] is documents[2][8][0][8]
+
+    assert documents[0][8][0][8][0][1] == shared_html._node[0].id
+
+    assert shared_html._serialize(include_node_ids=False) == [
+        Nav(A('Home', href='/'))._serialize(include_node_ids=False),
+    ]
+
+
+def test_rendering():
+    shared_html = SharedHTML(Nav(A('Home', href='/')))
+    shared_node = SharedNode(shared_html, _class='navbar')
+    nav = shared_html._node[0]
+    div = Div(shared_node)
+
+    assert str(div) == render_html(div, minified=False)
+    assert f'<nav data-lona-node-id="{nav.id}">' in render_html(
+        div,
+        minified=True,
+    )
+
+    assert str(shared_node) == '\n'.join([
+        f'<div data-lona-node-id="{shared_node.id}" class="navbar">',
+        f'  <nav data-lona-node-id="{nav.id}">',
+        f'    <a data-lona-node-id="{nav[0].id}" href="/">',
+        '      Home',
+        '    </a>',
+        '  </nav>',
+        '</div>',
+    ])
+
+
+def test_frozen_nodes():
+    shared_html = SharedHTML(Nav(A('Home', href='/')))
+    shared_node = SharedNode(shared_html)
+
+    with pytest.raises(RuntimeError, match='frozen'):
+        shared_node.append(Span())
+
+    with pytest.raises(RuntimeError, match='frozen'):
+        shared_html._node[0].append(Span())
+
+    # the shared node itself can be changed
+    document = Document()
+    document.apply(html=shared_node)
+
+    shared_node.class_list.add('foo')
+
+    _, _, patches = document.apply(html=shared_node)
+
+    assert [patch.data for patch in patches] == [
+        [shared_node.id, PATCH_TYPE.CLASS_LIST, OPERATION.ADD, 'foo'],
+    ]
+
+
+@pytest.mark.parametrize('mutate', [
+    lambda nav: nav.id_list.add('foo'),
+    lambda nav: nav.class_list.remove('navbar'),
+    lambda nav: setattr(nav, 'class_list', ['foo']),
+    lambda nav: nav.style.__setitem__('color', 'red'),
+    lambda nav: nav.style.clear(),
+    lambda nav: nav[0].attributes.pop('href'),
+    lambda nav: nav[0].attributes.__delitem__('href'),
+    lambda nav: setattr(nav[0], 'attributes', {}),
+    lambda nav: nav.widget_data.__setitem__('foo', 'bar'),
+    lambda nav: nav.widget_data['items'].append(2),
+    lambda nav: setattr(nav, 'widget_data', {}),
+])
+def test_frozen_node_attributes(mutate):
+    shared_html = SharedHTML(
+        Nav(
+            A('Home', href='/'),
+            _class='navbar',
+            style={'color': 'blue'},
+            widget_data={'items': [1]},
+        ),
+    )
+
+    nav = shared_html._node[0]
+    html_string = str(nav)
+
+    with pytest.raises(RuntimeError, match='frozen'):
+        mutate(nav)
+
+    assert str(nav) == html_string
+    assert nav.widget_data == {'items': [1]}
+
+
+def test_comparisons():
+    shared_html1 = SharedHTML(Span('foo'))
+    shared_html2 = SharedHTML(Span('bar'))
+
+    assert SharedNode(shared_html1) == SharedNode(shared_html1)
+    assert SharedNode(shared_html1) != SharedNode(shared_html2)
+    assert SharedNode(shared_html1) != Div(Span('foo'))
+    assert SharedNode(shared_html1) == SharedNode(SharedHTML(Span('foo')))
+
+
+def test_diffing():
+    shared_html1 = SharedHTML(Span('foo'))
+    shared_html2 = SharedHTML(Span('bar'))
+
+    document = Document(diffing=True)
+    document.apply(html=Div(SharedNode(shared_html1)))
+
+    # unchanged shared nodes don't get sent again
+    _, _, patches = document.apply(html=Div(SharedNode(shared_html1)))
+
+    assert not patches
+
+    # changed shared nodes get reset
+    html = Div(SharedNode(shared_html2))
+    _, _, patches = document.apply(html=html)
+
+    assert [patch.data for patch in patches] == [
+        [
+            html[0].id,
+            PATCH_TYPE.NODES,
+            OPERATION.RESET,
+            shared_html2._serialize(),
+        ],
+    ]
+
+
+def test_compact_node_ids(monkeypatch):
+    # process wide node ids start at 1, like compact node ids
+    monkeypatch.setattr(
+        unique_ids._name_spaces['nodes'],
+        '_value',
+        0,
+    )
+
+    shared_html = SharedHTML(Nav(A('Home', href='/'), A('About', href='/')))
+    shared_node_ids = [node.id for node in shared_html._node.iter_nodes()]
+    html = Div(SharedNode(shared_html), Div(Span('foo'), Span('bar')))
+
+    document = Document(compact_node_ids=True)
+    _, _, data = document.apply(html=html)
+
+    # rendering
+    # shared nodes keep their ids, which can't collide with compact node
+    # ids, neither as strings nor as integers
+    node_ids = []
+    stack = [data]
+
+    while stack:
+        node_data = stack.pop()
+        node_ids.append(str(node_data[1]))
+
+        if node_data[0] == NODE_TYPE.NODE:
+            stack.extend(node_data[8])
+
+    assert len(node_ids) == len(set(node_ids))
+
+    for node_id in shared_node_ids:
+        assert str(node_id) in node_ids
+        assert not str(node_id).isdigit()
+
+    assert f'data-lona-node-id="{shared_node_ids[0]}"' in str(html)
+
+    # event routing
+    # input events of shared nodes don't get routed to document nodes
+    for node_id in shared_node_ids:
+        assert document.get_node(str(node_id)) == []
+
+    for node in html.iter_nodes():
+        if node.id not in shared_node_ids:
+            assert document.get_node(str(node.id))[0] is node
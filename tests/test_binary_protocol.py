@@ -0,0 +1,169 @@
+import json
+
+from aiohttp import WSMsgType
+import pytest
+
+from lona.protocol import encode_data, OPERATION, PROTOCOL, METHOD
+from lona._msgpack import _unpackb, unpackb, _packb
+from lona.html.document import Document
+from lona.html import Span, Div
+from lona import View
+
+
+@pytest.mark.parametrize(('value', 'packed'), [
+    (None, b'\xc0'),
+    (True, b'\xc3'),
+    (False, b'\xc2'),
+    (0, b'\x00'),
+    (127, b'\x7f'),
+    (128, b'\xcc\x80'),
+    (256, b'\xcd\x01\x00'),
+    (65536, b'\xce\x00\x01\x00\x00'),
+    (2**32, b'\xcf\x00\x00\x00\x01\x00\x00\x00\x00'),
+    (-1, b'\xff'),
+    (-32, b'\xe0'),
+    (-33, b'\xd0\xdf'),
+    (-129, b'\xd1\xff\x7f'),
+    (-32769, b'\xd2\xff\xff\x7f\xff'),
+    (1.5, b'\xcb\x3f\xf8\x00\x00\x00\x00\x00\x00'),
+    ('', b'\xa0'),
+    ('a', b'\xa1a'),
+    ('a' * 32, b'\xd9\x20' + b'a' * 32),
+    ('a' * 256, b'\xda\x01\x00' + b'a' * 256),
+    (b'a', b'\xc4\x01a'),
+    ([], b'\x90'),
+    ([1, [2]], b'\x92\x01\x91\x02'),
+    ((1, 2), b'\x92\x01\x02'),
+    (list(range(16)), b'\xdc\x00\x10' + bytes(range(16))),
+    ({}, b'\x80'),
+    ({'a': 1}, b'\x81\xa1a\x01'),
+])
+def test_pure_python_encoder(value, packed):
+    assert _packb(value) == packed
+
+    if isinstance(value, tuple):
+        value = list(value)
+
+    assert _unpackb(packed) == value
+
+
+def test_round_trips():
+    values = [
+        [2**64 - 1, -2**63, -2**31 - 1, 2**16 - 1, 2**8 - 1],
+        ['ü' * 100, 'a' * 70000, [[]] * 70000],
+        {str(key): key for key in range(70000)},
+        {1: None, 'nested': {'list': [0.5, -0.5]}},
+    ]
+
+    for value in values:
+        assert _unpackb(_packb(value)) == value
+
+    with pytest.raises(OverflowError):
+        _packb(2**64)
+
+    with pytest.raises(TypeError, match='unsupported type'):
+        _packb(object())
+
+    with pytest.raises(ValueError, match='extra data'):
+        _unpackb(b'\x00\x00')
+
+
+def test_enums_are_lowered():
+    assert _unpackb(_packb([METHOD.DATA, OPERATION.SET])) == [203, 701]
+
+
+def test_encode_data():
+    document = Document()
+    html = Div(Span('foo', _class='bar'), Div(_style={'color': 'red'}))
+
+    data = list(document.apply(html=html))
+    message = encode_data(1, '2', 'title', data, binary=True)
+
+    assert isinstance(message, bytes)
+
+    assert unpackb(message) == json.loads(
+        encode_data(1, '2', 'title', data)[
+            len(PROTOCOL.MESSAGE_PREFIX.value):
+        ],
+    )
+
+
+def test_binary_protocol_size(table):
+    # a 100x20 table that updates every cell
+
+    document = Document()
+    document.apply(html=table)
+
+    for index, row in enumerate(table):
+        for cell in row:
+            cell[0] = str(index)
+            cell.attributes['data-row'] = index
+
+    _, data_type, patches = document.apply(html=table)
+    data = [data_type, [patch.data for patch in patches]]
+
+    json_message = encode_data(1, '1', None, data)
+    binary_message = encode_data(1, '1', None, data, binary=True)
+
+    assert len(binary_message) < len(json_message) * 0.9
+
+
+async def receive_data_message(websocket):
+    # sends a view request and returns the first data message
+    await websocket.send_str(
+        PROTOCOL.MESSAGE_PREFIX.value +
+        json.dumps([1, None, METHOD.VIEW.value, ['/', None]]),
+    )
+
+    while True:
+        message = await websocket.receive()
+
+        if message.type == WSMsgType.BINARY:
+            data = unpackb(message.data)
+
+        else:
+            data = json.loads(
+                message.data[len(PROTOCOL.MESSAGE_PREFIX.value):],
+            )
+
+        if data[2] == METHOD.DATA.value:
+            return message, data
+
+
+@pytest.mark.parametrize('binary_protocol', [True, False])
+async def test_negotiation(binary_protocol, lona_app_context):
+    def setup_app(app):
+        app.settings.WEBSOCKET_BINARY_PROTOCOL = binary_protocol
+
+        @app.route('/')
+        class Index(View):
+            def handle_request(self, request):
+                return Div('SUCCESS')
+
+    context = await lona_app_context(setup_app)
+
+    # clients that don't support the binary protocol
+    async with context.client.ws_connect('/') as websocket:
+        message, data = await receive_data_message(websocket)
+
+        assert websocket.protocol is None
+        assert message.type == WSMsgType.TEXT
+
+    # clients that support the binary protocol
+    protocols = (
+        PROTOCOL.MSGPACK_SUBPROTOCOL.value,
+        PROTOCOL.JSON_SUBPROTOCOL.value,
+    )
+
+    async with context.client.ws_connect('/', protocols=protocols) as websocket:
+        message, data = await receive_data_message(websocket)
+
+        if binary_protocol:
+            assert websocket.protocol == PROTOCOL.MSGPACK_SUBPROTOCOL.value
+            assert message.type == WSMsgType.BINARY
+
+        else:
+            assert websocket.protocol == PROTOCOL.JSON_SUBPROTOCOL.value
+            assert message.type == WSMsgType.TEXT
+
+        assert data[3][1][1][8][0][2] == 'SUCCESS'
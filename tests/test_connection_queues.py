@@ -0,0 +1,458 @@
+from types import SimpleNamespace
+from functools import partial
+import threading
+import asyncio
+
+import pytest
+
+from lona.connection import DEFERRED_RESYNC, Connection
+
+
+class FakeWebsocket:
+    ws_protocol = None
+
+    def __init__(self):
+        self.messages = []
+        self.writable = asyncio.Event()
+        self.writable.set()
+
+    async def send_str(self, string):
+        await self.writable.wait()
+
+        self.messages.append(string)
+
+    async def send_bytes(self, data):
+        await self.writable.wait()
+
+        self.messages.append(data)
+
+
+def setup_connection(max_size=100, high_water_mark=50):
+    loop = asyncio.get_running_loop()
+
+    server = SimpleNamespace(
+        loop=loop,
+        settings=SimpleNamespace(
+            WEBSOCKET_QUEUE_MAX_SIZE=max_size,
+            WEBSOCKET_QUEUE_HIGH_WATER_MARK=high_water_mark,
+        ),
+        run_function_async=lambda function, *args: loop.run_in_executor(
+            None,
+            partial(function, *args),
+        ),
+    )
+
+    return Connection(server, http_request=None, websocket=FakeWebsocket())
+
+
+async def wait_for_queue(connection):
+    while connection.queue_depth or connection._writer_running:
+        await asyncio.sleep(0.01)
+
+
+def start_thread(target):
+    thread = threading.Thread(target=target)
+    thread.start()
+
+    return thread
+
+
+async def test_messages_get_sent_in_order():
+    connection = setup_connection()
+
+    def send_messages():
+        for index in range(10):
+            connection.send_str(str(index))
+
+        connection.send_bytes(b'foo')
+
+    await asyncio.get_running_loop().run_in_executor(None, send_messages)
+    await wait_for_queue(connection)
+
+    assert connection.websocket.messages == [
+        *[str(index) for index in range(10)],
+        b'foo',
+    ]
+
+    assert connection.queue_depth == 0
+    assert connection.send_latency > 0
+
+
+async def test_one_writer_task(mocker):
+    # a view thread sends 99 messages to a client that doesn't read.
+    # The thread must not wait for the websocket, and all messages have to
+    # be written by one writer task
+
+    connection = setup_connection()
+    connection.websocket.writable.clear()
+
+    run_coroutine_threadsafe = mocker.patch(
+        'lona.connection.asyncio.run_coroutine_threadsafe',
+        wraps=asyncio.run_coroutine_threadsafe,
+    )
+
+    def send_messages():
+        for index in range(99):
+            connection.send_str(str(index))
+
+    await asyncio.get_running_loop().run_in_executor(None, send_messages)
+
+    assert run_coroutine_threadsafe.call_count == 1
+    assert connection.websocket.messages == []
+
+    connection.websocket.writable.set()
+    await wait_for_queue(connection)
+
+    assert run_coroutine_threadsafe.call_count == 1
+    assert connection.websocket.messages == [str(i) for i in range(99)]
+
+
+async def test_full_queues_block_sending_threads():
+    connection = setup_connection(max_size=2)
+    connection.websocket.writable.clear()
+
+    def send_messages():
+        for index in range(4):
+            connection.send_str(str(index))
+
+    thread = start_thread(send_messages)
+    await asyncio.sleep(0.1)
+
+    # the first message is being written, the next two are queued
+    assert thread.is_alive()
+    assert connection.queue_depth == 2
+
+    # the server loop never blocks
+    connection.send_str('loop')
+
+    assert connection.queue_depth == 3
+
+    connection.websocket.writable.set()
+    await wait_for_queue(connection)
+    thread.join()
+
+    assert connection.websocket.messages == ['0', '1', '2', 'loop', '3']
+
+
+async def test_closed_connections():
+    connection = setup_connection(max_size=1)
+    connection.websocket.writable.clear()
+
+    thread = start_thread(
+        lambda: [connection.send_str(str(index)) for index in range(3)],
+    )
+
+    await asyncio.sleep(0.1)
+
+    assert thread.is_alive()
+
+    # waiting threads get released and pending messages get discarded
+    connection._close()
+    thread.join()
+
+    assert connection.queue_depth == 0
+
+    connection.send_str('foo')
+
+    assert connection.queue_depth == 0
+
+    # the message that was already handed to the websocket gets written
+    connection.websocket.writable.set()
+    await wait_for_queue(connection)
+
+    assert connection.websocket.messages == ['0']
+
+
+async def test_slow_connections_get_resynced():
+    connection = setup_connection(high_water_mark=2)
+    connection.websocket.writable.clear()
+    resyncs = []
+
+    def resync():
+        resyncs.append(None)
+        connection._finish_resync('window', message='snapshot')
+
+    def send_html_update(message):
+        connection.send_message(message, resync_key='window', resync=resync)
+
+    def send_messages():
+        send_html_update('update-1')
+        send_html_update('update-2')
+        connection.send_str('message')
+
+        # the high-water mark is reached
+        send_html_update('update-3')
+        send_html_update('update-4')
+
+    loop = asyncio.get_running_loop()
+
+    # the first message gets handed to the websocket, which blocks
+    await loop.run_in_executor(None, partial(send_html_update, 'update-0'))
+
+    while connection.queue_depth:
+        await asyncio.sleep(0.01)
+
+    await loop.run_in_executor(None, send_messages)
+
+    # pending html updates got dropped, other messages not
+    assert [entry[0] for entry in connection._outbound_queue] == ['message']
+    assert not resyncs
+
+    connection.websocket.writable.set()
+    await wait_for_queue(connection)
+
+    while connection._resyncs:
+        await asyncio.sleep(0.01)
+
+    await wait_for_queue(connection)
+
+    # html updates get sent again after the snapshot
+    await loop.run_in_executor(None, partial(send_html_update, 'update-5'))
+
+    await wait_for_queue(connection)
+
+    assert len(resyncs) == 1
+
+    assert connection.websocket.messages == [
+        'update-0',
+        'message',
+        'snapshot',
+        'update-5',
+    ]
+
+
+async def test_slow_connections_get_one_snapshot():
+    # a view thread sends 300 html updates to a client that doesn't read.
+    # The thread must not wait for the client, and the client gets one
+    # snapshot instead of the updates it fell behind on
+
+    connection = setup_connection()
+    connection.websocket.writable.clear()
+    resyncs = []
+
+    def resync():
+        resyncs.append(None)
+        connection._finish_resync('window', message='snapshot')
+
+    def send_html_updates(indexes):
+        for index in indexes:
+            connection.send_message(
+                f'update-{index}',
+                resync_key='window',
+                resync=resync,
+            )
+
+    loop = asyncio.get_running_loop()
+
+    # the first update gets handed to the websocket, which blocks
+    await loop.run_in_executor(None, send_html_updates, [0])
+
+    while connection.queue_depth:
+        await asyncio.sleep(0.01)
+
+    await loop.run_in_executor(None, send_html_updates, range(1, 300))
+
+    assert connection.websocket.messages == []
+
+    connection.websocket.writable.set()
+
+    while connection._resyncs:
+        await asyncio.sleep(0.01)
+
+    await wait_for_queue(connection)
+
+    assert len(resyncs) == 1
+    assert connection.websocket.messages == ['update-0', 'snapshot']
+
+
+async def test_deferred_resyncs():
+    connection = setup_connection(high_water_mark=1)
+    connection.websocket.writable.clear()
+    attempts = []
+
+    def resync():
+        attempts.append(None)
+
+        # the snapshot can be taken with the next html update
+        if len(attempts) < 2:
+            return connection._finish_resync('window', defer=True)
+
+        connection._finish_resync('window', message='snapshot')
+
+    def send_html_update(message):
+        connection.send_message(message, resync_key='window', resync=resync)
+
+    loop = asyncio.get_running_loop()
+
+    await loop.run_in_executor(None, partial(send_html_update, 'update-0'))
+
+    while connection.queue_depth:
+        await asyncio.sleep(0.01)
+
+    # the high-water mark is reached
+    await loop.run_in_executor(None, partial(send_html_update, 'update-1'))
+    await loop.run_in_executor(None, partial(send_html_update, 'update-2'))
+
+    connection.websocket.writable.set()
+
+    while not attempts:
+        await asyncio.sleep(0.01)
+
+    await wait_for_queue(connection)
+
+    # deferred resyncs don't get retried until the next html update
+    await asyncio.sleep(0.1)
+
+    assert len(attempts) == 1
+    assert connection._resyncs == {'window': DEFERRED_RESYNC}
+
+    # the next html update gets replaced by the snapshot
+    await loop.run_in_executor(None, partial(send_html_update, 'update-3'))
+    await wait_for_queue(connection)
+
+    assert len(attempts) == 2
+    assert not connection._resyncs
+    assert connection.websocket.messages == ['update-0', 'snapshot']
+
+
+async def test_deferred_resyncs_without_html_updates():
+    # a view that defers its resync and stops, without showing html again
+    connection = setup_connection(high_water_mark=1)
+    connection.websocket.writable.clear()
+    attempts = []
+
+    def resync():
+        attempts.append(None)
+
+        if len(attempts) < 2:
+            return connection._finish_resync('window', defer=True)
+
+        connection._finish_resync('window', message='snapshot')
+
+    def send_html_update(message):
+        connection.send_message(message, resync_key='window', resync=resync)
+
+    loop = asyncio.get_running_loop()
+
+    await loop.run_in_executor(None, partial(send_html_update, 'update-0'))
+
+    while connection.queue_depth:
+        await asyncio.sleep(0.01)
+
+    # the high-water mark is reached
+    await loop.run_in_executor(None, partial(send_html_update, 'update-1'))
+    await loop.run_in_executor(None, partial(send_html_update, 'update-2'))
+
+    connection.websocket.writable.set()
+
+    while 'window' not in connection._deferred_resyncs:
+        await asyncio.sleep(0.01)
+
+    assert connection._resyncs == {'window': DEFERRED_RESYNC}
+
+    # deferred resyncs get run again, once the queue drained
+    connection.send_str('view-stop')
+
+    while connection._resyncs:
+        await asyncio.sleep(0.01)
+
+    await wait_for_queue(connection)
+
+    assert len(attempts) == 2
+    assert not connection._deferred_resyncs
+
+    assert connection.websocket.messages == [
+        'update-0',
+        'view-stop',
+        'snapshot',
+    ]
+
+
+def test_websocket_queue_settings(tmp_path):
+    from lona.server import Server
+
+    with pytest.raises(ValueError, match='HIGH_WATER_MARK'):
+        Server(
+            project_root=str(tmp_path),
+            settings_post_overrides={
+                'WEBSOCKET_QUEUE_MAX_SIZE': 50,
+                'WEBSOCKET_QUEUE_HIGH_WATER_MARK': 50,
+            },
+        )
+
+
+async def test_server_loops_in_other_threads_never_block():
+    # the server loop may run in any thread, for example when lona is
+    # embedded into another application
+
+    loop = asyncio.new_event_loop()
+    thread = start_thread(loop.run_forever)
+
+    try:
+        async def setup():
+            connection = setup_connection(max_size=1)
+            connection.websocket.writable.clear()
+
+            return connection
+
+        connection = asyncio.run_coroutine_threadsafe(setup(), loop).result()
+
+        async def send_messages():
+            for index in range(3):
+                connection.send_str(str(index))
+
+            return connection.queue_depth
+
+        # the writer task didn't start yet, so all messages got queued
+        # without blocking, even though the queue is full
+        queue_depth = asyncio.run_coroutine_threadsafe(
+            send_messages(),
+            loop,
+        ).result(timeout=1)
+
+        assert queue_depth == 3
+
+        loop.call_soon_threadsafe(connection.websocket.writable.set)
+
+        asyncio.run_coroutine_threadsafe(
+            wait_for_queue(connection),
+            loop,
+        ).result(timeout=1)
+
+        assert connection.websocket.messages == ['0', '1', '2']
+
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+async def test_send_return_values():
+    connection = setup_connection()
+    connection.websocket.writable.clear()
+
+    assert connection.send_str('foo') is None
+    assert connection.send_bytes(b'foo') is None
+
+    # futures get resolved when their message got written
+    future = connection.send_str('bar', wait=False)
+
+    assert not future.done()
+
+    connection.websocket.writable.set()
+    await wait_for_queue(connection)
+
+    assert future.result() is None
+    assert connection.send_bytes(b'bar', wait=False) is not None
+
+    # or got discarded
+    connection.websocket.writable.clear()
+    connection.send_str('baz', wait=False)
+    future = connection.send_str('baz', wait=False)
+    connection._close()
+
+    assert future.done()
+    assert connection.send_str('baz', wait=False).done()
+
+    connection.websocket.writable.set()
+    await wait_for_queue(connection)
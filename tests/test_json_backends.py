@@ -0,0 +1,149 @@
+from dataclasses import dataclass
+from datetime import date
+import json
+
+import pytest
+
+from lona._json import (
+    ORJSON_IS_AVAILABLE,
+    ENUM_VALUES,
+    set_backend,
+    get_backend,
+    dumps,
+)
+from lona.protocol import encode_data, OPERATION, EXIT_CODE, NODE_TYPE, ENUMS
+from lona.html.document import Document
+from lona.static_files import SORT_ORDER
+from lona.state import State
+from lona.html import Div
+
+BACKENDS = [
+    'json',
+    pytest.param(
+        'orjson',
+        marks=pytest.mark.skipif(
+            not ORJSON_IS_AVAILABLE,
+            reason='orjson is not installed',
+        ),
+    ),
+]
+
+
+@pytest.fixture
+def json_backend(request):
+    backend = get_backend()
+
+    set_backend(request.param)
+
+    yield request.param
+
+    set_backend(backend)
+
+
+@pytest.mark.parametrize('json_backend', BACKENDS, indirect=True)
+def test_backends(json_backend):
+    div = Div(widget='Widget', widget_data={'foo': [1, 2]})
+
+    value = {
+        'enums': [OPERATION.SET, SORT_ORDER.LIBRARY],
+        'widget_data': div.widget_data,
+        'state': State({'foo': 'bar'}),
+        'strings': ['foo', 'ü', '"'],
+        'numbers': [1, 1.5, -1, 2**64],
+        'constants': [None, True, False],
+        1: 'int key',
+    }
+
+    assert json.loads(dumps(value)) == {
+        'enums': [701, SORT_ORDER.LIBRARY.value],
+        'widget_data': {'foo': [1, 2]},
+        'state': {'foo': 'bar'},
+        'strings': ['foo', 'ü', '"'],
+        'numbers': [1, 1.5, -1, 2**64],
+        'constants': [None, True, False],
+        '1': 'int key',
+    }
+
+    # formatting options
+    assert dumps([1, 2], indent=2) == '[\n  1,\n  2\n]'
+
+    # unsupported values
+    with pytest.raises(TypeError):
+        dumps(object())
+
+
+@pytest.mark.parametrize('json_backend', BACKENDS, indirect=True)
+def test_protocol_enums(json_backend):
+    # protocol enums get lowered using a prebuilt map, or natively by orjson
+    assert ENUM_VALUES[OPERATION.SET] == 701
+    assert len(ENUM_VALUES) == sum(len(enum) for enum in ENUMS)
+
+    assert dumps([OPERATION.SET, NODE_TYPE.NODE]) == '[701,401]'
+
+
+@pytest.mark.parametrize('json_backend', BACKENDS, indirect=True)
+def test_backend_differences(json_backend):
+    @dataclass
+    class Point:
+        x: int
+
+    if json_backend == 'orjson':
+        assert dumps([float('nan'), float('inf')]) == '[null,null]'
+        assert dumps(Point(x=1)) == '{"x":1}'
+        assert dumps(date(2024, 1, 1)) == '"2024-01-01"'
+
+    else:
+        assert dumps([float('nan'), float('inf')]) == '[NaN,Infinity]'
+
+        for value in (Point(x=1), date(2024, 1, 1)):
+            with pytest.raises(TypeError):
+                dumps(value)
+
+
+@pytest.mark.skipif(
+    not ORJSON_IS_AVAILABLE,
+    reason='orjson is not installed',
+)
+def test_backends_encode_the_same_messages(table):
+    document = Document()
+    _, data_type, data = document.apply(html=table)
+    backend = get_backend()
+    messages = []
+
+    try:
+        for name in ('json', 'orjson'):
+            set_backend(name)
+            messages.append(encode_data(1, '1', None, [data_type, data]))
+
+    finally:
+        set_backend(backend)
+
+    assert messages[0] == messages[1]
+
+
+def test_protocol_enums_are_plain_enums():
+    assert str(OPERATION.SET) == 'OPERATION.SET'
+    assert f'{NODE_TYPE.NODE}' == 'NODE_TYPE.NODE'
+    assert repr(OPERATION.SET) == '<OPERATION.SET: 701>'
+
+    assert OPERATION.SET != 701
+    assert EXIT_CODE.SUCCESS
+
+
+def test_set_backend():
+    backend = get_backend()
+
+    try:
+        set_backend('json')
+
+        assert get_backend() == 'json'
+
+        set_backend('auto')
+
+        assert get_backend() == ('orjson' if ORJSON_IS_AVAILABLE else 'json')
+
+        with pytest.raises(ValueError, match='unknown json backend'):
+            set_backend('foo')
+
+    finally:
+        set_backend(backend)
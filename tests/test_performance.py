@@ -1,4 +1,26 @@
-from lona.html import Tr, Td
+import tracemalloc
+import random
+import math
+
+import pytest
+
+from lona.html import (
+    TimeSeries,
+    SharedNode,
+    SharedHTML,
+    Table,
+    Nav,
+    Div,
+    Tr,
+    Td,
+    H1,
+    A,
+)
+from lona.warnings import Lona_2_0_DeprecationWarning
+from lona.html.abstract_node import AbstractNode
+from lona.html.text_node import TextNode
+from lona.html.document import Document
+from lona._json import dumps
 
 
 def test_number_of_serialize_calls(mocker):
@@ -12,3 +34,271 @@ def test_number_of_serialize_calls(mocker):
         tr.append(Td(i))
 
     assert spy.call_count < 150
+
+
+def test_no_serialize_calls_on_detached_nodes(mocker):
+
+    from lona.html import Node
+
+    spy = mocker.spy(Node, '_serialize')
+
+    # nodes that are not mounted into a document need no patches
+    tr = Tr()
+
+    for i in range(10):
+        tr.append(Td(i))
+        tr.insert(0, Td(i))
+
+    tr.nodes.extend([Td(i) for i in range(10)])
+
+    assert spy.call_count == 0
+
+
+def test_number_of_serialize_calls_on_reserialization(mocker):
+
+    from lona.html import Table, Node, Tr, Td
+
+    # 100 rows with 100 cells each
+    table = Table()
+
+    for _ in range(100):
+        table.append(Tr([Td(i) for i in range(100)]))
+
+    table._serialize()
+
+    spy = mocker.spy(Node, '_serialize')
+
+    # unchanged tree
+    for _ in range(10):
+        table._serialize()
+
+    assert spy.call_count == 10
+
+    # only the changed cell, its ancestors and their direct children get
+    # re-serialized
+    spy.reset_mock()
+
+    table[50][50].style['color'] = 'red'
+    table._serialize()
+
+    assert spy.call_count == 1 + 100 + 100
+
+
+@pytest.mark.parametrize('cell_kwargs', [
+    {},
+    {'_class': 'cell'},
+    {'_class': 'cell', 'style': {'color': 'red'}},
+])
+def test_memory_usage_per_node(cell_kwargs):
+    def render_table():
+        return Table(
+            Tr(Td(f'{row}-{column}', **cell_kwargs) for column in range(10))
+            for row in range(100)
+        )
+
+    # warm up caches, like the unique id generator, before measuring
+    render_table()
+
+    tracemalloc.start()
+
+    try:
+        table = render_table()
+        memory_usage, _ = tracemalloc.get_traced_memory()
+
+    finally:
+        tracemalloc.stop()
+
+    node_count = len(list(table.iter_nodes())) + 1
+    bytes_per_node = memory_usage / node_count
+
+    # nodes with eagerly created attribute containers need more than 1000
+    # bytes per node
+    assert bytes_per_node < 600
+
+
+def test_mutations_in_deep_trees(monkeypatch):
+    root = Div()
+    node = root
+
+    for _ in range(200):
+        node.append(Div())
+        node = node[0]
+
+    document = Document()
+    document.apply(html=root)
+
+    # count the parent lookups, that are needed to find the document
+    parent_lookups = 0
+    parent_property = AbstractNode.parent
+
+    def parent(self):
+        nonlocal parent_lookups
+
+        parent_lookups += 1
+
+        return parent_property.fget(self)
+
+    monkeypatch.setattr(AbstractNode, 'parent', property(parent))
+
+    for i in range(100):
+        node.class_list.add(f'class-{i}')
+        node.append(Div())
+
+    # only the first mutation walks up the tree, to invalidate the
+    # serialization caches of all parent nodes
+    assert parent_lookups < 400
+
+
+def test_clone_runs_no_constructors(mocker):
+    from lona.html import Button, Span, Node
+
+    row = Tr(
+        Td(Span('name', _class='name'), style={'width': '50%'}),
+        Td(Span('value', _class='value'), data_index=1),
+        Td(Button('edit', _class='btn btn-primary', data_action='edit')),
+        _class='row',
+    )
+
+    init_spy = mocker.spy(Node, '__init__')
+    serialize_spy = mocker.spy(Node, '_serialize')
+
+    clones = [row.clone() for _ in range(10)]
+
+    assert init_spy.call_count == 0
+    assert serialize_spy.call_count == 0
+    assert all(clone == row for clone in clones)
+
+
+def test_widget_data_is_shared():
+    # a chart widget that gets 100 points per tick pushed, while its
+    # serialized data gets used to render the page for new clients
+
+    def push_points(initial_point_count):
+        points = [[i, i] for i in range(initial_point_count)]
+        chart = Div(widget='Chart', widget_data={'points': points})
+
+        document = Document()
+        document.apply(html=chart)
+
+        for tick in range(10):
+            new_points = [[tick, i] for i in range(100)]
+
+            for point in new_points:
+                chart.widget_data['points'].append(point)
+
+            _, _, patches = document.apply(html=chart)
+            serialized_points = chart._serialize()[10]['points']
+
+            # the patches contain only the new points, regardless of the
+            # amount of existing points
+            assert [patch.data[-1] for patch in patches] == new_points
+
+            # the points are shared with the patches and the serialized node
+            # instead of being copied
+            assert patches[-1].data[-1] is new_points[-1]
+            assert serialized_points[-1] is new_points[-1]
+
+    push_points(0)
+    push_points(100000)
+
+
+def test_time_series_patch_size():
+    # a dashboard with 50 live series, that get 20 points per tick pushed
+
+    def push_points(time_series):
+        charts = [Div(widget='Chart') for _ in range(50)]
+        html = Div(charts)
+        randomizer = random.Random(0)
+
+        if time_series:
+            series = [
+                TimeSeries(chart, 'points', capacity=1000, max_points=100)
+                for chart in charts
+            ]
+
+        else:
+            for chart in charts:
+                chart.widget_data = {'points': []}
+
+            series = [chart.widget_data['points'] for chart in charts]
+
+        document = Document()
+        document.apply(html=html)
+
+        patch_size = 0
+
+        for tick in range(100):
+            for points in series:
+                for i in range(20):
+                    x = tick * 20 + i
+                    y = math.sin(x / 100) + randomizer.random()
+
+                    if time_series:
+                        points.append(x, y)
+
+                    else:
+                        points.append([x, y])
+
+            _, _, patches = document.apply(html=html)
+            patch_size += len(dumps([patch.data for patch in patches]))
+
+        client_point_count = sum(
+            len(chart.widget_data['points']) for chart in charts
+        )
+
+        return patch_size, client_point_count
+
+    list_patch_size, list_point_count = push_points(time_series=False)
+    time_series_patch_size, time_series_point_count = push_points(
+        time_series=True,
+    )
+
+    # old points get evicted, and decimated points get sent only when they
+    # change
+    assert time_series_patch_size < list_patch_size
+    assert time_series_point_count <= 50 * 100 < list_point_count
+
+
+def test_text_node_attribute_lookups():
+    # text node attributes used to be looked up on the string first, and
+    # string methods got wrapped on every access
+
+    text_node = TextNode('foo')
+
+    assert '__getattribute__' not in TextNode.__dict__
+    assert text_node.upper.__func__ is TextNode.upper
+    assert text_node.parent is None
+
+    # text nodes accept arbitrary attributes, like other nodes
+    text_node.foo = 'bar'
+
+    assert text_node.foo == 'bar'
+
+    # TODO: remove in 2.0
+    with pytest.warns(Lona_2_0_DeprecationWarning):
+        upper = text_node.wrap_method(str.upper)
+
+    assert upper('bar') == TextNode('BAR')
+
+
+def test_shared_nodes_get_serialized_once(mocker):
+    # 200 views that render the same navigation with 200 links
+
+    from lona.html import Node
+
+    shared_navigation = SharedHTML(
+        Nav(*[A(f'link {i}', href=f'/{i}') for i in range(200)]),
+    )
+
+    spy = mocker.spy(Node, '_serialize')
+
+    for i in range(200):
+        document = Document()
+
+        document.apply(
+            html=Div(SharedNode(shared_navigation), H1(f'view {i}')),
+        )
+
+    # the navigation and its links get serialized for the first view only.
+    # Every view serializes its Div, SharedNode and H1.
+    assert spy.call_count == 1 + 200 + 200 * 3
@@ -0,0 +1,198 @@
+import json
+
+import pytest
+
+from lona.protocol import (
+    SharedMessage,
+    encode_data,
+    DATA_TYPE,
+    PROTOCOL,
+    METHOD,
+)
+from lona.view_runtime import ViewRuntime
+from lona.html.document import Document
+from lona._msgpack import unpackb
+from lona._json import dumps
+from lona.html import Div
+
+
+class FakeConnection:
+    interactive = True
+
+    def __init__(self, binary=False):
+        self.binary = binary
+        self.messages = []
+        self.resyncs = []
+
+    def send_message(self, message, **kwargs):
+        self.messages.append(message)
+
+    def _finish_resync(self, resync_key, message=None, defer=False):
+        self.resyncs.append((resync_key, message, defer))
+
+
+def decode(message):
+    if isinstance(message, bytes):
+        return unpackb(message)
+
+    return json.loads(message[len(PROTOCOL.MESSAGE_PREFIX.value):])
+
+
+def setup_view_runtime(connections):
+    view_runtime = ViewRuntime.__new__(ViewRuntime)
+
+    view_runtime.view_runtime_id = '1'
+    view_runtime.document = Document()
+    view_runtime.connections = connections
+    view_runtime.is_stopped = False
+
+    return view_runtime
+
+
+@pytest.mark.parametrize('binary', [True, False])
+def test_shared_messages(binary):
+    data = [['foo', 1, None], {'bar': [1.5, True]}]
+    shared_message = SharedMessage('1', METHOD.DATA, ['title', data])
+
+    for window_id in (1, 1000, None):
+        assert shared_message.encode(window_id, binary=binary) == encode_data(
+            window_id=window_id,
+            view_runtime_id='1',
+            title='title',
+            data=data,
+            binary=binary,
+        )
+
+
+def test_html_updates():
+    connections = [FakeConnection(), FakeConnection(binary=True)]
+    issuer = FakeConnection()
+
+    view_runtime = setup_view_runtime({
+        connections[0]: (1, '/'),
+        connections[1]: (2, '/'),
+        issuer: (3, '/'),
+    })
+
+    div = Div()
+    view_runtime.document.apply(html=div)
+
+    div.attributes.__setitem__('value', 'foo', issuer=(issuer, 3))
+    div.attributes['title'] = 'bar'
+
+    data = list(view_runtime.document.apply(html=div))[1:]
+    view_runtime.send_data(data=data)
+
+    messages = [decode(connection.messages[0]) for connection in connections]
+
+    # connections that issued no patches share one message
+    assert messages[0][1:] == messages[1][1:]
+    assert [message[0] for message in messages] == [1, 2]
+    assert len(messages[0][3][1][1]) == 2
+
+    # connections that issued patches don't get them sent back
+    message = decode(issuer.messages[0])
+
+    assert message[0] == 3
+    assert len(message[3][1][1]) == 1
+
+
+def test_broadcasts_get_encoded_once(mocker, table):
+    # one patch per row of a 100x20 table, sent to 200 windows
+
+    view_runtime = setup_view_runtime({
+        FakeConnection(): (window_id, '/') for window_id in range(200)
+    })
+
+    view_runtime.document.apply(html=table)
+
+    for row in table:
+        row[0][0] = 'foo'
+
+    data = list(view_runtime.document.apply(html=table))[1:]
+    spy = mocker.patch('lona.protocol.dumps', wraps=dumps)
+
+    view_runtime.send_data(data=data)
+
+    # the payload gets encoded once, only the window ids get encoded per
+    # window
+    encoded_values = [call.args[0] for call in spy.call_args_list]
+
+    assert len(encoded_values) == 1 + 200
+    assert encoded_values[1:] == list(range(200))
+
+    for connection, (window_id, _) in view_runtime.connections.items():
+        assert connection.messages == [
+            encode_data(window_id, '1', None, [data[0], [
+                patch.data for patch in data[1]
+            ]]),
+        ]
+
+
+def test_resyncs():
+    connection = FakeConnection()
+    view_runtime = setup_view_runtime({connection: (1, '/')})
+
+    div = Div('foo')
+    view_runtime.document.apply(html=div)
+
+    # pending patches would be sent twice, so the resync gets deferred
+    div.append('bar')
+    view_runtime._resync_connection(connection=connection, window_id=1)
+
+    assert connection.resyncs.pop() == (('1', 1), None, True)
+
+    # snapshot
+    view_runtime.document.apply(html=div)
+    view_runtime._resync_connection(connection=connection, window_id=1)
+
+    resync_key, message, defer = connection.resyncs.pop()
+
+    assert not defer
+    assert decode(message)[3][1] == json.loads(
+        dumps([DATA_TYPE.HTML_TREE, div._serialize()]),
+    )
+
+    # stopped views show no html updates anymore, so pending patches don't
+    # defer the snapshot
+    div.append('baz')
+    view_runtime.is_stopped = True
+    view_runtime._resync_connection(connection=connection, window_id=1)
+
+    resync_key, message, defer = connection.resyncs.pop()
+
+    assert not defer
+    assert decode(message)[3][1] == json.loads(
+        dumps([DATA_TYPE.HTML_TREE, div._serialize()]),
+    )
+
+    assert view_runtime.document._patch_stack.has_patches()
+
+    # closed windows
+    view_runtime.connections.clear()
+    view_runtime._resync_connection(connection=connection, window_id=1)
+
+    assert connection.resyncs.pop() == (('1', 1), None, False)
+
+
+def test_resyncs_with_pending_patches():
+    connection = FakeConnection()
+    other_connection = FakeConnection()
+
+    view_runtime = setup_view_runtime({
+        connection: (1, '/'),
+        other_connection: (2, '/'),
+    })
+
+    div = Div('foo')
+    view_runtime.document.apply(html=div)
+    div.append('bar')
+
+    # changes that the view did not show yet never get sent on its behalf
+    view_runtime._resync_connection(connection=connection, window_id=1)
+
+    assert connection.resyncs.pop() == (('1', 1), None, True)
+    assert view_runtime.document.is_dirty
+
+    for _connection in (connection, other_connection):
+        assert _connection.messages == []